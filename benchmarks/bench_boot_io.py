@@ -0,0 +1,77 @@
+"""Benchmark the content scan with and without deferred page bodies.
+
+Builds a synthetic content tree in a temporary directory and scans it in
+both modes, reporting bytes read, scan time and memory held by the
+navigation. Run from the repository root with
+
+    python -m benchmarks.bench_boot_io [pages] [body_kb]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from mdweb.Navigation import Navigation
+
+HEADER = u"""```metainf
+Title: Page %(n)d
+Nav Name: Page %(n)d
+Order: %(n)d
+```
+"""
+
+PARAGRAPH = u"Lorem *ipsum* dolor sit amet, consectetur adipiscing elit.\n\n"
+
+
+def build_tree(root, pages, body_kb):
+    """Create a content tree with the given number of pages."""
+    body = PARAGRAPH * (body_kb * 1024 // len(PARAGRAPH))
+    with open(os.path.join(root, 'index.md'), 'w') as f:
+        f.write(HEADER % {'n': 0} + body)
+
+    per_section = 100
+    for n in range(1, pages):
+        section = os.path.join(root, 'section%d' % (n // per_section))
+        if not os.path.isdir(section):
+            os.mkdir(section)
+        with open(os.path.join(section, 'page%d.md' % n), 'w') as f:
+            f.write(HEADER % {'n': n} + body)
+
+
+def scan(root, defer_body):
+    """Scan the tree and report the statistics."""
+    tracemalloc.start()
+    start = time.time()
+    nav = Navigation(root, scan_options={'defer_body': defer_body})
+    seconds = time.time() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = nav.scan_stats
+    print("defer_body=%-5s %6d pages  %12d of %12d bytes read  "
+          "%7.2f s  %8.1f MB held" %
+          (defer_body, stats['pages'], stats['bytes_read'],
+           stats['bytes_total'], seconds, current / 1024.0 / 1024.0))
+    return stats
+
+
+def main():
+    """Run the boot I/O benchmark."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    body_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    root = tempfile.mkdtemp()
+    try:
+        build_tree(root, pages, body_kb)
+        full = scan(root, False)
+        deferred = scan(root, True)
+        print("bytes read reduced %.0fx" %
+              (float(full['bytes_read']) / deferred['bytes_read']))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
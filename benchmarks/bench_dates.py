@@ -0,0 +1,78 @@
+"""Benchmark of metainf date parsing during a content scan.
+
+Scans a generated content tree once with the date fast path and cache and
+once with every date handed to dateparser. Run from the repository root with
+
+    python -m benchmarks.bench_dates [pages]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import dateparser
+
+from mdweb import BaseObjects
+from mdweb.Navigation import Navigation
+from mdweb.dates import clear_date_cache
+
+#: Date formats found in typical content
+DATE_FORMATS = [
+    '2016-%(month)02d-%(day)02d',
+    '2016/%(month)02d/%(day)02d 10:30',
+    'February %(day)dth, 2016',
+    '%(day)d Mar 2016',
+]
+
+
+def build_content(content_path, pages):
+    """Write pages with a mix of date formats."""
+    with open(os.path.join(content_path, 'index.md'), 'w') as f:
+        f.write('```metainf\nTitle: Home\n```\n')
+    section = os.path.join(content_path, 'posts')
+    os.mkdir(section)
+    for i in range(pages):
+        date = DATE_FORMATS[i % len(DATE_FORMATS)] % {
+            'month': i % 12 + 1, 'day': i % 28 + 1}
+        with open(os.path.join(section, 'page%d.md' % i), 'w') as f:
+            f.write('```metainf\nTitle: Page %d\nDate: %s\n```\n'
+                    '# Page %d\n' % (i, date, i))
+
+
+def scan(content_path):
+    """Time one content scan."""
+    clear_date_cache()
+    start = time.time()
+    Navigation(content_path)
+    return time.time() - start
+
+
+def main():
+    """Run the date parsing benchmark."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    content_path = tempfile.mkdtemp()
+    try:
+        build_content(content_path, pages)
+
+        # Import and warm dateparser so neither run pays for it
+        dateparser.parse('2016-02-01')
+
+        fast = scan(content_path)
+
+        parse_date = BaseObjects.parse_date
+        BaseObjects.parse_date = dateparser.parse
+        try:
+            slow = scan(content_path)
+        finally:
+            BaseObjects.parse_date = parse_date
+    finally:
+        shutil.rmtree(content_path)
+
+    print("dateparser only   %5d pages  %8.2f s" % (pages, slow))
+    print("fast path, cached %5d pages  %8.2f s" % (pages, fast))
+    print("scan time reduced %.1fx" % (slow / fast))
+
+
+if __name__ == '__main__':
+    main()
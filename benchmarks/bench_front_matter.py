@@ -0,0 +1,99 @@
+"""Benchmark the content scan with metainf blocks and YAML front matter.
+
+Builds the same synthetic content tree once with metainf blocks and once
+with YAML front matter and times a header only scan of each. YAML is timed
+with the libyaml CSafeLoader, when PyYAML is built with it, and with the
+pure Python SafeLoader. Run from the repository root with
+
+    python -m benchmarks.bench_front_matter [pages]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import yaml
+
+from mdweb import BaseObjects
+from mdweb.Navigation import Navigation
+
+METAINF_HEADER = u"""```metainf
+Title: Page %(n)d
+Description: Description of page %(n)d
+Author: Author %(author)d
+Date: 2016-%(month)02d-%(day)02d
+Order: %(n)d
+Teaser: This is a teaser paragraph that will be available to pages
+  and the teaser may span multiple lines
+Summary Image: /contentassets/page%(n)d.jpg
+```
+"""
+
+YAML_HEADER = u"""---
+Title: Page %(n)d
+Description: Description of page %(n)d
+Author: Author %(author)d
+Date: 2016-%(month)02d-%(day)02d
+Order: %(n)d
+Teaser: This is a teaser paragraph that will be available to pages
+  and the teaser may span multiple lines
+Summary Image: /contentassets/page%(n)d.jpg
+---
+"""
+
+BODY = u"Lorem *ipsum* dolor sit amet, consectetur adipiscing elit.\n\n" * 20
+
+
+def build_tree(root, pages, header):
+    """Create a content tree with the given number of pages."""
+    per_section = 100
+    for n in range(pages):
+        if n == 0:
+            path = os.path.join(root, 'index.md')
+        else:
+            section = os.path.join(root, 'section%d' % (n // per_section))
+            if not os.path.isdir(section):
+                os.mkdir(section)
+            path = os.path.join(section, 'page%d.md' % n)
+        with open(path, 'w') as f:
+            f.write(header % {'n': n, 'author': n % 50, 'month': n % 12 + 1,
+                              'day': n % 28 + 1} + BODY)
+
+
+def scan(name, root):
+    """Time a header only scan of the tree."""
+    start = time.time()
+    nav = Navigation(root, scan_options={'defer_body': True})
+    seconds = time.time() - start
+    print("%-22s %6d pages  %7.2f s" %
+          (name, nav.scan_stats['pages'], seconds))
+    return seconds
+
+
+def main():
+    """Run the front matter benchmark."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    metainf_root = tempfile.mkdtemp()
+    yaml_root = tempfile.mkdtemp()
+    try:
+        build_tree(metainf_root, pages, METAINF_HEADER)
+        build_tree(yaml_root, pages, YAML_HEADER)
+
+        scan('metainf', metainf_root)
+        scan('yaml (%s)' % BaseObjects.YAMLSafeLoader.__name__, yaml_root)
+
+        loader = BaseObjects.YAMLSafeLoader
+        BaseObjects.YAMLSafeLoader = yaml.SafeLoader
+        try:
+            scan('yaml (SafeLoader)', yaml_root)
+        finally:
+            BaseObjects.YAMLSafeLoader = loader
+    finally:
+        shutil.rmtree(metainf_root)
+        shutil.rmtree(yaml_root)
+
+
+if __name__ == '__main__':
+    main()
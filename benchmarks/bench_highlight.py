@@ -0,0 +1,84 @@
+"""Benchmark rendering pages with highlighted code blocks.
+
+Renders generated pages sharing a pool of code snippets without
+highlighting, with a cold highlighter, again after a reload with the memory
+cache and with a new highlighter reading the disk cache.
+Run from the repository root with
+
+    python -m benchmarks.bench_highlight [pages]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from mdweb.CodeHighlighter import CodeHighlighter
+from mdweb.Page import Page
+
+#: Number of distinct code snippets shared by the pages
+SNIPPETS = 200
+
+#: Number of code blocks in each generated page
+PAGE_BLOCKS = 5
+
+SNIPPET = u"""def handler_%d(request, count=%d):
+    \"\"\"Handle a request.\"\"\"
+    items = [item for item in request.items if item.count > count]
+    for item in sorted(items, key=lambda item: item.name):
+        print("%%s: %%d" %% (item.name, item.count))
+    return {'handled': len(items)}
+"""
+
+
+def make_page(rand):
+    """Return the markdown of a page with code blocks."""
+    parts = [u"```metainf\nTitle: Code\n```\n"]
+    for _ in range(PAGE_BLOCKS):
+        n = rand.randrange(SNIPPETS)
+        parts.append(u"Some text about the code.\n\n```python\n%s```\n" %
+                     (SNIPPET % (n, n)))
+    return u"\n".join(parts)
+
+
+def render(sources, highlighter):
+    """Render every page, returning the time taken."""
+    start = time.time()
+    for n, source in enumerate(sources):
+        Page('/content/page%d.md' % n, 'page%d' % n, source,
+             code_highlighter=highlighter)
+    return time.time() - start
+
+
+def main():
+    """Run the highlighting benchmark."""
+    if not CodeHighlighter.available():
+        sys.exit("Pygments is not installed")
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rand = random.Random(0)
+    sources = [make_page(rand) for _ in range(pages)]
+
+    print("not highlighted      %6.2f s" % render(sources, None))
+
+    directory = tempfile.mkdtemp()
+    try:
+        cache_path = os.path.join(directory, 'highlight')
+        highlighter = CodeHighlighter(cache_path=cache_path)
+        seconds = render(sources, highlighter)
+        print("cold cache           %6.2f s  %d highlighted" %
+              (seconds, highlighter.highlights))
+        seconds = render(sources, highlighter)
+        print("reload, memory cache %6.2f s  %d hits" %
+              (seconds, highlighter.hits))
+
+        highlighter = CodeHighlighter(cache_path=cache_path)
+        seconds = render(sources, highlighter)
+        print("restart, disk cache  %6.2f s  %d disk hits" %
+              (seconds, highlighter.disk_hits))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
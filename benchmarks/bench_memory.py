@@ -0,0 +1,90 @@
+"""Memory benchmark of parsed page objects.
+
+Builds pages for a synthetic site in memory and reports the memory held per
+page as measured by tracemalloc. Run from the repository root with
+
+    python -m benchmarks.bench_memory [pages] [keep|compress|drop]
+"""
+import gc
+import sys
+import tracemalloc
+
+from mdweb.BaseObjects import MetaInfParser
+from mdweb.Page import Page, PageMetaInf, split_meta_inf
+
+#: Number of distinct ad-hoc custom fields used across the site
+CUSTOM_FIELD_COUNT = 500
+
+PAGE_TEMPLATE = u"""```metainf
+Title: Page %(n)d
+Description: Description of page %(n)d
+Author: Author %(author)d
+Date: 2016-%(month)02d-%(day)02d
+Order: %(n)d
+Summary Image: /contentassets/page%(n)d.jpg
+Field %(custom)d: Custom value %(n)d
+```
+# Page %(n)d
+
+Some page content with a *little* markdown, enough to be representative of
+a short article. %(body)s
+"""
+
+
+def page_string(n):
+    """Return the file contents of the nth synthetic page."""
+    return PAGE_TEMPLATE % {
+        'n': n,
+        'author': n % 50,
+        'month': n % 12 + 1,
+        'day': n % 28 + 1,
+        'custom': n % CUSTOM_FIELD_COUNT,
+        'body': u'Lorem ipsum dolor sit amet. ' * 40,
+    }
+
+
+def measure(build):
+    """Return the memory held by the objects returned by build()."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return held
+
+
+def report(name, held, pages):
+    """Print the memory held per page."""
+    print("%-10s %d pages  %6.1f MB held  %5d bytes/page" %
+          (name, pages, held / 1e6, held // pages))
+
+
+def main():
+    """Run the memory benchmark."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    retention = sys.argv[2] if len(sys.argv) > 2 else 'keep'
+    file_strings = [page_string(n) for n in range(pages)]
+    meta_strings = [split_meta_inf(file_string)[0]
+                    for file_string in file_strings]
+    class_attributes = len(vars(MetaInfParser))
+
+    def build_pages():
+        site = [Page('/content/page%d.md' % n, 'page%d' % n, file_string,
+                     source_retention=retention)
+                for n, file_string in enumerate(file_strings)]
+        for page in site:
+            page.release_source()
+        return site
+
+    report('pages', measure(build_pages), pages)
+    report('meta-inf', measure(lambda: [
+        PageMetaInf(meta_string) for meta_string in meta_strings]), pages)
+    print("MetaInfParser class attributes %d -> %d" %
+          (class_attributes, len(vars(MetaInfParser))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmarks for the metainf parser.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_metainf
+"""
+import timeit
+
+from mdweb.Page import PageMetaInf
+
+#: A metainf block as found on a typical page
+TYPICAL = u"""
+Title: MDWeb
+Description: The minimalistic markdown NaCMS
+Author: Chad Rempp
+Order: 1
+Template: page_home.html
+Nav Name: Home Page
+Sitemap Changefreq: Monthly
+Sitemap Priority: 0.5
+Teaser: This is a teaser paragraph that will be available to pages
+  and the teaser may span multiple lines
+Teaser Image: /contentassets/home/00041_thumb.jpg
+"""
+
+#: A large metainf block with many custom fields, comments and long values
+LARGE = u"\n".join(
+    [u"# Generated metainf block"] +
+    [u"Field %d: %s\n  %s\n# comment %d" % (i, u"value " * 20, u"more " * 20,
+                                           i)
+     for i in range(200)])
+
+#: Inputs that are expensive for backtracking regular expressions
+ADVERSARIAL = {
+    'long_unterminated_key': u"Title" + u" a" * 5000,
+    'many_blank_lines': u"Title: MDWeb\n" + u"\n" * 5000 + u"  tail",
+    'long_continuation': u"Teaser: start\n" + u"  word\n" * 5000,
+    'many_comments': u"Title: MDWeb\n" + u"# comment: value\n" * 5000,
+}
+
+
+def bench(name, meta_string, number):
+    """Time parsing the given metainf string."""
+    seconds = timeit.timeit(lambda: PageMetaInf(meta_string), number=number)
+    print("%-24s %10.1f us/parse  (%d bytes)" %
+          (name, seconds / number * 1e6, len(meta_string)))
+
+
+def main():
+    """Run the metainf benchmarks."""
+    bench('typical', TYPICAL, 2000)
+    bench('large', LARGE, 50)
+    for name, meta_string in sorted(ADVERSARIAL.items()):
+        bench(name, meta_string, 5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Benchmarks for separating the metainf block from the page content.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_page_split
+"""
+import re
+import timeit
+
+from mdweb.Page import split_meta_inf
+
+#: The regex split_meta_inf replaced, kept for comparison
+META_INF_REGEX = re.compile(
+    r'(^```metainf(?P<metainf>.*?)```)?(?P<content>.*)', flags=re.DOTALL)
+
+HEADER = u"```metainf\nTitle: MDWeb\nAuthor: Chad Rempp\nOrder: 1\n```\n"
+
+#: Page files of increasing size and malformed files
+INPUTS = {
+    'typical': HEADER + u"Some *markdown* text.\n\n" * 50,
+    'large_body': HEADER + u"Some *markdown* text.\n\n" * 100000,
+    'unterminated': u"```metainf\nTitle: MDWeb\n" + u"line\n" * 200000,
+    'backticks': u"```metainf" + u"``" * 500000,
+    'no_meta_inf': u"Some *markdown* text.\n\n" * 100000,
+}
+
+
+def regex_split(file_string):
+    """Split using the replaced regex."""
+    match = META_INF_REGEX.search(file_string)
+    return match.group('metainf') or '', match.group('content')
+
+
+def bench(name, file_string, number):
+    """Time both splitting implementations on the file string."""
+    for label, func in (('regex', regex_split), ('scanner', split_meta_inf)):
+        seconds = timeit.timeit(lambda: func(file_string), number=number)
+        print("%-14s %-8s %10.1f us/split  (%d bytes)" %
+              (name, label, seconds / number * 1e6, len(file_string)))
+
+
+def main():
+    """Run the page split benchmarks."""
+    for name, file_string in sorted(INPUTS.items()):
+        bench(name, file_string, 20)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark building and querying the search index.
+
+Indexes generated pages with Zipf distributed words, then times queries of
+common, medium and rare words and rebuilds after one page changed and one
+was removed.
+Run from the repository root with
+
+    python -m benchmarks.bench_search [pages]
+"""
+import random
+import sys
+import time
+import timeit
+
+from mdweb.SearchIndex import SearchIndex
+
+#: Number of distinct words in the generated pages
+VOCABULARY = 20000
+
+#: Number of words in each generated page body
+PAGE_WORDS = 200
+
+
+class MetaInf(object):  # pylint: disable=R0903
+    """Meta information of a generated page."""
+
+    def __init__(self, title, description):
+        self.title = title
+        self.description = description
+
+
+class IndexedPage(object):  # pylint: disable=R0903
+    """Just enough of a page to index."""
+
+    def __init__(self, n, words, mtime=0):
+        self.page_path = '/content/docs/page%d.md' % n
+        self.url_path = 'docs/page%d' % n
+        self.mtime = mtime
+        self.meta_inf = MetaInf(' '.join(words[:5]), ' '.join(words[5:20]))
+        self.markdown_str = ' '.join(words)
+
+    def read_markdown(self):
+        """Return the page markdown."""
+        return self.markdown_str
+
+
+def main():
+    """Run the search index benchmark."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rand = random.Random(0)
+    words = ['w%d' % n for n in range(VOCABULARY)]
+    weights = [1.0 / (rank + 1) for rank in range(VOCABULARY)]
+    page_list = [IndexedPage(n, rand.choices(words, weights, k=PAGE_WORDS))
+                 for n in range(pages)]
+
+    start = time.time()
+    index = SearchIndex(page_list)
+    print("built   %6d pages %7d terms  %8.2f s" %
+          (len(index), index.term_count, time.time() - start))
+
+    page_list[0] = IndexedPage(0, words[:PAGE_WORDS], mtime=1)
+    start = time.time()
+    index = SearchIndex(page_list, previous=index)
+    print("rebuilt %6d pages %7d tokenized %6.2f s" %
+          (len(index), index.pages_tokenized, time.time() - start))
+
+    del page_list[1]
+    start = time.time()
+    index = SearchIndex(page_list, previous=index)
+    print("removed %6d pages %7d tokenized %6.2f s" %
+          (len(index), index.pages_tokenized, time.time() - start))
+
+    for query in ['w0', 'w2 w30', 'w100 w2000', 'w15000', 'w0 w1 w2']:
+        number = 20
+        seconds = timeit.timeit(lambda: index.search(query), number=number)
+        print("%-12s %6d matches %8.2f ms/query" %
+              (query, len(index._postings.get(query.split()[0], ((),))[0]),
+               seconds / number * 1e3))
+
+
+if __name__ == '__main__':
+    main()
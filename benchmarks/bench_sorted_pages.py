@@ -0,0 +1,72 @@
+"""Benchmark the sorted_pages template filter on a listing page.
+
+Times selecting the latest 5 of a large list of posts per render with a full
+sort, with heap selection and with the memoized filter used by templates
+after its first render, also given a new list on every render like
+Navigation.children.
+Run from the repository root with
+
+    python -m benchmarks.bench_sorted_pages [pages]
+"""
+import sys
+import timeit
+
+from mdweb.MDSite import MDSite
+from mdweb.Page import Page
+
+HEADER = u"""```metainf
+Title: Post %(n)d
+Date: 20%(year)02d-%(month)02d-%(day)02d
+Order: %(n)d
+```
+"""
+
+
+class ListingSite(object):  # pylint: disable=R0903
+    """Just enough of a site to call the memoized filter."""
+
+    SORTED_PAGES_CACHE_SIZE = MDSite.SORTED_PAGES_CACHE_SIZE
+    _sorted_pages_filter = staticmethod(MDSite._sorted_pages_filter)
+    _page_ordering = MDSite._page_ordering
+
+    def __init__(self):
+        self.sorted_pages_cache = {}
+
+
+def full_sort(page_list, attribute, page_count, reverse):
+    """Sort the whole list and slice it, as the filter used to."""
+    return MDSite._sorted_pages_filter(page_list, attribute,
+                                       reverse=reverse)[0:page_count]
+
+
+def main():
+    """Run the sorted_pages benchmark."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    page_list = [
+        Page('/content/posts/post%d.md' % n, 'posts/post%d' % n,
+             HEADER % {'n': n, 'year': n % 20, 'month': n % 12 + 1,
+                       'day': n % 28 + 1},
+             defer_body=True)
+        for n in range(pages)]
+
+    site = ListingSite()
+    filters = [
+        ('full sort', full_sort),
+        ('heap top-k', MDSite._sorted_pages_filter),
+        ('memoized', lambda *args: MDSite._memoized_sorted_pages_filter(
+            site, *args)),
+        ('memoized new list', lambda page_list, *args:
+         MDSite._memoized_sorted_pages_filter(site, list(page_list), *args)),
+    ]
+    for name, sorted_pages in filters:
+        # The memoized filter sorts on the first render of each generation
+        sorted_pages(page_list, 'date', 5, True)
+        number = 20
+        seconds = timeit.timeit(
+            lambda: sorted_pages(page_list, 'date', 5, True), number=number)
+        print("%-17s %6d pages  %10.1f us/render" %
+              (name, pages, seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
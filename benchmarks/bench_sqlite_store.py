@@ -0,0 +1,116 @@
+"""Benchmark the SQLite store against the in-process search index.
+
+Builds both from generated pages, then compares the heap held by each and
+the time taken by queries and by an update after one page changed.
+Run from the repository root with
+
+    python -m benchmarks.bench_sqlite_store [pages]
+"""
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from mdweb.SQLiteStore import SQLiteStore
+from mdweb.SearchIndex import SearchIndex
+
+#: Number of distinct words in the generated pages
+VOCABULARY = 20000
+
+#: Number of words in each generated page body
+PAGE_WORDS = 200
+
+
+class MetaInf(object):  # pylint: disable=R0903
+    """Meta information of a generated page."""
+
+    def __init__(self, n, words):
+        self.title = ' '.join(words[:5])
+        self.description = ' '.join(words[5:20])
+        self.author = 'author%d' % (n % 50)
+        self.date = datetime.datetime(2000, 1, 1) + \
+            datetime.timedelta(hours=n)
+        self.tags = words[20:23]
+        self.custom_fields = {}
+
+
+class StoredPage(object):  # pylint: disable=R0903
+    """Just enough of a page to store."""
+
+    is_published = True
+
+    def __init__(self, n, words, mtime=0):
+        self.page_path = '/content/docs/page%d.md' % n
+        self.url_path = 'docs/page%d' % n
+        self.mtime = mtime
+        self.meta_inf = MetaInf(n, words)
+        self.markdown_str = ' '.join(words)
+
+    def read_markdown(self):
+        """Return the page markdown."""
+        return self.markdown_str
+
+
+def timed(function):
+    """Return the result of a function and the time taken."""
+    start = time.time()
+    return function(), time.time() - start
+
+
+def main():
+    """Run the SQLite store benchmark."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rand = random.Random(0)
+    words = ['w%d' % n for n in range(VOCABULARY)]
+    weights = [1.0 / (rank + 1) for rank in range(VOCABULARY)]
+    page_list = [StoredPage(n, rand.choices(words, weights, k=PAGE_WORDS))
+                 for n in range(pages)]
+
+    tracemalloc.start()
+    index, seconds = timed(lambda: SearchIndex(page_list))
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("search index  built in %6.2f s  %8.1f MB heap" %
+          (seconds, index_bytes / 1e6))
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'store.db')
+        store = SQLiteStore(path)
+        _, seconds = timed(lambda: store.update(page_list))
+        print("sqlite store  built in %6.2f s  %8.1f MB file" %
+              (seconds, os.path.getsize(path) / 1e6))
+
+        page_list[0] = StoredPage(0, words[:PAGE_WORDS], mtime=1)
+        stats, seconds = timed(lambda: store.update(page_list))
+        print("sqlite store  updated %d page in %6.2f s" %
+              (stats['written'], seconds))
+
+        queries = [
+            ('search w100 w2000', lambda: index.search('w100 w2000'),
+             lambda: store.search('w100 w2000')),
+            ('search w15000', lambda: index.search('w15000'),
+             lambda: store.search('w15000')),
+            ('latest 10', None, lambda: store.latest(10)),
+            ('by_author', None, lambda: store.by_author('author7')),
+        ]
+        number = 20
+        for name, index_query, store_query in queries:
+            index_ms = timeit.timeit(index_query, number=number) / number * \
+                1e3 if index_query else float('nan')
+            store_ms = timeit.timeit(store_query, number=number) / number * \
+                1e3
+            print("%-18s index %8.2f ms  store %8.2f ms" %
+                  (name, index_ms, store_ms))
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,56 @@
 
 This is broken out into a separate file to avoid circular imports.
 """
+import datetime
 import re
-import dateparser
-from six import string_types
+from six import string_types, text_type
+import yaml
 
+try:
+    from yaml import CSafeLoader as YAMLSafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YAMLSafeLoader
+
+from mdweb.dates import parse_date
 from mdweb.Exceptions import PageMetaInfFieldException
 from mdweb.metafields import META_FIELDS as MDW_META_FIELDS
 
+#: Meta information in the metainf block grammar
+META_FORMAT_METAINF = 'metainf'
+
+#: Meta information as YAML front matter
+META_FORMAT_YAML = 'yaml'
+
+
+def load_yaml_fields(yaml_string):
+    """Load YAML front matter as a mapping of fields.
+
+    :param yaml_string: Raw YAML front matter
+    :return: Dictionary of fields, empty for empty front matter, or None if
+             the string isn't valid YAML or isn't a mapping
+    """
+    try:
+        fields = yaml.load(yaml_string, Loader=YAMLSafeLoader)
+    except yaml.YAMLError:
+        return None
+
+    if fields is None:
+        return {}
+    if not isinstance(fields, dict):
+        return None
+    return fields
+
 
 class NavigationBaseItem(object):  # pylint: disable=R0903
-    """Base object for navigation items such as nav-levels or pages."""
+    """Base object for navigation items such as nav-levels or pages.
+
+    Items are linked to their parent navigation level and to their previous
+    and next siblings when the navigation is scanned. An index page takes
+    the place of its navigation level, so its parent is the level above and
+    it has no siblings.
+    """
+
+    __slots__ = ('parent', 'previous', 'next')
 
     #: Type of navigation item
     @property
@@ -19,89 +59,224 @@ class NavigationBaseItem(object):  # pylint: disable=R0903
         """Return the type of this nav item (the class name)."""
         return self.__class__.__name__
 
+    @property
+    def ancestors(self):
+        """Return the navigation levels above this item, top level first."""
+        ancestors = []
+        nav = self.parent
+        while nav is not None:
+            ancestors.append(nav)
+            nav = nav.parent
+        ancestors.reverse()
+        return ancestors
+
 
 class MetaInfParser(object):  # pylint: disable=R0903
-    """Base Meta Inf Parser."""
+    """Base Meta Inf Parser.
+
+    Each registered field has a slot which is only filled if the field is set
+    in the meta information, unset fields read as their default from
+    META_FIELDS.
+    """
 
     #: Registered meta fields, can be overridden by inheriting class.
     META_FIELDS = MDW_META_FIELDS
 
-    #: Regular expression to extract meta field key-value pairs.
-    # can be overridden by inheriting class.
-    FIELD_VALUE_REGEX = r"^(?P<key>[a-zA-Z0-9 ]+):(?P<value>.+)$"
+    __slots__ = ('_custom_fields',) + tuple(MDW_META_FIELDS)
 
-    def __init__(self, meta_string):
-        """Initialize the parser using attributes defined in FIELD_TYPES"""
-        for attribute, attribute_details in self.META_FIELDS.items():
-            setattr(self, attribute, attribute_details[1])
+    #: Regular expression matching the key of a meta field up to and
+    # including the colon. Can be overridden by inheriting class.
+    # The lookbehind only lets a match start at the beginning of a run of key
+    # characters which keeps the search linear on lines without a colon.
+    FIELD_START_REGEX = re.compile(r'(?<![a-zA-Z0-9 ])[a-zA-Z0-9 ]+:')
+
+    #: Regular expression matching a comment line
+    COMMENT_REGEX = re.compile(r' *#')
+
+    #: Regular expression matching a line that starts a new field rather
+    # than continuing the previous one
+    WORD_START_REGEX = re.compile(r'\w')
+
+    def __init__(self, meta_string, meta_format=META_FORMAT_METAINF):
+        """Initialize the parser using attributes defined in META_FIELDS
+
+        :param meta_string: Raw meta information, YAML front matter may
+                            also be given as its loaded fields
+        :param meta_format: META_FORMAT_METAINF or META_FORMAT_YAML
+        """
+        #: Values of custom fields keyed by attribute name (custom_<key>),
+        # only created if the meta information has custom fields
+        self._custom_fields = None
+
+        if META_FORMAT_YAML == meta_format:
+            self._parse_yaml(meta_string)
+        else:
+            self._parse_meta_inf(meta_string)
+
+    @property
+    def custom_fields(self):
+        """Return the custom fields keyed by attribute name."""
+        return self._custom_fields or {}
+
+    def __getattr__(self, name):
+        """Look up meta fields, only called for unknown attributes.
+
+        Registered fields a page doesn't set read as their default, custom
+        fields a page doesn't define are None.
+        """
+        if name in self.META_FIELDS:
+            return self.META_FIELDS[name][1]
+        if name.startswith('custom_'):
+            return self.custom_fields.get(name)
 
-        self._parse_meta_inf(meta_string)
+        raise AttributeError(name)
 
     def _parse_meta_inf(self, meta_inf_string):
         """Parse given meta information string into a dictionary.
         
         Metainf fields now support multi-line values. New lines must be
         indented with at least one whitespace character.
+
+        The string is tokenized in a single pass over its lines. A line
+        starting with a word character starts a new field, any other line
+        continues the current field. Blank lines and comments are skipped.
         
         :param meta_inf_string: Raw meta content
         """
+        key = None
+        value_parts = []
+        # Does the current field have anything after the colon, including
+        # whitespace, comments or blank continuation lines?
+        has_tail = False
+        # Is the current field followed by any line? Only counts as a tail
+        # for the last field of the block.
+        continued = False
+
+        for line in meta_inf_string.split('\n'):
+            if key is not None and not self.WORD_START_REGEX.match(line):
+                # Continuation of the current field
+                has_tail = has_tail or line != ''
+                continued = True
+                stripped_line = line.strip(' \t\r')
+                if stripped_line != '' and not self.COMMENT_REGEX.match(line):
+                    value_parts.append(stripped_line)
+                continue
+
+            if key is not None:
+                self._add_meta_field(key, value_parts, has_tail)
+                key = None
 
-        # NOTE: This regex leaves blank lines and comments in but that will
-        # be handled in the line processing loop
-        line_regex = '(?P<line>[a-zA-Z0-9 ]+:(?:(?![\n]+\w)[\w\W\r\n])+)'
-        line_matches = re.findall(line_regex, meta_inf_string)
-        line_blocks = line_matches
-
-        for line_block in line_blocks:
-            # Split the line block into seperate lines and process each line
-            lines = line_block.split('\n')
-            processed_line = ''
-            for line in lines:
-                # Remove blank lines and comments
-                if line.strip(' ') == '' or re.match(r'^ *#', line):
-                    continue
-                # Strip beginning and trailing whitespace and newlines
-                line = line.strip(' \t\n\r')
-
-                processed_line += ' ' + line
-
-            match = re.search(self.FIELD_VALUE_REGEX, processed_line)
+            # Skip blank lines and comments
+            if line.strip(' \t\r') == '' or self.COMMENT_REGEX.match(line):
+                continue
+
+            match = self.FIELD_START_REGEX.search(line)
             if match is None:
-                raise PageMetaInfFieldException(
-                    "Improperly formated metainf line '%s'" % processed_line)
-
-            key = match.group('key').strip().lower().replace(' ', '_')
-            value = match.group('value').strip()
-            
-            if '' == value:
-                raise PageMetaInfFieldException(
-                    "Empty value for meta-inf field '%s'" % key)
-
-            # Cast field value to appropriate type
-            if key not in self.META_FIELDS.keys():
-                key = 'custom_' + key
-                # We have to add the new attribute to the class before we
-                # set the value to the instance below
-                setattr(MetaInfParser, key, None)
-                try:
-                    value = unicode(value)
-                except NameError:
-                    pass
-            elif 'int' == self.META_FIELDS[key][0]:
-                value = int(value)
-            elif 'date' == self.META_FIELDS[key][0]:
-                value = dateparser.parse(value)
-            elif 'bool' == self.META_FIELDS[key][0]:
-                if isinstance(value, string_types):
-                    value = value.lower() == 'true'
-                elif isinstance(value, bool):
-                    value = value
-                else:
-                    value = self.META_FIELDS[key][1]
+                # Not a field, skip the line and anything continuing it
+                continue
+
+            key = match.group()[:-1]
+            tail = line[match.end():]
+            has_tail = tail != ''
+            continued = False
+            value_parts = [tail.strip(' \t\r')]
+
+        if key is not None:
+            # A bare "Key:" line ending the block, followed by its newline,
+            # has an empty value
+            self._add_meta_field(key, value_parts, has_tail or continued)
+
+    def _parse_yaml(self, yaml_string):
+        """Parse YAML front matter.
+
+        Keys are matched to fields the same way as in metainf blocks. Values
+        keep the type YAML gives them unless the field is registered with a
+        different type. Keys without a value are ignored.
+
+        :param yaml_string: Raw YAML front matter or its loaded fields
+        """
+        if isinstance(yaml_string, dict):
+            fields = yaml_string
+        else:
+            fields = load_yaml_fields(yaml_string)
+        if fields is None:
+            raise PageMetaInfFieldException(
+                "YAML front matter must be a mapping of fields")
+
+        for key, value in fields.items():
+            if value is None:
+                continue
+            self._set_meta_field(text_type(key), value)
+
+    def _add_meta_field(self, key, value_parts, has_tail):
+        """Join the value of a tokenized field and set it.
+
+        A bare "Key:" line followed by another field, or ending the block
+        without a newline, is ignored. A key followed by nothing but
+        whitespace or newlines is an error.
+
+        :param key: Field name as written in the meta information
+        :param value_parts: Stripped lines making up the field value
+        :param has_tail: Whether anything followed the colon
+        """
+        value = ' '.join(value_parts).strip()
+        if '' == value and not has_tail:
+            return
+
+        self._set_meta_field(key, value)
+
+    def _set_meta_field(self, key, value):
+        """Cast a parsed field value and set it on the meta information.
+
+        :param key: Field name as written in the meta information
+        :param value: Raw field value
+        """
+        key = key.strip().lower().replace(' ', '_')
+
+        if '' == value:
+            raise PageMetaInfFieldException(
+                "Empty value for meta-inf field '%s'" % key)
+
+        # Cast field value to appropriate type
+        if key not in self.META_FIELDS.keys():
+            try:
+                value = unicode(value)
+            except NameError:
+                pass
+            if self._custom_fields is None:
+                self._custom_fields = {}
+            self._custom_fields['custom_' + key] = value
+            return
+        elif 'int' == self.META_FIELDS[key][0]:
+            value = int(value)
+        elif 'date' == self.META_FIELDS[key][0]:
+            if isinstance(value, datetime.datetime):
+                pass
+            elif isinstance(value, datetime.date):
+                value = datetime.datetime(value.year, value.month, value.day)
+            else:
+                value = parse_date(text_type(value))
+        elif 'list' == self.META_FIELDS[key][0]:
+            if isinstance(value, string_types):
+                value = [item.strip() for item in value.split(',')
+                         if item.strip() != '']
+            elif isinstance(value, (list, tuple)):
+                value = [text_type(item) for item in value]
+            else:
+                value = [text_type(value)]
+        elif 'bool' == self.META_FIELDS[key][0]:
+            if isinstance(value, string_types):
+                value = value.lower() == 'true'
+            elif isinstance(value, bool):
+                value = value
             else:
-                try:
-                    value = unicode(value)
-                except NameError:
-                    pass
+                value = self.META_FIELDS[key][1]
+        else:
+            if not isinstance(value, string_types):
+                value = text_type(value)
+            try:
+                value = unicode(value)
+            except NameError:
+                pass
 
-            setattr(self, key, value)
+        setattr(self, key, value)
@@ -0,0 +1,234 @@
+"""MDWeb cached syntax highlighting of fenced code blocks."""
+from collections import OrderedDict
+import codecs
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from markdown.extensions import Extension
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+
+try:
+    from pygments import highlight as pygments_highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    pygments_highlight = None
+
+#: CSS class of the highlighted code blocks
+CSS_CLASS = 'codehilite'
+
+
+def escape_code(code):
+    """Escape code for use in HTML."""
+    return code.replace('&', '&amp;').replace('<', '&lt;') \
+        .replace('>', '&gt;').replace('"', '&quot;')
+
+
+class CodeHighlighter(object):
+    """Pygments highlighter of code blocks with an LRU and disk cache.
+
+    Highlighting dominates the render time of pages with many code samples
+    and the same snippets are shared between pages. Highlighted blocks are
+    cached by their language, style and a hash of the code so a snippet is
+    highlighted once, whichever page it is on. The memory cache is kept
+    across content reloads and the optional disk cache across restarts.
+
+    Blocks without a language are escaped rather than highlighted.
+    """
+
+    def __init__(self, style=None, max_entries=1000, cache_path=None):
+        """Initialize the highlighter.
+
+        :param style: Pygments style written as inline styles, None to only
+                      mark the code with CSS classes styled by the theme
+        :param max_entries: Number of highlighted blocks kept in memory
+        :param cache_path: Directory of the disk cache, None disables it
+        """
+        self.style = style
+        self.max_entries = max_entries
+        self.cache_path = cache_path
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self._css = None
+
+        #: Number of blocks answered from the memory cache
+        self.hits = 0
+
+        #: Number of blocks answered from the disk cache
+        self.disk_hits = 0
+
+        #: Number of blocks highlighted
+        self.highlights = 0
+
+        #: Total time spent highlighting
+        self.highlight_seconds = 0.0
+
+    def __len__(self):
+        return len(self._blocks)
+
+    @staticmethod
+    def available():
+        """Check if Pygments is installed."""
+        return pygments_highlight is not None
+
+    def highlight(self, code, language=None):
+        """Return the HTML of a highlighted code block.
+
+        :param code: Code of the block
+        :param language: Pygments lexer name, None for plain text
+        """
+        if not language:
+            return '<pre><code>%s</code></pre>' % escape_code(code)
+
+        digest = hashlib.sha1(code.encode('utf-8')).hexdigest()
+        key = (language, digest, self.style)
+        with self._lock:
+            block_html = self._blocks.get(key)
+            if block_html is not None:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return block_html
+
+        block_html = self._read_disk(key)
+        if block_html is None:
+            highlight_start = time.time()
+            block_html = self._highlight(code, language)
+            with self._lock:
+                self.highlights += 1
+                self.highlight_seconds += time.time() - highlight_start
+            self._write_disk(key, block_html)
+        else:
+            with self._lock:
+                self.disk_hits += 1
+
+        with self._lock:
+            self._blocks[key] = block_html
+            while len(self._blocks) > self.max_entries:
+                self._blocks.popitem(last=False)
+        return block_html
+
+    def _highlight(self, code, language):
+        """Highlight code with Pygments, unknown languages as plain text."""
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            lexer = get_lexer_by_name('text')
+        if self.style is None:
+            formatter = HtmlFormatter(cssclass=CSS_CLASS)
+        else:
+            formatter = HtmlFormatter(cssclass=CSS_CLASS, style=self.style,
+                                      noclasses=True)
+        return pygments_highlight(code, lexer, formatter)
+
+    def _disk_path(self, key):
+        """Return the disk cache file of a block."""
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_path, name + '.html')
+
+    def _read_disk(self, key):
+        """Return a block from the disk cache or None."""
+        if self.cache_path is None:
+            return None
+        try:
+            with codecs.open(self._disk_path(key), 'r',
+                             encoding='utf8') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def _write_disk(self, key, block_html):
+        """Add a block to the disk cache.
+
+        The block is written to a temporary file which is renamed into
+        place so concurrent workers never read a partial block. Blocks which
+        can't be written are only kept in memory.
+        """
+        if self.cache_path is None:
+            return
+        try:
+            if not os.path.isdir(self.cache_path):
+                os.makedirs(self.cache_path)
+            handle, temp_path = tempfile.mkstemp(dir=self.cache_path)
+        except (IOError, OSError):
+            # The block is still kept in the memory cache
+            return
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(block_html.encode('utf-8'))
+            os.replace(temp_path, self._disk_path(key))
+        except (IOError, OSError):
+            try:
+                os.remove(temp_path)
+            except (IOError, OSError):
+                pass
+
+    def clear(self):
+        """Forget the blocks held in memory, the counters are kept."""
+        with self._lock:
+            self._blocks.clear()
+
+    def css(self):
+        """Return the CSS styling the highlighted blocks with the default
+        Pygments style.
+
+        Blocks written with inline styles or without Pygments installed
+        don't need any CSS so an empty string is returned.
+        """
+        if self.style is not None or not self.available():
+            return ''
+        if self._css is None:
+            self._css = HtmlFormatter().get_style_defs('.' + CSS_CLASS)
+        return self._css
+
+    def stats(self):
+        """Return the highlighter counters as a dictionary."""
+        return {
+            'size': len(self._blocks),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'highlights': self.highlights,
+            'highlight_seconds': self.highlight_seconds,
+        }
+
+
+class HighlightedFencedBlockPreprocessor(FencedBlockPreprocessor):
+    """Fenced code block preprocessor highlighting through a
+    CodeHighlighter."""
+
+    def __init__(self, md, highlighter):
+        super(HighlightedFencedBlockPreprocessor, self).__init__(md)
+        self.highlighter = highlighter
+
+    def run(self, lines):
+        """Match fenced code blocks and store their highlighted HTML."""
+        text = "\n".join(lines)
+        while True:
+            match = self.FENCED_BLOCK_RE.search(text)
+            if match is None:
+                break
+            block_html = self.highlighter.highlight(match.group('code'),
+                                                    match.group('lang'))
+            placeholder = self.md.htmlStash.store(block_html)
+            text = '%s\n%s\n%s' % (text[:match.start()], placeholder,
+                                   text[match.end():])
+        return text.split("\n")
+
+
+class CodeHighlightExtension(Extension):
+    """Markdown extension rendering fenced code blocks with a
+    CodeHighlighter."""
+
+    def __init__(self, highlighter, **kwargs):
+        self.highlighter = highlighter
+        super(CodeHighlightExtension, self).__init__(**kwargs)
+
+    def extendMarkdown(self, md):  # pylint: disable=C0103
+        """Register the fenced code block preprocessor."""
+        md.registerExtension(self)
+        md.preprocessors.register(
+            HighlightedFencedBlockPreprocessor(md, self.highlighter),
+            'fenced_code_block', 25)
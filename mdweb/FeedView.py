@@ -0,0 +1,244 @@
+"""MDWeb RSS and Atom Feed View Object."""
+import hashlib
+import threading
+import time
+
+from flask import (
+    abort,
+    current_app as app,
+    make_response,
+    request,
+    url_for,
+)
+from flask.views import View
+from werkzeug.http import http_date
+
+from mdweb.SiteMapView import render_stream
+from mdweb.dates import to_utc
+
+#: Template string for RSS 2.0 feeds
+RSS_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
+  <channel>
+    <title>{{ title|e }}</title>
+    <link>{{ link|e }}</link>
+    <description>{{ description|e }}</description>
+    <atom:link href="{{ feed_url|e }}" rel="self" type="application/rss+xml"/>
+    {%- if entries %}
+    <lastBuildDate>{{ entries[0].rfc822_date }}</lastBuildDate>
+    {%- endif %}
+    {%- for entry in entries %}
+    <item>
+      <title>{{ entry.title|e }}</title>
+      <link>{{ entry.link|e }}</link>
+      <guid>{{ entry.link|e }}</guid>
+      <pubDate>{{ entry.rfc822_date }}</pubDate>
+      {%- if entry.description %}
+      <description>{{ entry.description|e }}</description>
+      {%- endif %}
+    </item>
+    {%- endfor %}
+  </channel>
+</rss>
+"""
+
+#: Template string for Atom feeds
+ATOM_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>{{ title|e }}</title>
+  {%- if description %}
+  <subtitle>{{ description|e }}</subtitle>
+  {%- endif %}
+  <link href="{{ link|e }}"/>
+  <link href="{{ feed_url|e }}" rel="self"/>
+  <id>{{ feed_url|e }}</id>
+  <updated>{{ entries[0].iso_date if entries else updated }}</updated>
+  {%- for entry in entries %}
+  <entry>
+    <title>{{ entry.title|e }}</title>
+    <link href="{{ entry.link|e }}"/>
+    <id>{{ entry.link|e }}</id>
+    <updated>{{ entry.iso_date }}</updated>
+    {%- if entry.author %}
+    <author><name>{{ entry.author|e }}</name></author>
+    {%- endif %}
+    {%- if entry.description %}
+    <summary>{{ entry.description|e }}</summary>
+    {%- endif %}
+  </entry>
+  {%- endfor %}
+</feed>
+"""
+
+#: Template and content type of each feed format
+FEED_FORMATS = {
+    'rss': (RSS_TEMPLATE, 'application/rss+xml; charset=utf-8'),
+    'atom': (ATOM_TEMPLATE, 'application/atom+xml; charset=utf-8'),
+}
+
+
+class FeedCache(object):
+    """Rendered feeds shared by every FeedView instance.
+
+    Feed readers poll constantly so each feed is rendered once per content
+    generation together with its ETag and Last-Modified date. Requests are
+    then answered from the cache, usually with a 304 Not Modified.
+
+    The Last-Modified date of a feed is the time it was first rendered with
+    its current content. It only moves forward, so a feed losing its newest
+    page isn't dated back to an older one and readers only sending
+    If-Modified-Since still get the change.
+    """
+
+    def __init__(self):
+        """Initialize an empty feed cache."""
+        self._lock = threading.Lock()
+
+        #: Tuple of (content generation, dictionary of feeds by (navigation
+        # path, format, index url)). Each feed is a tuple of (XML, ETag,
+        # Last-Modified timestamp).
+        self._entry = (None, {})
+
+        #: Tuple of (ETag, Last-Modified timestamp) of the last rendering of
+        # each feed, kept across content generations
+        self._last_modified = {}
+
+    def get(self, site, path, feed_format, index_url):
+        """Return a feed, rendering it if it is stale.
+
+        :param site: MDSite the feed is generated for
+        :param path: URL path of the navigation level
+        :param feed_format: 'rss' or 'atom'
+        :param index_url: External URL of the site index
+        :return: Tuple of (XML, ETag, Last-Modified timestamp) or None if
+                 there is no such navigation level
+        """
+        key = (path, feed_format, index_url)
+        generation, feeds = self._entry
+        if generation == site.content_generation and key in feeds:
+            return feeds[key]
+
+        with self._lock:
+            # Read the generation before the navigation so a reload during
+            # rendering leaves the feed stale, not wrong.
+            generation = site.content_generation
+            if self._entry[0] != generation:
+                self._entry = (generation, {})
+            feeds = self._entry[1]
+            if key not in feeds:
+                feed = self._build(site, path, feed_format, index_url)
+                if feed is None:
+                    # Unknown paths aren't cached so they can't fill it
+                    return None
+                xml, etag = feed
+                feeds[key] = (xml, etag, self._modified(key, etag))
+            return feeds[key]
+
+    def _modified(self, key, etag):
+        """Return the Last-Modified timestamp of a rendered feed, the lock
+        must be held."""
+        previous = self._last_modified.get(key)
+        if previous is not None and previous[0] == etag:
+            return previous[1]
+        last_modified = int(time.time())
+        if previous is not None:
+            # Dates have a resolution of a second, a change in the same
+            # second must still be newer
+            last_modified = max(last_modified, previous[1] + 1)
+        self._last_modified[key] = (etag, last_modified)
+        return last_modified
+
+    @staticmethod
+    def _build(site, path, feed_format, index_url):
+        """Render a feed of the newest published pages of a navigation
+        level and the levels below it.
+
+        :return: Tuple of (XML, ETag) or None if there is no such
+                 navigation level
+        """
+        nav = find_navigation(site.navigation, path)
+        if nav is None:
+            return None
+
+        max_items = site.config['FEED_ITEMS']
+        entries = []
+        for page in site.meta_index.dated_pages:
+            if len(entries) >= max_items:
+                break
+            if path and page.url_path != path and \
+                    not page.url_path.startswith(path + '/'):
+                continue
+            date = to_utc(page.meta_inf.date)
+            entries.append({
+                'title': page.meta_inf.title or page.url_path,
+                'link': index_url + page.url_path,
+                'author': page.meta_inf.author,
+                'description': page.meta_inf.description or
+                page.meta_inf.teaser,
+                'rfc822_date': http_date(date),
+                'iso_date': date.isoformat() + 'Z',
+            })
+
+        meta_inf = nav.page.meta_inf if nav.page is not None else None
+        feed_path = path + '/' if path else ''
+        xml = render_stream(
+            FEED_FORMATS[feed_format][0],
+            title=(meta_inf and meta_inf.title) or nav.name or
+            site.site_name,
+            description=(meta_inf and meta_inf.description) or '',
+            link=index_url + path,
+            feed_url='%s%s%s.xml' % (index_url, feed_path, feed_format),
+            updated='1970-01-01T00:00:00Z',
+            entries=entries)
+
+        return xml, hashlib.md5(xml).hexdigest()
+
+
+def find_navigation(navigation, path):
+    """Find the navigation level of a URL path.
+
+    :param navigation: Top navigation level
+    :param path: URL path of the level, '' for the top level
+    :return: Navigation level or None
+    """
+    if not path:
+        return navigation
+    for child_nav in navigation.child_navs:
+        child_path = child_nav.path.strip('/')
+        if path == child_path:
+            return child_nav
+        if path.startswith(child_path + '/'):
+            return find_navigation(child_nav, path)
+    return None
+
+
+class FeedView(View):
+    """RSS and Atom feed View Object.
+
+    Feeds list the newest published pages with a date of a navigation
+    level, including the levels below it.
+    """
+
+    methods = ['GET']
+
+    def __init__(self, feed_format='rss'):
+        """Initialize the view.
+
+        :param feed_format: 'rss' or 'atom'
+        """
+        self.feed_format = feed_format
+
+    def dispatch_request(self, path=''):  # pylint: disable=W0221
+        """Flask dispatch method."""
+        index_url = url_for('index', _external=True)
+        feed = app.feed_cache.get(app, path.strip('/'), self.feed_format,
+                                  index_url)
+        if feed is None:
+            abort(404)
+
+        xml, etag, last_modified = feed
+        response = make_response(xml)
+        response.headers['Content-Type'] = FEED_FORMATS[self.feed_format][1]
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response.make_conditional(request)
@@ -1,6 +1,13 @@
 """MDWeb Index View."""
 from flask.views import View
-from flask import render_template, abort, current_app as app
+from flask import (
+    abort,
+    current_app as app,
+    g,
+    make_response,
+    render_template,
+    request,
+)
 
 
 class Index(View):
@@ -33,6 +40,27 @@ class Index(View):
             page = app.get_page(path)
 
             if page is None:
+                # Remember the path so the next request skips the lookup
+                app.not_found_cache.add(path.strip('/'))
                 abort(404)
 
-        return self.render(page)
+        # Listing pages (using the paginate filter) are cached per page
+        listing_key = (page.url_path, request.args.get('page'))
+        listing = app.listing_cache.get(listing_key)
+        if listing is None:
+            page_html = self.render(page)
+            pagination = g.get('pagination')
+            if pagination is None:
+                return page_html
+
+            listing = (page_html, pagination.link_header())
+            if not app.config['DEBUG_HELPER'] and \
+                    app.config['LISTING_CACHE_SIZE'] > 0:
+                if len(app.listing_cache) >= app.config['LISTING_CACHE_SIZE']:
+                    app.listing_cache.clear()
+                app.listing_cache[listing_key] = listing
+
+        response = make_response(listing[0])
+        if listing[1] is not None:
+            response.headers['Link'] = listing[1]
+        return response
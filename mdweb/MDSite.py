@@ -1,10 +1,12 @@
 """The MDWeb Site object."""
 import blinker
+import heapq
 import jinja2
 import json
 import logging
 import os
 import six
+import time
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 from werkzeug.debug import get_current_traceback
@@ -16,15 +18,27 @@ else:
 from flask import (
     Flask,
     abort,
+    g,
     request,
     send_file,
     send_from_directory,
 )
+from werkzeug.exceptions import NotFound
 
+from mdweb.CodeHighlighter import CodeHighlighter
+from mdweb.Exceptions import ConfigException
+from mdweb.FeedView import FeedCache, FeedView
 from mdweb.Index import Index
-from mdweb.SiteMapView import SiteMapView
+from mdweb.MetaIndex import MetaIndex
+from mdweb.SiteMapView import SiteMapCache, SiteMapView
 from mdweb.Navigation import Navigation
-from mdweb.Page import Page, load_page
+from mdweb.NotFoundCache import NotFoundCache
+from mdweb.Page import Page, load_page, SOURCE_RETENTION_MODES
+from mdweb.PageHTMLStore import PageHTMLStore
+from mdweb.Pagination import Pagination
+from mdweb.SearchIndex import SearchIndex
+from mdweb.SQLiteStore import SQLiteStore
+from mdweb.SearchView import SearchView
 from mdweb.metafields import META_FIELDS
 
 # Shim Python 3.x Exceptions
@@ -47,6 +61,10 @@ MDW_SIGNALER = {
 path_to_here = os.path.dirname(os.path.realpath(__file__))
 BASE_PATH = os.path.abspath(os.path.join(path_to_here, os.pardir))
 
+#: Select the top pages with a heap instead of sorting when the requested page
+# count is less than the list length divided by this ratio
+TOP_K_RATIO = 4
+
 BASE_SETTINGS = {
     #: enable/disable Flask debug mode
     'DEBUG': False,
@@ -73,7 +91,75 @@ BASE_SETTINGS = {
 
     #: Debug helper for exposing context variables, config and other useful
     # information in the browser. Helpful for plugin and them development.
-    'DEBUG_HELPER': False
+    'DEBUG_HELPER': False,
+
+    #: Maximum number of URLs in one sitemap. Larger sites are split into
+    # sitemap-N.xml shards listed by a sitemap index at sitemap.xml.
+    'SITEMAP_MAX_URLS': 50000,
+
+    #: Number of unknown page paths to remember so repeated requests for them
+    # are answered with the cached 404 without a page lookup. 0 disables the
+    # cache.
+    'NOT_FOUND_CACHE_SIZE': 10000,
+
+    #: Only read the meta information of pages at boot, page bodies are read
+    # and rendered when a page is first viewed
+    'DEFER_PAGE_BODIES': False,
+
+    #: What pages do with their markdown source once it is rendered to HTML.
+    # 'keep' holds it in memory, 'compress' holds it zlib compressed and
+    # 'drop' releases it, the debug helper then reads it from disk.
+    'PAGE_SOURCE_RETENTION': 'keep',
+
+    #: Memory budget in bytes for rendered page HTML. Once exceeded the HTML
+    # of the least recently viewed pages is evicted and rendered again when
+    # next viewed. 0 keeps the HTML of every page in memory.
+    'PAGE_HTML_BUDGET': 0,
+
+    #: Custom meta fields, named without the custom_ prefix, that the meta
+    # index groups published pages by in addition to author and tags
+    'META_INDEX_FIELDS': [],
+
+    #: Number of pages on each page of a listing using the paginate filter
+    'PAGINATION_PER_PAGE': 10,
+
+    #: Number of rendered listing pages (pages using the paginate filter)
+    # to cache, 0 disables the cache
+    'LISTING_CACHE_SIZE': 1000,
+
+    #: Preview mode serves unpublished pages and navigation levels. Otherwise
+    # they are removed from the navigation and can't be requested, and the
+    # bodies of unpublished pages are never read or rendered.
+    'PREVIEW': False,
+
+    #: Index the served pages for full-text search and answer /search?q=
+    'SEARCH_ENABLED': False,
+
+    #: Maximum number of search results
+    'SEARCH_RESULTS': 20,
+
+    #: Highlight the syntax of fenced code blocks with a language using
+    # Pygments, for example ```python
+    'CODE_HIGHLIGHT': False,
+
+    #: Pygments style written into the highlighted code as inline styles.
+    # None only marks the code with CSS classes for the theme to style.
+    'CODE_HIGHLIGHT_STYLE': None,
+
+    #: Number of highlighted code blocks kept in memory across reloads
+    'CODE_HIGHLIGHT_CACHE_SIZE': 1000,
+
+    #: Directory caching highlighted code blocks across restarts, None
+    # disables the disk cache
+    'CODE_HIGHLIGHT_CACHE_PATH': None,
+
+    #: Number of pages in the RSS and Atom feeds
+    'FEED_ITEMS': 20,
+
+    #: Path of a SQLite file holding the page metadata and search index,
+    # shared by all the workers on the host instead of every worker holding
+    # a search index. None disables the store.
+    'SQLITE_STORE_PATH': None,
 }
 
 BASE_SITE_OPTIONS = {
@@ -105,9 +191,20 @@ class MDSite(Flask):
         'robots.txt',
     ]
 
-    #: Navigation structure
+    #: HTTP error codes handled by the site. A content file named after the
+    # code (e.g. 404.md) is used as a custom error page.
+    ERROR_CODES = [400, 403, 404, 405, 410, 500, 501, 503]
+
+    #: Maximum number of page list orderings memoized by the sorted_pages
+    # filter per content generation
+    SORTED_PAGES_CACHE_SIZE = 256
+
+    #: Navigation structure, without unpublished items unless in preview mode
     navigation = None
 
+    #: Navigation structure including unpublished items
+    full_navigation = None
+
     # pylint: disable=W0231
     def __init__(self, site_name, app_options=None, site_options=None):
         """Initialize the Flask application and start the app.
@@ -123,10 +220,41 @@ class MDSite(Flask):
         self.site_options = BASE_SITE_OPTIONS
         self.site_options.update({} if site_options is None else site_options)
         self.pages = []
+        self.page_index = {}
+        self.meta_index = None
+        self.search_index = None
+        self.sqlite_store = None
+        self.sorted_pages_cache = {}
+        self.listing_cache = {}
+        self.boot_stats = {}
+        self.error_pages = {}
+        self.error_page_cache = {}
         self.content_observer = None
         self.theme_observer = None
         self.navigation = None
 
+        #: Incremented every time the content is (re)scanned. Caches derived
+        # from the content are only valid for the generation they were
+        # built from.
+        self.content_generation = 0
+
+        #: Rendered sitemap, shared between requests and content reloads
+        self.sitemap_cache = SiteMapCache()
+
+        #: Rendered RSS and Atom feeds, rebuilt after every content reload
+        self.feed_cache = FeedCache()
+
+        #: Paths known to have no page, cleared on every content reload
+        self.not_found_cache = NotFoundCache()
+
+        #: Rendered page HTML when PAGE_HTML_BUDGET is set, cleared on every
+        # content reload
+        self.page_html_store = PageHTMLStore()
+
+        #: Highlighted code blocks when CODE_HIGHLIGHT is set, kept across
+        # content reloads
+        self.code_highlighter = CodeHighlighter()
+
         self.start()
         if not self.config['TESTING']:
             self._register_observers()
@@ -154,9 +282,69 @@ class MDSite(Flask):
 
         #: SETUP NAVIGATION
         MDW_SIGNALER['pre-navigation-scan'].send(self)
-        self.navigation = Navigation(self.config['CONTENT_PATH'])
+        self.page_html_store.max_bytes = self.config['PAGE_HTML_BUDGET']
+        self.page_html_store.clear()
+        self._configure_code_highlighter()
+        highlights = self.code_highlighter.highlights
+        scan_start = time.time()
+        self.full_navigation = Navigation(self.config['CONTENT_PATH'],
+                                          scan_options=self._scan_options())
+        if self.config['PREVIEW']:
+            self.navigation = self.full_navigation
+        else:
+            self.navigation = self.full_navigation.published_view()
         self.pages = self.navigation.get_page_dict()
+        self.page_index = dict((url_path.strip('/'), page)
+                               for url_path, page in self.pages.items())
+        self.meta_index = MetaIndex(self.pages.values(),
+                                    self.config['META_INDEX_FIELDS'])
+        self.sorted_pages_cache = {}
+        self.listing_cache = {}
+        self.boot_stats = dict(self.navigation.scan_stats,
+                               scan_seconds=time.time() - scan_start)
+        if self.config['SQLITE_STORE_PATH']:
+            self._update_sqlite_store()
+        else:
+            self.sqlite_store = None
+        if self.config['SEARCH_ENABLED'] and self.sqlite_store is not None:
+            self.search_index = None
+            self.add_url_rule('/search',
+                              view_func=SearchView.as_view('search'))
+        elif self.config['SEARCH_ENABLED']:
+            # Only pages changed since the last scan are tokenized again
+            search_start = time.time()
+            self.search_index = SearchIndex(self.pages.values(),
+                                            previous=self.search_index)
+            self.add_url_rule('/search',
+                              view_func=SearchView.as_view('search'))
+            logging.info("Indexed %s pages for search (%s tokenized) in "
+                         "%.3f seconds", len(self.search_index),
+                         self.search_index.pages_tokenized,
+                         time.time() - search_start)
+        else:
+            self.search_index = None
+        self.boot_stats['unpublished_seconds_saved'] = \
+            self._estimate_seconds_saved(self.boot_stats)
+        self.boot_stats['code_blocks_highlighted'] = \
+            self.code_highlighter.highlights - highlights
+        logging.info("Scanned %(pages)s pages in %(scan_seconds).3f seconds, "
+                     "read %(bytes_read)s of %(bytes_total)s bytes, "
+                     "released %(source_bytes_released)s bytes of source, "
+                     "skipped %(unpublished_skipped)s unpublished pages "
+                     "saving about %(unpublished_seconds_saved).3f seconds, "
+                     "highlighted %(code_blocks_highlighted)s code blocks",
+                     self.boot_stats)
+        self._report_not_found()
+        self._report_html_store()
+        self.error_pages = self._load_error_pages()
+        self.error_page_cache = {}
+        self.not_found_cache.max_size = self.config['NOT_FOUND_CACHE_SIZE']
+        self.not_found_cache.clear()
+        self.content_generation += 1
         self.context_processor(self._inject_navigation)
+        self.context_processor(self._inject_meta_index)
+        self.context_processor(self._inject_sqlite_store)
+        self.context_processor(self._inject_code_highlight_css)
         self.context_processor(self._inject_ga_tracking)
         self.context_processor(self._inject_debug_helper)
         self.context_processor(self._inject_current_page)
@@ -167,17 +355,121 @@ class MDSite(Flask):
         self._stage_post_boot()
         MDW_SIGNALER['post-boot'].send(self)
 
+    def _update_sqlite_store(self):
+        """Open the SQLite store and write the pages changed since the last
+        update."""
+        path = self.config['SQLITE_STORE_PATH']
+        if not path.startswith('/'):
+            path = os.path.join(self.config['BASE_PATH'], path)
+
+        if self.sqlite_store is None or self.sqlite_store.path != path:
+            self.sqlite_store = SQLiteStore(path)
+        store_stats = self.sqlite_store.update(self.pages.values())
+        self.boot_stats['store_pages_written'] = store_stats['written']
+        logging.info("Updated SQLite store %s, wrote %s pages, removed %s, "
+                     "%s unchanged", path, store_stats['written'],
+                     store_stats['removed'], store_stats['unchanged'])
+
+    def search(self, query, count):
+        """Find the served pages best matching a query.
+
+        :param query: Search query
+        :param count: Maximum number of results
+        :return: List of (page, score) tuples, best match first
+        """
+        if self.sqlite_store is None:
+            return self.search_index.search(query, count)
+
+        results = self.sqlite_store.search(
+            query, count, published_only=not self.config['PREVIEW'])
+        return [(self.page_index[url_path], score)
+                for url_path, score in results if url_path in self.page_index]
+
+    def _scan_options(self):
+        """Build the navigation scan options from the config."""
+        if self.config['PAGE_SOURCE_RETENTION'] not in SOURCE_RETENTION_MODES:
+            raise ConfigException(
+                "PAGE_SOURCE_RETENTION must be one of %s, got '%s'" %
+                (', '.join(SOURCE_RETENTION_MODES),
+                 self.config['PAGE_SOURCE_RETENTION']))
+
+        return {
+            'defer_body': self.config['DEFER_PAGE_BODIES'],
+            'source_retention': self.config['PAGE_SOURCE_RETENTION'],
+            'html_store': self.page_html_store
+            if self.config['PAGE_HTML_BUDGET'] > 0 else None,
+            'skip_unpublished': not self.config['PREVIEW'],
+            'code_highlighter': self.code_highlighter
+            if self.config['CODE_HIGHLIGHT'] else None,
+        }
+
+    def _configure_code_highlighter(self):
+        """Apply the code highlighting settings to the highlighter."""
+        if not self.config['CODE_HIGHLIGHT']:
+            return
+        if not self.code_highlighter.available():
+            raise ConfigException("CODE_HIGHLIGHT requires Pygments to be "
+                                  "installed")
+
+        cache_path = self.config['CODE_HIGHLIGHT_CACHE_PATH']
+        if cache_path is not None and not cache_path.startswith('/'):
+            cache_path = os.path.join(self.config['BASE_PATH'], cache_path)
+        self.code_highlighter.style = self.config['CODE_HIGHLIGHT_STYLE']
+        self.code_highlighter.max_entries = \
+            self.config['CODE_HIGHLIGHT_CACHE_SIZE']
+        self.code_highlighter.cache_path = cache_path
+
+    def _report_not_found(self):
+        """Add the not found counters of the process to the boot stats."""
+        stats = self.not_found_cache.stats()
+        for key in ('hits', 'misses', 'other'):
+            self.boot_stats['not_found_' + key] = stats[key]
+        if stats['not_found'] or stats['other']:
+            logging.info("Answered %(not_found)s unknown page paths, "
+                         "%(hits)s (%(hit_rate).1f%%) from the not found "
+                         "cache, and %(other)s other not found requests",
+                         dict(stats, hit_rate=stats['hit_rate'] * 100))
+
+    def _report_html_store(self):
+        """Add the page HTML store counters to the boot stats.
+
+        The hits, misses and re-render times are counted since the process
+        started, the resident size is the HTML rendered during the scan.
+        """
+        stats = self.page_html_store.stats()
+        for key in ('resident_bytes', 'hits', 'misses', 'hit_rate',
+                    'mean_render_seconds', 'evictions'):
+            self.boot_stats['html_store_' + key] = stats[key]
+        if stats['max_bytes']:
+            logging.info("Page HTML store holds %(size)s pages in "
+                         "%(resident_bytes)s of %(max_bytes)s bytes, "
+                         "%(hits)s hits (%(hit_rate).1f%%), %(renders)s "
+                         "renders taking %(mean_render_seconds).3f seconds "
+                         "on average, %(evictions)s evictions",
+                         dict(stats, hit_rate=stats['hit_rate'] * 100))
+
+    @staticmethod
+    def _estimate_seconds_saved(scan_stats):
+        """Estimate the time saved by not rendering unpublished pages.
+
+        Skipped pages are assumed to take as long to read and render as the
+        mean of the pages rendered during the scan.
+
+        :param scan_stats: Navigation scan statistics
+        :return: Estimated seconds saved
+        """
+        if scan_stats['pages_rendered'] == 0:
+            return 0.0
+        return scan_stats['unpublished_skipped'] * \
+            scan_stats['render_seconds'] / scan_stats['pages_rendered']
+
     def get_page(self, url_path):
         """Lookup the page for the given url path.
 
         :param url_path:
         :return: Page object matching the requested url path
         """
-        for page_url, page in self.pages.items():
-            if page.url_path.strip('/') == url_path.strip('/'):
-                return page
-
-        return None
+        return self.page_index.get(url_path.strip('/'))
 
     def get_page_from_request(self, req):
         """Lookup the page given a request object.
@@ -190,9 +482,14 @@ class MDSite(Flask):
     def error_page(self, error):
         """Show custom error pages.
 
+        Custom error pages are parsed when the content is scanned. Their
+        rendered HTML is cached for the content generation unless the render
+        depends on the requested page (e.g. a 405 on an existing page) or the
+        debug helper is enabled.
+
         :param error:
         """
-        def render_custom_error(code, path):
+        def render_custom_error(code):
             """Render an error page with a custom content file."""
             if code == 500:
                 track = get_current_traceback(skip=1, show_hidden_frames=True,
@@ -200,8 +497,15 @@ class MDSite(Flask):
                 if not self.site_options['testing']:
                     track.log()
 
-            page = Page(*load_page(self.config['CONTENT_PATH'], path))
-            return Index.render(page), code
+            cacheable = not self.config['DEBUG_HELPER'] and \
+                self.get_page_from_request(request) is None
+            if cacheable and code in self.error_page_cache:
+                return self.error_page_cache[code], code
+
+            error_html = Index.render(self.error_pages[code]).encode('utf-8')
+            if cacheable:
+                self.error_page_cache[code] = error_html
+            return error_html, code
 
         def render_simple_error(code):
             """Render an error page without a content file."""
@@ -224,17 +528,49 @@ class MDSite(Flask):
         else:
             error_code = error.code
 
-        # Construct the path to the content file for this error
-        custom_file_path = os.path.join(self.config['CONTENT_PATH'],
-                                        '%s.md' % error_code)
+        # Page lookups count themselves in the not found cache
+        if error_code == 404 and \
+                request.endpoint not in ('index', 'index_with_path'):
+            self.not_found_cache.count_other()
 
         # If there exists a file for this error use it, otherwise just return
         # a simple error message
-        if os.path.isfile(custom_file_path):
-            return render_custom_error(error_code, custom_file_path)
+        if error_code in self.error_pages:
+            return render_custom_error(error_code)
         else:
             return render_simple_error(error_code)
 
+    def _not_found_fast_path(self):
+        """Answer requests for paths known to have no page.
+
+        Registered as a before_request handler, a hit skips the page lookup,
+        the Index view and the error handler.
+        """
+        if request.endpoint not in ('index', 'index_with_path'):
+            return None
+
+        path = request.view_args.get('path', '').strip('/')
+        if not self.not_found_cache.hit(path):
+            return None
+
+        if 404 in self.error_page_cache:
+            return self.error_page_cache[404], 404
+        return self.error_page(NotFound())
+
+    def _load_error_pages(self):
+        """Parse the custom error page content files.
+
+        :return: Dictionary of error code to Page object
+        """
+        error_pages = {}
+        for code in self.ERROR_CODES:
+            path = os.path.join(self.config['CONTENT_PATH'], '%s.md' % code)
+            if os.path.isfile(path):
+                error_pages[code] = Page(*load_page(
+                    self.config['CONTENT_PATH'], path))
+
+        return error_pages
+
     def _register_observers(self):
         """Setup a watcher to rebuild the nav whenever a file has changed."""
         _this = self
@@ -310,9 +646,28 @@ class MDSite(Flask):
         self.add_url_rule('/contentassets/<path:asset_filename>',
                           view_func=custom_static)
 
-        # Sitemap route
+        # Sitemap routes
         self.add_url_rule('/sitemap.xml',
                           view_func=SiteMapView.as_view('sitemap'))
+        self.add_url_rule('/sitemap-<int:shard>.xml',
+                          view_func=SiteMapView.as_view('sitemap_shard'))
+        self.add_url_rule('/sitemap.xml.gz',
+                          view_func=SiteMapView.as_view('sitemap_gz',
+                                                        gzipped=True))
+        self.add_url_rule('/sitemap-<int:shard>.xml.gz',
+                          view_func=SiteMapView.as_view('sitemap_shard_gz',
+                                                        gzipped=True))
+
+        # Feed routes, one of each format per navigation level
+        for feed_format in ['rss', 'atom']:
+            self.add_url_rule('/%s.xml' % feed_format,
+                              view_func=FeedView.as_view(
+                                  'feed_%s' % feed_format,
+                                  feed_format=feed_format))
+            self.add_url_rule('/<path:path>/%s.xml' % feed_format,
+                              view_func=FeedView.as_view(
+                                  'feed_%s_with_path' % feed_format,
+                                  feed_format=feed_format))
 
         # Route all remaining requests to the index view
         self.add_url_rule('/', view_func=Index.as_view('index'),
@@ -320,8 +675,11 @@ class MDSite(Flask):
         self.add_url_rule('/<path:path>',
                           view_func=Index.as_view('index_with_path'))
 
+        # Answer known unknown paths before they reach the Index view
+        self.before_request(self._not_found_fast_path)
+
         # Setup error handler
-        for code in [400, 403, 404, 405, 410, 500, 501, 503, Exception]:
+        for code in self.ERROR_CODES + [Exception]:
             # self.error_handler_spec[None][code] = self.error_page
             self.register_error_handler(code, self.error_page)
 
@@ -369,8 +727,11 @@ class MDSite(Flask):
         ])
         self.jinja_loader = my_loader
 
-        self.jinja_env.filters['sorted_pages'] = self._sorted_pages_filter
+        self.jinja_env.filters['sorted_pages'] = \
+            self._memoized_sorted_pages_filter
+        self.jinja_env.filters['paginate'] = self._paginate_filter
         self.jinja_env.filters['published'] = self._published_filter
+        self.jinja_env.filters['pages'] = self._pages_filter
 
         # Extend the content path to the absolute path
         if not self.config['CONTENT_PATH'].startswith('/'):
@@ -395,12 +756,30 @@ class MDSite(Flask):
 
     def _stage_post_boot(self):
         """Do post-boot tasks."""
-        pass
+        # Warm the sitemap for the new content outside of the request cycle
+        if not self.config['TESTING']:
+            self.sitemap_cache.rebuild_async(self)
 
     def _inject_navigation(self):
         """Inject the entire navigation structure into the context"""
         return dict(navigation=self.navigation)
 
+    def _inject_meta_index(self):
+        """Inject the meta index of published pages into the context"""
+        return dict(meta_index=self.meta_index)
+
+    def _inject_sqlite_store(self):
+        """Inject the SQLite store, if configured, into the context"""
+        return dict(sqlite_store=self.sqlite_store)
+
+    def _inject_code_highlight_css(self):
+        """Inject the CSS of highlighted code blocks, if highlighting with
+        CSS classes, into the context"""
+        code_highlight_css = ''
+        if self.config['CODE_HIGHLIGHT']:
+            code_highlight_css = self.code_highlighter.css()
+        return dict(code_highlight_css=code_highlight_css)
+
     def _inject_ga_tracking(self):
         """Render the Google Analytics tracking code if enabled and add to the
         context.
@@ -509,10 +888,19 @@ class MDSite(Flask):
         return dict(current_page=page)
 
     @staticmethod
-    def _sorted_pages_filter(page_list, attribute, page_count, reverse):
+    def _sorted_pages_filter(page_list, attribute, page_count=None,
+                             reverse=False):
+        """Sort pages by a meta field, pages without it sort by order.
+
+        A few pages out of a long list are selected with a heap rather than
+        sorting the whole list. Any iterable of pages is accepted, such as
+        the output of the published filter.
+        """
+        if not isinstance(page_list, (list, tuple)):
+            page_list = list(page_list)
+
         def key_getter(d):
-            v = getattr(d.meta_inf, attribute) \
-                if hasattr(d.meta_inf, attribute) else d.meta_inf.order
+            v = getattr(d.meta_inf, attribute, None)
             if v is None:
                 return d.meta_inf.order
             elif isinstance(v, six.string_types):
@@ -520,11 +908,95 @@ class MDSite(Flask):
             else:
                 return v
 
+        if page_count is not None and \
+                page_count * TOP_K_RATIO < len(page_list):
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            return select(page_count, page_list, key=key_getter)
+
         l = sorted(page_list, key=key_getter, reverse=reverse)
         if page_count is not None:
             l = l[0:page_count]
         return l
 
+    def _memoized_sorted_pages_filter(self, page_list, attribute,
+                                      page_count=None, reverse=False):
+        """Template filter version of _sorted_pages_filter.
+
+        The full ordering of each page list is memoized for the content
+        generation so repeated renders only slice it.
+        """
+        ordering = self._page_ordering(page_list, attribute, reverse,
+                                       page_count)
+        if page_count is not None:
+            ordering = ordering[0:page_count]
+        return list(ordering)
+
+    def _page_ordering(self, page_list, attribute, reverse,
+                       page_count=None):
+        """Return the memoized ordering of a page list.
+
+        Orderings are memoized by the pages in the list rather than by the
+        list itself, so lists built on every render such as a navigation
+        level's children or the output of the published filter reuse them.
+        The key holds the pages, so their ids can't be reused until the next
+        content scan clears the cache. With a page_count only that many
+        pages are selected, unless the full ordering is already memoized.
+        Once the cache is full nothing more is memoized until the next
+        content scan.
+
+        :return: Tuple of the ordered pages
+        """
+        pages = tuple(page_list)
+        ordering = self.sorted_pages_cache.get((pages, attribute, reverse,
+                                                None))
+        if ordering is not None:
+            return ordering
+
+        key = (pages, attribute, reverse, page_count)
+        ordering = self.sorted_pages_cache.get(key)
+        if ordering is None:
+            ordering = tuple(self._sorted_pages_filter(pages, attribute,
+                                                       page_count, reverse))
+            if len(self.sorted_pages_cache) < self.SORTED_PAGES_CACHE_SIZE:
+                self.sorted_pages_cache[key] = ordering
+        return ordering
+
+    def _paginate_filter(self, page_list, per_page=None, attribute=None,
+                         reverse=False):
+        """Return the page of a listing requested with ?page=N.
+
+        The listing is optionally ordered like sorted_pages. Requests for a
+        page past the end of the listing are not found.
+
+        :param page_list: Pages in the listing, any iterable of pages
+        :param per_page: Pages on each page, PAGINATION_PER_PAGE by default
+        :param attribute: Meta field to order the listing by
+        :param reverse: Reverse the order
+        :return: Pagination object
+        """
+        if per_page is None:
+            per_page = self.config['PAGINATION_PER_PAGE']
+
+        page_arg = request.args.get('page', '1')
+        if not page_arg.isdigit() or int(page_arg) < 1:
+            abort(404)
+
+        if attribute is not None:
+            page_list = self._page_ordering(page_list, attribute, reverse)
+        elif not isinstance(page_list, (list, tuple)):
+            page_list = list(page_list)
+
+        pagination = Pagination(page_list, int(page_arg), per_page,
+                                request.path)
+        if pagination.page > pagination.pages:
+            abort(404)
+
+        # Picked up by the Index view for the Link header and render cache,
+        # the first listing on a page sets the Link header
+        if g.get('pagination') is None:
+            g.pagination = pagination
+        return pagination
+
     def _inject_opengraph(self):
         """Inject Opengraph tags into the context"""
         page = self.get_page_from_request(request)
@@ -539,6 +1011,11 @@ class MDSite(Flask):
 
         return {'opengraph': og_code}
 
+    def _pages_filter(self, url_paths):
+        """Look up the served pages of a list of URL paths."""
+        return [self.page_index[url_path] for url_path in url_paths
+                if url_path in self.page_index]
+
     @staticmethod
     def _published_filter(page_list):
         return filter(lambda p: p.is_published, page_list)
@@ -0,0 +1,107 @@
+"""MDWeb secondary indexes of page meta information."""
+from collections import defaultdict
+
+from mdweb.dates import to_utc
+
+
+def _date_key(page):
+    """Sort key ordering pages by date, timezone aware dates as UTC."""
+    return to_utc(page.meta_inf.date), page.url_path
+
+
+class MetaIndex(object):
+    """Indexes of published pages by date, author, tag and custom fields.
+
+    Listing pages such as "latest posts" or "posts by author" would otherwise
+    have to walk the whole navigation on every request. The indexes are built
+    once per content scan so a listing costs only the size of its result.
+
+    Every list in the index is ordered newest first, pages without a date
+    follow in URL order. Lists are returned as tuples and are shared, they
+    must not be modified.
+    """
+
+    def __init__(self, pages, fields=()):
+        """Build the indexes.
+
+        :param pages: Iterable of pages, unpublished pages are skipped
+        :param fields: Names of custom fields (without the custom_ prefix)
+                       to group pages by
+        """
+        pages = [page for page in pages if page.is_published]
+        dated = sorted((page for page in pages
+                        if page.meta_inf.date is not None),
+                       key=_date_key, reverse=True)
+        undated = sorted((page for page in pages
+                          if page.meta_inf.date is None),
+                         key=lambda page: page.url_path)
+
+        #: Published pages, newest first
+        self.pages = tuple(dated + undated)
+
+        #: Published pages with a date, newest first
+        self.dated_pages = tuple(dated)
+
+        authors = defaultdict(list)
+        tags = defaultdict(list)
+        field_values = dict((field, defaultdict(list)) for field in fields)
+        for page in self.pages:
+            if page.meta_inf.author is not None:
+                authors[page.meta_inf.author].append(page)
+            for tag in page.meta_inf.tags:
+                tags[tag].append(page)
+            for field, values in field_values.items():
+                value = getattr(page.meta_inf, 'custom_' + field)
+                for item in value if isinstance(value, list) else [value]:
+                    if item is not None and \
+                            not isinstance(item, (dict, list)):
+                        values[item].append(page)
+
+        self._authors = self._freeze(authors)
+        self._tags = self._freeze(tags)
+        self._fields = dict((field, self._freeze(values))
+                            for field, values in field_values.items())
+
+    @staticmethod
+    def _freeze(groups):
+        """Convert grouped page lists to tuples."""
+        return dict((key, tuple(pages)) for key, pages in groups.items())
+
+    def latest(self, count=None):
+        """Return the newest pages with a date.
+
+        :param count: Maximum number of pages, all pages if None
+        """
+        if count is None:
+            return self.dated_pages
+        return self.dated_pages[:count]
+
+    def by_author(self, author):
+        """Return the pages written by the given author."""
+        return self._authors.get(author, ())
+
+    def by_tag(self, tag):
+        """Return the pages with the given tag."""
+        return self._tags.get(tag, ())
+
+    def by_field(self, field, value):
+        """Return the pages with the given custom field value.
+
+        :param field: Custom field name as configured in META_INDEX_FIELDS
+        :param value: Field value
+        """
+        return self._fields[field].get(value, ())
+
+    @property
+    def authors(self):
+        """Return the sorted author names."""
+        return sorted(self._authors)
+
+    @property
+    def tags(self):
+        """Return the sorted tags."""
+        return sorted(self._tags)
+
+    def field_values(self, field):
+        """Return the sorted values of a custom field."""
+        return sorted(self._fields[field], key=str)
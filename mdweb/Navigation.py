@@ -44,9 +44,11 @@ Future Features:
     * Ordering navigation levels
 """
 from collections import OrderedDict
+import copy
 import hashlib
 import os
 import re
+import time
 from six import string_types
 
 from mdweb.Exceptions import ContentException, ContentStructureException
@@ -54,9 +56,39 @@ from mdweb.Page import Page, load_page
 from mdweb.BaseObjects import NavigationBaseItem, MetaInfParser
 
 
+#: Default options for the content scan
+SCAN_OPTIONS = {
+    #: Only read the meta information of pages while scanning, page bodies
+    # are loaded from disk when the page is first rendered
+    'defer_body': False,
+
+    #: What pages do with their markdown source once rendered, one of
+    # 'keep', 'compress' or 'drop'
+    'source_retention': 'keep',
+
+    #: PageHTMLStore holding the rendered HTML of pages, pages hold their own
+    # HTML if None
+    'html_store': None,
+
+    #: CodeHighlighter of the fenced code blocks of pages, code isn't
+    # highlighted if None
+    'code_highlighter': None,
+
+    #: Only read the meta information of pages that won't be served because
+    # they, or their navigation level, are unpublished. Their bodies are
+    # never read or rendered.
+    'skip_unpublished': False,
+
+    #: Set for the levels below an unpublished navigation level
+    'unpublished_parent': False,
+}
+
+
 class NavigationMetaInf(MetaInfParser):   # pylint: disable=R0903
     """MDWeb Navigation Meta Information."""
 
+    __slots__ = ()
+
     FIELD_TYPES = {
         'nav_name': ('unicode', None),
         'order': ('int', 0),
@@ -72,6 +104,11 @@ class Navigation(NavigationBaseItem):
     Each nav level's name is determined by the directory name.
     """
 
+    __slots__ = ('_content_path', 'scan_options', 'scan_stats', 'level',
+                 'name', 'path', 'meta_inf', 'child_navs', 'child_pages',
+                 'is_top', 'page', 'has_page', 'order', 'slug', 'id',
+                 'published')
+
     #: MetaInf file name
     nav_metainf_file_name = '_navlevel.txt'
 
@@ -84,7 +121,10 @@ class Navigation(NavigationBaseItem):
         '403.md',
         '404.md',
         '405.md',
+        '410.md',
         '500.md',
+        '501.md',
+        '503.md',
     ]
 
     skip_directories = [
@@ -94,11 +134,28 @@ class Navigation(NavigationBaseItem):
     #: Root path to content
     _root_content_path = None
 
-    def __init__(self, content_path, nav_level=0):
-        """Initialize navigation level."""
+    def __init__(self, content_path, nav_level=0, scan_options=None,
+                 scan_stats=None):
+        """Initialize navigation level.
+
+        :param content_path: Path to the content of this navigation level
+        :param nav_level: Depth of this navigation level
+        :param scan_options: Options overriding SCAN_OPTIONS
+        :param scan_stats: Dictionary collecting statistics of the scan,
+                           shared by all navigation levels
+        """
         #: path to content for current navigation level
         self._content_path = os.path.abspath(content_path)
 
+        #: Options used to scan the content
+        self.scan_options = dict(SCAN_OPTIONS, **(scan_options or {}))
+
+        #: Statistics of the content scan
+        self.scan_stats = {'pages': 0, 'bytes_read': 0, 'bytes_total': 0,
+                           'source_bytes_released': 0, 'pages_rendered': 0,
+                           'render_seconds': 0.0, 'unpublished_skipped': 0} \
+            if scan_stats is None else scan_stats
+
         #: Navigation level
         self.level = nav_level
 
@@ -146,6 +203,11 @@ class Navigation(NavigationBaseItem):
         #: Navigation level published status
         self.published = True
 
+        #: Navigation links (populated during the parent level's scan)
+        self.parent = None
+        self.previous = None
+        self.next = None
+
         # Build the nav level
         self._scan()
 
@@ -192,6 +254,54 @@ class Navigation(NavigationBaseItem):
                 return child
         return None
 
+    def published_view(self):
+        """Return a copy of the navigation without unpublished items.
+
+        Unpublished navigation levels are dropped with everything below them
+        and unpublished pages are dropped from their level. The root index
+        page is always kept. Pages are shared with this navigation, only the
+        navigation levels are copied.
+        """
+        view = copy.copy(self)
+        view.child_navs = [child_nav.published_view()
+                           for child_nav in self.child_navs
+                           if child_nav.is_published]
+        view.child_pages = [page for page in self.child_pages
+                            if page.is_published]
+        if view.page is not None and not view.page.is_published and \
+                not view.is_top:
+            view.page = None
+            view.has_page = False
+        view._link_children()
+        return view
+
+    def _link_children(self):
+        """Link the child levels and pages to this level and their siblings.
+
+        Pages are shared with the published view which links them again, so
+        their links always point to the navigation being served.
+        """
+        for children in [self.child_navs, self.child_pages]:
+            for index, child in enumerate(children):
+                child.parent = self
+                child.previous = children[index - 1] if index > 0 else None
+                child.next = children[index + 1] \
+                    if index + 1 < len(children) else None
+
+        for child_nav in self.child_navs:
+            if child_nav.page is not None:
+                child_nav.page.parent = self
+
+    def _serves_page(self, page):
+        """Check if a page of this level is kept by the published view.
+
+        :param page: Page of this navigation level
+        """
+        if self.is_top:
+            return True
+        return self.published and page.is_published and \
+            not self.scan_options['unpublished_parent']
+
     def _scan(self):
         """Scan the root content path recursively for pages and navigation."""
         # Get a list of files in content_directory
@@ -243,7 +353,41 @@ class Navigation(NavigationBaseItem):
                         % page_name)
 
                 # We have got a nav file!
-                page = Page(*load_page(self._root_content_path, file_path))
+                defer_body = self.scan_options['defer_body']
+                skip_unpublished = self.scan_options['skip_unpublished'] and \
+                    not defer_body
+                page_options = {
+                    'source_retention': self.scan_options['source_retention'],
+                    'html_store': self.scan_options['html_store'],
+                    'code_highlighter': self.scan_options['code_highlighter'],
+                }
+                load_start = time.time()
+                if skip_unpublished:
+                    # Read the header first and only read the body of served
+                    # pages, from the same file
+                    with open(file_path, 'rb') as page_file:
+                        page = Page(*load_page(self._root_content_path,
+                                               file_path, header_only=True,
+                                               scan_stats=self.scan_stats,
+                                               page_file=page_file),
+                                    defer_body=True, **page_options)
+                        if self._serves_page(page):
+                            self.scan_stats['bytes_read'] += \
+                                page.load_body(page_file)
+                        else:
+                            self.scan_stats['unpublished_skipped'] += 1
+                else:
+                    page = Page(*load_page(self._root_content_path, file_path,
+                                           header_only=defer_body,
+                                           scan_stats=self.scan_stats),
+                                defer_body=defer_body, **page_options)
+                if page.body_loaded:
+                    self.scan_stats['pages_rendered'] += 1
+                    self.scan_stats['render_seconds'] += \
+                        time.time() - load_start
+                self.scan_stats['pages'] += 1
+                self.scan_stats['source_bytes_released'] += \
+                    page.release_source()
 
                 # If it's an index file use it for the page for this nav  object
                 if 'index' == page_name:
@@ -257,11 +401,17 @@ class Navigation(NavigationBaseItem):
                     continue
 
                 # We got a directory, create a new nav level
-                self.child_navs.append(Navigation(file_path, self.level + 1))
+                scan_options = self.scan_options
+                if not self.is_top and not self.published:
+                    scan_options = dict(scan_options, unpublished_parent=True)
+                self.child_navs.append(Navigation(file_path, self.level + 1,
+                                                  scan_options,
+                                                  self.scan_stats))
 
         # Now sort
         self.child_navs.sort(key=lambda x: x.order)
         self.child_pages.sort(key=lambda x: x.meta_inf.order)
+        self._link_children()
 
     def get_page_dict(self, nav=None):
         """Return a flattened dictionary of pages."""
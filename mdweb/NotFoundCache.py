@@ -0,0 +1,100 @@
+"""MDWeb negative lookup cache for request paths without a page."""
+from collections import OrderedDict
+import threading
+
+
+class NotFoundCache(object):
+    """Bounded LRU set of request paths known to have no page.
+
+    Scanners probe the same non-existent paths (/wp-login.php, /.env, ...)
+    over and over. Remembering those paths lets the site answer with the
+    cached 404 without looking the page up again. The cache must be cleared
+    whenever the content is reloaded.
+
+    The counters are kept across reloads so they describe the 404 volume
+    handled by the process. 404s of other routes, such as missing assets,
+    are counted as well but never cached.
+    """
+
+    def __init__(self, max_size=10000):
+        """Initialize an empty cache.
+
+        :param max_size: Maximum number of paths to remember, 0 disables the
+                         cache
+        """
+        self.max_size = max_size
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+
+        #: Number of not found lookups answered from the cache
+        self.hits = 0
+
+        #: Number of not found lookups that went through the page lookup
+        self.misses = 0
+
+        #: Number of 404s of routes other than pages
+        self.other = 0
+
+    def __len__(self):
+        return len(self._paths)
+
+    @property
+    def not_found(self):
+        """Return the total number of not found page lookups."""
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        """Return the fraction of not found lookups answered by the cache."""
+        if self.not_found == 0:
+            return 0.0
+        return float(self.hits) / self.not_found
+
+    def hit(self, path):
+        """Check if the path is known to have no page.
+
+        :param path: Normalized URL path
+        :return: True if the path is cached
+        """
+        with self._lock:
+            if path not in self._paths:
+                return False
+            self._paths.move_to_end(path)
+            self.hits += 1
+            return True
+
+    def add(self, path):
+        """Remember a path that has no page, evicting the least recent.
+
+        :param path: Normalized URL path
+        """
+        with self._lock:
+            self.misses += 1
+            if self.max_size <= 0:
+                return
+            self._paths[path] = None
+            self._paths.move_to_end(path)
+            while len(self._paths) > self.max_size:
+                self._paths.popitem(last=False)
+
+    def count_other(self):
+        """Count a 404 of a route other than pages, such as an asset."""
+        with self._lock:
+            self.other += 1
+
+    def clear(self):
+        """Forget all cached paths, the counters are kept."""
+        with self._lock:
+            self._paths.clear()
+
+    def stats(self):
+        """Return the cache counters as a dictionary."""
+        return {
+            'size': len(self._paths),
+            'max_size': self.max_size,
+            'not_found': self.not_found,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'other': self.other,
+        }
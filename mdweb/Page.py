@@ -1,39 +1,244 @@
 """MDWeb Page Objects."""
 import codecs
+import math
 import os
 import re
+import sys
+import time
+import zlib
 
 import markdown
 
-from mdweb.BaseObjects import NavigationBaseItem, MetaInfParser
+from mdweb.CodeHighlighter import CodeHighlightExtension
+from mdweb.BaseObjects import (
+    NavigationBaseItem,
+    MetaInfParser,
+    META_FORMAT_METAINF,
+    META_FORMAT_YAML,
+    load_yaml_fields,
+)
 from mdweb.Exceptions import (
     ContentException,
     PageParseException,
 )
+from mdweb.SearchIndex import html_to_text
 
 #: A regex to extract the url path from the file path
 URL_PATH_REGEX = r'^%s(?P<path>[^\0]*?)(index)?(\.md)'
 
-#: A regex for extracting meta information (and comments).
-META_INF_REGEX = r'(^```metainf(?P<metainf>.*?)```)?(?P<content>.*)'
+#: Fence opening the meta information block, must start the file
+META_INF_FENCE_START = '```metainf'
+
+#: Fence closing the meta information block
+META_INF_FENCE_END = '```'
+
+#: Fence opening and closing a YAML front matter block, the opening fence
+# must be the first line of the file
+YAML_FENCE = '---'
+
+#: Alternative fence closing a YAML front matter block
+YAML_FENCE_END = '...'
+
+#: What pages do with their markdown source once the HTML is rendered.
+# 'keep' holds it in memory, 'compress' holds it zlib compressed and 'drop'
+# releases it and reads it from disk again when needed.
+SOURCE_RETENTION_MODES = ('keep', 'compress', 'drop')
+
+#: Markdown extensions used to render pages. The toc extension gives every
+# heading an id derived from its text, which is stable across renders.
+MARKDOWN_EXTENSIONS = ['toc']
+
+#: Reading speed used to estimate the reading time of a page
+WORDS_PER_MINUTE = 200
+
+#: Maximum length of a page abstract
+ABSTRACT_LENGTH = 200
 
 
 class PageMetaInf(MetaInfParser):  # pylint: disable=R0903
     """MDWeb Page Meta Information."""
 
-    def __init__(self, meta_string):
+    __slots__ = ()
+
+    def __init__(self, meta_string, meta_format=META_FORMAT_METAINF):
         """Content page meta-information.
 
         If a page defines a non-standard meta value it is blindly included.
 
         :param meta_string: Raw meta-inf content as a string
+        :param meta_format: Format of the meta information, metainf or yaml
         """
-        super(PageMetaInf, self).__init__(meta_string)
+        super(PageMetaInf, self).__init__(meta_string, meta_format)
         self.nav_name = self.title if self.nav_name is None else self.nav_name
 
 
-def load_page(content_path, page_path):
-    """Load the page file and return the path, URL and contents"""
+def split_meta_inf(file_string):
+    """Separate the meta information block from the page content.
+
+    The block is only recognised at the very start of the file and ends at
+    the first closing fence. Only the header is scanned, with plain string
+    searches, so the split is linear in the size of the header regardless of
+    what the file contains. A block without a closing fence is treated as
+    content.
+
+    :param file_string: Contents of the page file
+    :return: Tuple of (meta information string, content string)
+    """
+    if not file_string.startswith(META_INF_FENCE_START):
+        return '', file_string
+
+    end = file_string.find(META_INF_FENCE_END, len(META_INF_FENCE_START))
+    if end == -1:
+        return '', file_string
+
+    return (file_string[len(META_INF_FENCE_START):end],
+            file_string[end + len(META_INF_FENCE_END):])
+
+
+def _yaml_fence_line_end(file_string):
+    """Return the end of the opening YAML fence line or -1 if there is none.
+
+    :param file_string: Contents of the page file
+    """
+    if not file_string.startswith(YAML_FENCE):
+        return -1
+
+    line_end = len(YAML_FENCE)
+    if file_string.startswith('\r\n', line_end):
+        return line_end + 2
+    if file_string.startswith('\n', line_end):
+        return line_end + 1
+    return -1
+
+
+def split_front_matter(file_string):
+    """Separate the meta information from the page content.
+
+    Pages may start with a metainf block or with YAML front matter between
+    two --- lines, the front matter may also be closed with a ... line.
+    Detecting either format only looks at the start of the file and the
+    closing fence is found in a single pass over the lines of the block.
+
+    A fenced block that isn't a YAML mapping, such as text between two
+    horizontal rules, is left in the content. The front matter is loaded to
+    tell, so the loaded fields are returned rather than parsed again.
+
+    :param file_string: Contents of the page file
+    :return: Tuple of (meta information format, meta information string or
+             the loaded YAML fields, content string)
+    """
+    start = _yaml_fence_line_end(file_string)
+    if start == -1:
+        return (META_FORMAT_METAINF,) + split_meta_inf(file_string)
+
+    line_start = start
+    while line_start < len(file_string):
+        line_end = file_string.find('\n', line_start)
+        if line_end == -1:
+            line_end = len(file_string)
+
+        if file_string.startswith(YAML_FENCE, line_start) or \
+                file_string.startswith(YAML_FENCE_END, line_start):
+            fence_end = line_start + len(YAML_FENCE)
+            if file_string[fence_end:line_end].strip() == '':
+                fields = load_yaml_fields(file_string[start:line_start])
+                if fields is None:
+                    break
+                return META_FORMAT_YAML, fields, file_string[fence_end:]
+        line_start = line_end + 1
+
+    # No closing fence or not front matter, the dashes are a horizontal rule
+    return META_FORMAT_METAINF, '', file_string
+
+
+def read_page_header(page_path, page_file=None):
+    """Read a page file only up to the end of its meta information block.
+
+    :param page_path: Path to the page file
+    :param page_file: Page file opened in binary mode to read from instead
+                      of opening page_path, it is left open after the bytes
+                      read
+    :return: Tuple of (meta information block including its fences or an
+             empty string if the page has none, number of bytes read)
+    """
+    if page_file is not None:
+        return _read_header(page_file)
+    with open(page_path, 'rb') as f:
+        return _read_header(f)
+
+
+def _read_header(f):
+    """Read the meta information block from the start of a page file.
+
+    :param f: Page file opened in binary mode
+    :return: Tuple of (meta information block including its fences or an
+             empty string if the page has none, number of bytes read)
+    """
+    fence_start = META_INF_FENCE_START.encode('utf-8')
+    fence_end = META_INF_FENCE_END.encode('utf-8')
+
+    header = f.read(len(fence_start))
+    if header.startswith(YAML_FENCE.encode('utf-8')):
+        return _read_yaml_header(f, header)
+    if header != fence_start:
+        return '', len(header)
+
+    chunks = [header]
+    bytes_read = len(header)
+    # A fence can't span lines so reading line by line finds it
+    for line in f:
+        chunks.append(line)
+        bytes_read += len(line)
+        if fence_end in line:
+            break
+
+    return b''.join(chunks).decode('utf-8'), bytes_read
+
+
+def _read_yaml_header(f, header):
+    """Read the rest of a YAML front matter block.
+
+    :param f: Page file opened in binary mode, positioned after header
+    :param header: Bytes already read from the start of the file
+    :return: Tuple of (front matter block including its fences or an empty
+             string if the file doesn't start with front matter, number of
+             bytes read)
+    """
+    fences = (YAML_FENCE.encode('utf-8'), YAML_FENCE_END.encode('utf-8'))
+
+    # Complete the line the header ends on
+    chunks = [header + f.readline()]
+    bytes_read = len(chunks[0])
+    lines = chunks[0].splitlines()
+    if _yaml_fence_line_end(chunks[0].decode('utf-8')) == -1:
+        return '', bytes_read
+    if any(line.strip() in fences for line in lines[1:]):
+        return chunks[0].decode('utf-8'), bytes_read
+
+    for line in f:
+        chunks.append(line)
+        bytes_read += len(line)
+        if line.strip() in fences:
+            break
+
+    return b''.join(chunks).decode('utf-8'), bytes_read
+
+
+def load_page(content_path, page_path, header_only=False, scan_stats=None,
+              page_file=None):
+    """Load the page file and return the path, URL, contents and mtime.
+
+    The modification time is captured here so consumers such as the sitemap
+    don't have to stat every content file at request time.
+
+    :param content_path: Root content path
+    :param page_path: Path to the page file
+    :param header_only: Only read the meta information block of the file
+    :param scan_stats: Dictionary to add bytes_read and bytes_total to
+    :param page_file: Page file opened in binary mode to read the header
+                      from, left open so the body can be read from it with
+                      Page.load_body
+    """
 
     # Extract the part of the page_path that will be used as the URL path
     pattern = URL_PATH_REGEX % content_path
@@ -48,53 +253,280 @@ def load_page(content_path, page_path):
         raise ContentException('Could not find file for content page "%s"' %
                                page_path)
 
+    stat = os.stat(page_path)
+
     # Read the page file
-    with codecs.open(page_path, 'r', encoding='utf8') as f:
-        file_string = f.read()
+    if header_only:
+        file_string, bytes_read = read_page_header(page_path, page_file)
+    else:
+        with codecs.open(page_path, 'r', encoding='utf8') as f:
+            file_string = f.read()
+        bytes_read = stat.st_size
+
+    if scan_stats is not None:
+        scan_stats['bytes_read'] = scan_stats.get('bytes_read', 0) + \
+            bytes_read
+        scan_stats['bytes_total'] = scan_stats.get('bytes_total', 0) + \
+            stat.st_size
 
-    return page_path, url_path, file_string
+    return page_path, url_path, file_string, stat.st_mtime
 
 
 class Page(NavigationBaseItem):
     """MDWeb Page View."""
 
-    def __init__(self, page_path, url_path, file_string):
-        """Initialize Page object."""
+    __slots__ = ('page_path', 'url_path', 'mtime', 'meta_inf',
+                 '_markdown_str', '_markdown_zip', '_page_html',
+                 '_source_retention', '_html_store', '_code_highlighter',
+                 '_toc', '_word_count', '_abstract')
+
+    def __init__(self, page_path, url_path, file_string, mtime=None,
+                 defer_body=False, source_retention='keep', html_store=None,
+                 code_highlighter=None):
+        """Initialize Page object.
+
+        :param page_path: Path to the page file
+        :param url_path: URL path of the page
+        :param file_string: Contents of the page file, only the meta
+                            information block is required if the body is
+                            deferred
+        :param mtime: Modification time of the page file
+        :param defer_body: Load and render the body from disk when it is
+                           first used
+        :param source_retention: What to do with the markdown source once
+                                 the HTML is rendered, one of
+                                 SOURCE_RETENTION_MODES
+        :param html_store: PageHTMLStore holding the rendered HTML instead of
+                           the page, the HTML is rendered again if the store
+                           evicts it
+        :param code_highlighter: CodeHighlighter of fenced code blocks, code
+                                 isn't highlighted if None
+        """
 
         self.page_path = page_path
         self.url_path = url_path
 
+        #: Navigation links (populated during the navigation scan)
+        self.parent = None
+        self.previous = None
+        self.next = None
+
+        #: Modification time of the content file captured during the scan
+        self.mtime = mtime
+
         # Separate the meta information and the page content
-        meta_inf_regex = re.compile(META_INF_REGEX, flags=re.DOTALL)
-        match = meta_inf_regex.search(file_string)
-        meta_inf_string = match.group('metainf') if match.group('metainf') \
-            else ''
-        content_string = match.group('content')
+        meta_format, meta_inf_string, content_string = \
+            split_front_matter(file_string)
 
-        self.meta_inf = PageMetaInf(meta_inf_string)
+        if META_FORMAT_YAML == meta_format:
+            self.meta_inf = PageMetaInf(meta_inf_string, meta_format)
+        else:
+            self.meta_inf = PageMetaInf(meta_inf_string)
 
         # Strip the meta information and comments
-        self.markdown_str = content_string
+        self._markdown_str = None if defer_body else content_string
+        self._markdown_zip = None
+        self._source_retention = source_retention
+        self._html_store = html_store
+        self._code_highlighter = code_highlighter
+
+        self._page_html = None
+        self._toc = None
+        self._word_count = None
+        self._abstract = None
+        if not defer_body:
+            self._render()
+
+    @property
+    def markdown_str(self):
+        """Return the page markdown, loading it from disk if deferred or
+        released."""
+        markdown_str = self.read_markdown()
+        if self._markdown_zip is None and 'keep' == self._source_retention:
+            self._markdown_str = markdown_str
+        return markdown_str
+
+    def read_markdown(self):
+        """Return the page markdown without keeping it loaded.
+
+        Unlike markdown_str the source of a deferred page is read from disk
+        every time so it isn't held on to.
+        """
+        if self._markdown_str is not None:
+            return self._markdown_str
+        if self._markdown_zip is not None:
+            return zlib.decompress(self._markdown_zip).decode('utf-8')
+
+        with codecs.open(self.page_path, 'r', encoding='utf8') as f:
+            return split_front_matter(f.read())[2]
+
+    @property
+    def page_html(self):
+        """Return the rendered page, rendering it on first use if deferred
+        or evicted from the HTML store."""
+        if self._page_html is not None:
+            return self._page_html
+        if self._html_store is not None:
+            page_html = self._html_store.get(self)
+            if page_html is not None:
+                return page_html
+        page_html = self._render()
+        self.release_source()
+        return page_html
+
+    def load_body(self, page_file=None):
+        """Read and render the body of a page whose body was deferred.
+
+        :param page_file: Page file opened in binary mode the header was
+                          read from, the body is read from it instead of
+                          opening the file again
+        :return: Number of bytes read, not counting the header already read
+                 from page_file
+        """
+        if page_file is None:
+            with open(self.page_path, 'rb') as f:
+                file_bytes = f.read()
+            bytes_read = len(file_bytes)
+        else:
+            # The header is still in the read buffer of the file so seeking
+            # back to the start doesn't read it again
+            header_bytes = page_file.tell()
+            page_file.seek(0)
+            file_bytes = page_file.read()
+            bytes_read = len(file_bytes) - header_bytes
+        self._markdown_str = split_front_matter(file_bytes.decode('utf-8'))[2]
+        self._render()
+        return bytes_read
+
+    def _render(self):
+        """Render the page HTML and keep it on the page or in the store.
+
+        :return: Rendered page HTML
+        """
+        render_start = time.time()
+        page_html, toc = self.render_markdown(self.markdown_str,
+                                              self._code_highlighter)
+
+        # The text statistics are small so they stay on the page even if
+        # the HTML is evicted from the store
+        text = ' '.join(html_to_text(page_html).split())
+        self._toc = toc
+        self._word_count = len(text.split())
+        self._abstract = self.make_abstract(text)
+
+        if self._html_store is None:
+            self._page_html = page_html
+        else:
+            self._html_store.put(self, page_html, time.time() - render_start)
+        return page_html
+
+    def release_source(self):
+        """Compress or drop the markdown source of a rendered page.
+
+        The source is only released if the page's source retention mode asks
+        for it. Only rendered pages hold their source in a releasable form,
+        deferred pages read it from disk when rendering.
+
+        :return: Approximate number of bytes released
+        """
+        if 'keep' == self._source_retention or self._markdown_str is None:
+            return 0
+
+        released = sys.getsizeof(self._markdown_str)
+        if 'compress' == self._source_retention:
+            self._markdown_zip = zlib.compress(
+                self._markdown_str.encode('utf-8'))
+            released -= sys.getsizeof(self._markdown_zip)
+        self._markdown_str = None
+
+        return released
+
+    def _text_stats(self):
+        """Render the page if its text statistics aren't known yet."""
+        if self._word_count is None:
+            self._render()
+            self.release_source()
 
-        # The page will be rendered on first view
-        self.page_html = self.parse_markdown(self.markdown_str)
+    @property
+    def toc(self):
+        """Return the table of contents.
+
+        Each heading is a dictionary of its level, id, name and the list of
+        headings nested below it.
+        """
+        self._text_stats()
+        return self._toc
+
+    @property
+    def word_count(self):
+        """Return the number of words in the rendered page."""
+        self._text_stats()
+        return self._word_count
+
+    @property
+    def reading_time(self):
+        """Return the estimated reading time in minutes."""
+        return int(math.ceil(float(self.word_count) / WORDS_PER_MINUTE))
+
+    @property
+    def abstract(self):
+        """Return a plain text excerpt of the start of the page."""
+        self._text_stats()
+        return self._abstract
+
+    @staticmethod
+    def make_abstract(text):
+        """Shorten text to ABSTRACT_LENGTH, breaking between words.
+
+        :param text: Plain text with collapsed whitespace
+        :return: Excerpt ending with an ellipsis if the text was shortened
+        """
+        if len(text) <= ABSTRACT_LENGTH:
+            return text
+        excerpt = text[:ABSTRACT_LENGTH + 1]
+        if ' ' in excerpt:
+            excerpt = excerpt.rsplit(' ', 1)[0]
+        else:
+            excerpt = excerpt[:ABSTRACT_LENGTH]
+        return excerpt.rstrip(' ,.;:') + u'\u2026'
+
+    @property
+    def body_loaded(self):
+        """Check if the page body has been loaded."""
+        return self._markdown_str is not None or \
+            self._page_html is not None or \
+            (self._html_store is not None and
+             self in self._html_store)
 
-        self.abstract = self.page_html[0:100]
-        
     @property
     def is_published(self):
         return self.meta_inf.published
 
     @staticmethod
-    def parse_markdown(page_markdown):
+    def parse_markdown(page_markdown, code_highlighter=None):
         """Parse given markdown string into rendered html.
 
         :param page_markdown: Markdown to be parsed
+        :param code_highlighter: CodeHighlighter of fenced code blocks
         :return: Rendered page HTML
         """
-        page_html = markdown.markdown(page_markdown)
+        return Page.render_markdown(page_markdown, code_highlighter)[0]
 
-        return page_html
+    @staticmethod
+    def render_markdown(page_markdown, code_highlighter=None):
+        """Render a markdown string and extract its table of contents.
+
+        :param page_markdown: Markdown to be parsed
+        :param code_highlighter: CodeHighlighter of fenced code blocks
+        :return: Tuple of (rendered page HTML, table of contents)
+        """
+        extensions = list(MARKDOWN_EXTENSIONS)
+        if code_highlighter is not None:
+            extensions.append(CodeHighlightExtension(code_highlighter))
+        md = markdown.Markdown(extensions=extensions)
+        page_html = md.convert(page_markdown)
+
+        return page_html, md.toc_tokens
 
     def __repr__(self):
         return '{0}'.format(self.page_path)
@@ -0,0 +1,133 @@
+"""MDWeb memory budgeted store of rendered page HTML."""
+from collections import OrderedDict
+import sys
+import threading
+
+
+class PageHTMLStore(object):
+    """LRU store of rendered page HTML bounded by a memory budget.
+
+    On large archives most pages are rarely viewed. Rather than every page
+    holding its rendered HTML for the life of the process, pages keep their
+    HTML in the store which evicts the least recently viewed renders once
+    the budget is exceeded. An evicted page is rendered again from its
+    markdown when it is next viewed.
+
+    HTML is keyed by the page object so renders of pages from a previous
+    scan, still being served during a reload, are never returned for the
+    pages of the new scan. The counters are kept across reloads so they
+    describe the renders done by the process.
+    """
+
+    def __init__(self, max_bytes=0):
+        """Initialize an empty store.
+
+        :param max_bytes: Memory budget for the stored HTML in bytes
+        """
+        self.max_bytes = max_bytes
+        self._renders = OrderedDict()
+        self._lock = threading.Lock()
+
+        #: Approximate memory held by the stored HTML in bytes
+        self.resident_bytes = 0
+
+        #: Number of lookups answered from the store
+        self.hits = 0
+
+        #: Number of lookups for HTML that wasn't stored
+        self.misses = 0
+
+        #: Number of pages rendered into the store
+        self.renders = 0
+
+        #: Total time spent rendering pages into the store
+        self.render_seconds = 0.0
+
+        #: Number of renders evicted to stay within the budget
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._renders)
+
+    def __contains__(self, key):
+        return key in self._renders
+
+    @property
+    def hit_rate(self):
+        """Return the fraction of lookups answered by the store."""
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return float(self.hits) / lookups
+
+    @property
+    def mean_render_seconds(self):
+        """Return the mean time taken to render a page into the store."""
+        if self.renders == 0:
+            return 0.0
+        return self.render_seconds / self.renders
+
+    def get(self, key):
+        """Return the stored HTML of a page.
+
+        :param key: Page the HTML belongs to
+        :return: Page HTML or None if it isn't stored
+        """
+        with self._lock:
+            page_html = self._renders.get(key)
+            if page_html is None:
+                self.misses += 1
+                return None
+            self._renders.move_to_end(key)
+            self.hits += 1
+            return page_html
+
+    def put(self, key, page_html, render_seconds=0.0):
+        """Store the HTML of a page, evicting the least recently used.
+
+        HTML larger than the whole budget is not stored.
+
+        :param key: Page the HTML belongs to
+        :param page_html: Rendered page HTML
+        :param render_seconds: Time taken to render the page
+        """
+        size = sys.getsizeof(page_html)
+        with self._lock:
+            self.renders += 1
+            self.render_seconds += render_seconds
+
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._renders[key] = page_html
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes:
+                _, evicted = self._renders.popitem(last=False)
+                self.resident_bytes -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+    def _discard(self, key):
+        """Remove a page's HTML, the lock must be held."""
+        page_html = self._renders.pop(key, None)
+        if page_html is not None:
+            self.resident_bytes -= sys.getsizeof(page_html)
+
+    def clear(self):
+        """Forget all stored HTML, the counters are kept."""
+        with self._lock:
+            self._renders.clear()
+            self.resident_bytes = 0
+
+    def stats(self):
+        """Return the store counters as a dictionary."""
+        return {
+            'size': len(self._renders),
+            'resident_bytes': self.resident_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'renders': self.renders,
+            'mean_render_seconds': self.mean_render_seconds,
+            'evictions': self.evictions,
+        }
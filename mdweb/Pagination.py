@@ -0,0 +1,85 @@
+"""MDWeb pagination of page listings."""
+
+
+class Pagination(object):
+    """One page of a paginated listing.
+
+    The listing is sliced so building a page costs only the page size, as
+    long as the listing itself isn't rebuilt per request (see the
+    sorted_pages memoization).
+    """
+
+    def __init__(self, listing, page, per_page, path):
+        """Initialize the page of the listing.
+
+        :param listing: Sequence of all the items in the listing
+        :param page: Page number starting at 1
+        :param per_page: Number of items on each page
+        :param path: URL path of the listing page
+        """
+        #: Current page number
+        self.page = page
+
+        #: Number of items on each page
+        self.per_page = per_page
+
+        #: Total number of items in the listing
+        self.total = len(listing)
+
+        #: Items on the current page
+        self.items = listing[(page - 1) * per_page:page * per_page]
+
+        self._path = path
+
+    @property
+    def pages(self):
+        """Return the number of pages, an empty listing has one page."""
+        return max(1, (self.total + self.per_page - 1) // self.per_page)
+
+    @property
+    def has_prev(self):
+        """Check if there is a previous page."""
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        """Check if there is a next page."""
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        """Return the previous page number or None."""
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        """Return the next page number or None."""
+        return self.page + 1 if self.has_next else None
+
+    def page_url(self, page):
+        """Return the URL of the given page, page 1 has no page argument."""
+        if page == 1:
+            return self._path
+        return '%s?page=%d' % (self._path, page)
+
+    @property
+    def prev_url(self):
+        """Return the URL of the previous page or None."""
+        return self.page_url(self.prev_num) if self.has_prev else None
+
+    @property
+    def next_url(self):
+        """Return the URL of the next page or None."""
+        return self.page_url(self.next_num) if self.has_next else None
+
+    def link_header(self):
+        """Return the value of a Link header pointing to the adjacent pages.
+
+        :return: Header value or None if there is only one page
+        """
+        links = []
+        if self.has_prev:
+            links.append('<%s>; rel="prev"' % self.prev_url)
+        if self.has_next:
+            links.append('<%s>; rel="next"' % self.next_url)
+        return ', '.join(links) or None
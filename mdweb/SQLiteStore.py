@@ -0,0 +1,262 @@
+"""MDWeb SQLite store of page metadata and full-text search."""
+import datetime
+import json
+import sqlite3
+import threading
+from six.moves.urllib.request import pathname2url
+
+from mdweb.Exceptions import ConfigException
+from mdweb.dates import to_utc
+from mdweb.SearchIndex import markdown_to_text, tokenize
+
+#: Version of the store schema, stores with another version are rebuilt
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE pages (
+    id INTEGER PRIMARY KEY,
+    url_path TEXT NOT NULL UNIQUE,
+    page_path TEXT NOT NULL,
+    mtime REAL,
+    title TEXT,
+    description TEXT,
+    date TEXT,
+    author TEXT,
+    published INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    custom_fields TEXT NOT NULL
+);
+CREATE INDEX pages_date ON pages (published, date DESC);
+CREATE INDEX pages_author ON pages (author, date DESC);
+CREATE VIRTUAL TABLE pages_fts USING fts5 (title, description, body);
+"""
+
+#: Weights of the title, description and body columns in search ranking
+FTS_WEIGHTS = (3.0, 2.0, 1.0)
+
+
+def _date_value(date):
+    """Return a date as a sortable string, timezone aware dates as UTC."""
+    if date is None:
+        return None
+    return to_utc(date).isoformat()
+
+
+def _json_default(value):
+    """Encode meta values JSON can't, such as dates, as strings."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class SQLiteStore(object):
+    """Page metadata and full-text search index kept in a SQLite file.
+
+    The store lives outside of the worker processes so large sites don't
+    hold a search index and metadata indexes in the heap of every worker.
+    Every worker updates the store after scanning the content, only pages
+    whose file changed are written so all but the first worker find nothing
+    to do. Queries use a read-only connection per thread and return URL
+    paths which are looked up in the site's page index.
+
+    The database uses write-ahead logging so readers are never blocked by
+    an update.
+    """
+
+    def __init__(self, path):
+        """Open the store, creating it if it doesn't exist.
+
+        :param path: Path to the SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+
+        connection = self._connect()
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            if self._version(connection) != SCHEMA_VERSION:
+                connection.execute('BEGIN IMMEDIATE')
+                # Another worker may have created the store meanwhile
+                if self._version(connection) != SCHEMA_VERSION:
+                    connection.execute('DROP TABLE IF EXISTS pages')
+                    connection.execute('DROP TABLE IF EXISTS pages_fts')
+                    # executescript() would commit, releasing the lock
+                    for statement in SCHEMA.split(';'):
+                        connection.execute(statement)
+                    connection.execute('PRAGMA user_version = %d' %
+                                       SCHEMA_VERSION)
+                connection.execute('COMMIT')
+        except sqlite3.OperationalError as error:
+            raise ConfigException("Unable to create the SQLite store %s: %s"
+                                  % (path, error))
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _version(connection):
+        """Return the schema version of the store."""
+        return connection.execute('PRAGMA user_version').fetchone()[0]
+
+    def _connect(self, read_only=False):
+        """Open a connection managing its own transactions."""
+        if read_only:
+            return sqlite3.connect('file:%s?mode=ro' % pathname2url(self.path),
+                                   uri=True, isolation_level=None)
+        return sqlite3.connect(self.path, isolation_level=None, timeout=30)
+
+    @property
+    def _reader(self):
+        """Return the read-only connection of the current thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect(True)
+        return connection
+
+    def update(self, pages):
+        """Bring the store up to date with the scanned pages.
+
+        Pages with an unchanged file are left alone, pages no longer in the
+        content are removed.
+
+        :param pages: Iterable of pages, their body is only used if their
+                      file changed
+        :return: Dictionary of the number of pages written, removed and
+                 unchanged
+        """
+        stats = {'written': 0, 'removed': 0, 'unchanged': 0}
+        connection = self._connect()
+        try:
+            # Take the write lock up front so concurrent workers queue here
+            # and find the store already updated
+            connection.execute('BEGIN IMMEDIATE')
+            stored = dict(
+                (url_path, (row_id, page_path, mtime))
+                for row_id, url_path, page_path, mtime in connection.execute(
+                    'SELECT id, url_path, page_path, mtime FROM pages'))
+
+            for page in pages:
+                row = stored.pop(page.url_path, None)
+                if row is not None and row[1:] == (page.page_path,
+                                                   page.mtime):
+                    stats['unchanged'] += 1
+                    continue
+                if row is not None:
+                    self._delete(connection, row[0])
+                self._insert(connection, page)
+                stats['written'] += 1
+
+            for row_id, _, _ in stored.values():
+                self._delete(connection, row_id)
+                stats['removed'] += 1
+
+            connection.execute('COMMIT')
+        except Exception:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+        return stats
+
+    @staticmethod
+    def _insert(connection, page):
+        """Write a page and its text.
+
+        The text is taken from the markdown source so writing a page
+        doesn't render it or load a deferred body.
+        """
+        meta_inf = page.meta_inf
+        cursor = connection.execute(
+            'INSERT INTO pages (url_path, page_path, mtime, title, '
+            'description, date, author, published, tags, custom_fields) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (page.url_path, page.page_path, page.mtime, meta_inf.title,
+             meta_inf.description, _date_value(meta_inf.date),
+             meta_inf.author, bool(page.is_published),
+             json.dumps(list(meta_inf.tags)),
+             json.dumps(meta_inf.custom_fields, default=_json_default)))
+        connection.execute(
+            'INSERT INTO pages_fts (rowid, title, description, body) '
+            'VALUES (?, ?, ?, ?)',
+            (cursor.lastrowid, meta_inf.title or '',
+             meta_inf.description or '',
+             markdown_to_text(page.read_markdown())))
+
+    @staticmethod
+    def _delete(connection, row_id):
+        """Remove a page and its text."""
+        connection.execute('DELETE FROM pages WHERE id = ?', (row_id,))
+        connection.execute('DELETE FROM pages_fts WHERE rowid = ?', (row_id,))
+
+    def _url_paths(self, sql, parameters=()):
+        """Run a query returning URL paths."""
+        return [row[0] for row in self._reader.execute(sql, parameters)]
+
+    def __len__(self):
+        return self._reader.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def search(self, query, count=10, published_only=True):
+        """Find the pages best matching a query.
+
+        :param query: Search query, pages matching any word are found
+        :param count: Maximum number of results
+        :param published_only: Leave out unpublished pages
+        :return: List of (URL path, score) tuples, best match first
+        """
+        terms = set(tokenize(query))
+        if not terms or count < 1:
+            return []
+
+        match = ' OR '.join('"%s"' % term.replace('"', '""')
+                            for term in sorted(terms))
+        return [(url_path, -rank) for url_path, rank in self._reader.execute(
+            'SELECT pages.url_path, bm25(pages_fts, ?, ?, ?) AS rank '
+            'FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid '
+            'WHERE pages_fts MATCH ? AND (pages.published OR NOT ?) '
+            'ORDER BY rank LIMIT ?',
+            FTS_WEIGHTS + (match, published_only, count))]
+
+    def latest(self, count=None, offset=0):
+        """Return the URL paths of the newest published pages with a date.
+
+        :param count: Maximum number of pages, all pages if None
+        :param offset: Number of pages to skip
+        """
+        return self._url_paths(
+            'SELECT url_path FROM pages '
+            'WHERE published = 1 AND date IS NOT NULL '
+            'ORDER BY date DESC, url_path LIMIT ? OFFSET ?',
+            (-1 if count is None else count, offset))
+
+    def by_author(self, author):
+        """Return the URL paths of the published pages of an author."""
+        return self._url_paths(
+            'SELECT url_path FROM pages WHERE published AND author = ? '
+            'ORDER BY date DESC, url_path', (author,))
+
+    def by_tag(self, tag):
+        """Return the URL paths of the published pages with a tag."""
+        return self._url_paths(
+            'SELECT url_path FROM pages WHERE published AND EXISTS '
+            '(SELECT 1 FROM json_each(pages.tags) WHERE value = ?) '
+            'ORDER BY date DESC, url_path', (tag,))
+
+    def by_field(self, field, value):
+        """Return the URL paths of the published pages with a custom field
+        value.
+
+        :param field: Custom field name without the custom_ prefix
+        :param value: Field value
+        """
+        return self._url_paths(
+            'SELECT url_path FROM pages WHERE published AND '
+            'json_extract(custom_fields, ?) = ? '
+            'ORDER BY date DESC, url_path', ('$.custom_' + field, value))
+
+    def close(self):
+        """Close the read-only connection of the current thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
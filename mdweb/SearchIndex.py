@@ -0,0 +1,336 @@
+"""MDWeb in-process full-text search index."""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import heapq
+import math
+from operator import itemgetter
+import re
+import six
+from six.moves import intern
+if not six.PY2:
+    from html import unescape
+else:
+    from six.moves.html_parser import HTMLParser
+    unescape = HTMLParser().unescape
+
+#: Pattern of the words indexed and searched for
+TOKEN_REGEX = re.compile(r'\w+', re.UNICODE)
+
+#: Pattern of the HTML tags stripped from rendered pages
+TAG_REGEX = re.compile(r'<[^>]*>')
+
+#: Pattern of the markdown link targets, reference link definitions and
+# inline HTML tags stripped from page sources
+MARKUP_REGEX = re.compile(r'\]\([^)]*\)|^ {0,3}\[[^\]]+\]:.*$|<[^>]*>',
+                          re.MULTILINE)
+
+#: Weight of each indexed field, a word in the title counts as much as
+# three words in the body
+FIELD_WEIGHTS = (
+    ('title', 3),
+    ('description', 2),
+    ('body', 1),
+)
+
+#: Postings lists longer than this are also stored ordered by score so
+# queries can stop before reading all of them
+SHORT_POSTINGS = 1000
+
+#: BM25 term frequency saturation
+BM25_K1 = 1.2
+
+#: BM25 document length normalization
+BM25_B = 0.75
+
+
+def tokenize(text):
+    """Split text into lower cased words."""
+    return TOKEN_REGEX.findall(text.lower())
+
+
+def html_to_text(page_html):
+    """Return the text of rendered HTML."""
+    return unescape(TAG_REGEX.sub(' ', page_html))
+
+
+def markdown_to_text(markdown_str):
+    """Return the text of a markdown source without rendering it."""
+    return unescape(MARKUP_REGEX.sub(' ', markdown_str))
+
+
+class SearchIndex(object):
+    """Inverted index of page titles, descriptions and text.
+
+    Every term maps to a postings list of document numbers and the weighted
+    frequency of the term in each document. The BM25 scores of a postings
+    list depend on the number and length of all the documents so they are
+    computed when the term is first searched for and kept for later queries.
+    Long postings lists are also ordered by score so a query for common
+    words only reads their best scoring postings.
+
+    Indexes are immutable. A reload builds a new index from the previous one
+    which only tokenizes the pages whose file changed and only copies and
+    updates the postings lists of their terms, sharing the others. The
+    document numbers of removed pages stay unused until they are more than
+    half of them, then the postings are built again.
+    """
+
+    def __init__(self, pages, previous=None):
+        """Build the index.
+
+        :param pages: Iterable of pages to index
+        :param previous: SearchIndex of the previous scan, the terms and
+                         postings of pages with an unchanged file are reused
+                         from it
+        """
+        reusable = previous._terms if previous is not None else {}
+
+        #: Indexed pages by document number, None for removed pages
+        self.pages = []
+
+        #: Term frequencies of each page file by path, kept for the next
+        # rebuild. Each entry is a tuple of (mtime, terms, frequencies).
+        self._terms = {}
+
+        #: Number of pages tokenized while building the index
+        self.pages_tokenized = 0
+
+        #: Document number of each page file by path
+        self._docs = {}
+
+        #: Number of indexed terms in each document by document number
+        self._lengths = array('I')
+        self._total_length = 0
+
+        #: Postings of each term as a tuple of (document numbers, weighted
+        # frequencies) ordered by document number
+        self._postings = {}
+
+        #: Scores of the searched terms as a tuple of (BM25 scores of the
+        # postings, positions by descending score or None for short
+        # postings)
+        self._scores = {}
+
+        if previous is not None and 2 * len(previous) >= len(previous.pages):
+            self.pages = [None] * len(previous.pages)
+            self._docs = dict(previous._docs)
+            self._lengths = array('I', previous._lengths)
+            self._total_length = previous._total_length
+            self._postings = dict(previous._postings)
+
+        # Terms whose postings were copied from the previous index or
+        # created by this one and can be changed
+        owned = set()
+        for page in pages:
+            entry = reusable.get(page.page_path)
+            if entry is None or entry[0] != page.mtime:
+                entry = self._tokenize_page(page)
+                self.pages_tokenized += 1
+            self._terms[page.page_path] = entry
+
+            doc = self._docs.get(page.page_path)
+            if doc is None:
+                doc = self._docs[page.page_path] = len(self.pages)
+                self.pages.append(page)
+                self._lengths.append(0)
+                self._add_postings(doc, entry, owned)
+            else:
+                self.pages[doc] = page
+                if entry is not reusable[page.page_path]:
+                    self._remove_postings(doc, reusable[page.page_path],
+                                          owned)
+                    self._add_postings(doc, entry, owned)
+
+        for page_path, doc in list(self._docs.items()):
+            if page_path not in self._terms:
+                self._remove_postings(doc, reusable[page_path], owned)
+                del self._docs[page_path]
+
+    def _owned_postings(self, term, owned):
+        """Return the postings of a term, copying them from the previous
+        index the first time they are changed."""
+        if term in owned:
+            return self._postings[term]
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = (array('I'), array('I'))
+        else:
+            postings = (array('I', postings[0]), array('I', postings[1]))
+        self._postings[term] = postings
+        owned.add(term)
+        return postings
+
+    def _add_postings(self, doc, entry, owned):
+        """Add the terms of a tokenized page to the postings."""
+        _, terms, frequencies = entry
+        length = sum(frequencies)
+        self._lengths[doc] = length
+        self._total_length += length
+        postings = self._postings
+        for term, frequency in zip(terms, frequencies):
+            if term in owned:
+                docs, term_frequencies = postings[term]
+            else:
+                docs, term_frequencies = self._owned_postings(term, owned)
+            if not docs or docs[-1] < doc:
+                docs.append(doc)
+                term_frequencies.append(frequency)
+            else:
+                position = bisect_left(docs, doc)
+                docs.insert(position, doc)
+                term_frequencies.insert(position, frequency)
+
+    def _remove_postings(self, doc, entry, owned):
+        """Remove the terms of a previously tokenized page from the
+        postings."""
+        self._total_length -= self._lengths[doc]
+        self._lengths[doc] = 0
+        for term in entry[1]:
+            docs, term_frequencies = self._owned_postings(term, owned)
+            position = bisect_left(docs, doc)
+            del docs[position]
+            del term_frequencies[position]
+            if not docs:
+                del self._postings[term]
+                owned.discard(term)
+
+    @staticmethod
+    def _tokenize_page(page):
+        """Count the weighted terms of a page.
+
+        The body is read from the markdown source so pages aren't rendered
+        and a deferred page doesn't keep its source loaded.
+
+        :return: Tuple of (mtime, terms, frequencies)
+        """
+        fields = {
+            'title': page.meta_inf.title or '',
+            'description': page.meta_inf.description or '',
+            'body': markdown_to_text(page.read_markdown()),
+        }
+        counts = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(fields[field]):
+                counts[term] += weight
+
+        terms = tuple(intern(term) for term in counts)
+        return page.mtime, terms, array('I', counts.values())
+
+    def __len__(self):
+        return len(self._docs)
+
+    @property
+    def term_count(self):
+        """Return the number of distinct indexed terms."""
+        return len(self._postings)
+
+    def _term_scores(self, term):
+        """Return the scores of a term, computing them on first use.
+
+        :return: Tuple of (BM25 scores of the postings, positions by
+                 descending score or None for short postings)
+        """
+        term_scores = self._scores.get(term)
+        if term_scores is not None:
+            return term_scores
+
+        docs, frequencies = self._postings[term]
+        documents = len(self._docs)
+        average_length = float(self._total_length) / documents
+        idf = math.log(1 + (documents - len(docs) + 0.5) / (len(docs) + 0.5))
+        scale = idf * (BM25_K1 + 1)
+        base = BM25_K1 * (1 - BM25_B)
+        per_term = BM25_K1 * BM25_B / average_length
+        lengths = self._lengths
+        scores = array('f', [scale * frequency /
+                             (frequency + base + per_term * lengths[doc])
+                             for doc, frequency in zip(docs, frequencies)])
+        order = None
+        if len(docs) > SHORT_POSTINGS:
+            order = self._score_order(scores)
+        self._scores[term] = term_scores = (scores, order)
+        return term_scores
+
+    @staticmethod
+    def _score_order(scores):
+        """Return the positions of a postings list by descending score."""
+        return array('I', sorted(range(len(scores)), key=scores.__getitem__,
+                                 reverse=True))
+
+    def search(self, query, count=10):
+        """Find the pages best matching a query.
+
+        :param query: Search query, pages matching any word are found
+        :param count: Maximum number of results
+        :return: List of (page, score) tuples, best match first
+        """
+        if count < 1:
+            return []
+
+        postings = [(self._postings[term][0],) + self._term_scores(term)
+                    for term in set(tokenize(query))
+                    if term in self._postings]
+        if sum(len(docs) for docs, _, _ in postings) > SHORT_POSTINGS:
+            best = self._threshold_search(postings, count)
+        else:
+            scores = {}
+            for docs, term_scores, _ in postings:
+                get_score = scores.get
+                for doc, score in zip(docs, term_scores):
+                    scores[doc] = get_score(doc, 0.0) + score
+            best = heapq.nlargest(count, scores.items(), key=itemgetter(1))
+
+        return [(self.pages[doc], score) for doc, score in best]
+
+    @classmethod
+    def _threshold_search(cls, postings, count):
+        """Find the best scoring documents without scoring every posting.
+
+        The postings are walked by descending score in parallel. Every
+        document met is scored in full, looking up its other scores by
+        binary search of the document numbers. Documents not met yet can't
+        score more than the sum of the scores at the current depth, so the
+        walk stops once the results are known to beat it.
+
+        :return: List of (document number, score) tuples, best match first
+        """
+        postings = [(docs, scores, order if order is not None
+                     else cls._score_order(scores))
+                    for docs, scores, order in postings]
+
+        def full_score(doc):
+            """Sum the scores of a document over all the postings."""
+            total = 0.0
+            for docs, scores, _ in postings:
+                position = bisect_left(docs, doc)
+                if position < len(docs) and docs[position] == doc:
+                    total += scores[position]
+            return total
+
+        seen = set()
+        best = []
+        depth = 0
+        while True:
+            threshold = 0.0
+            for docs, scores, order in postings:
+                if depth >= len(order):
+                    continue
+                position = order[depth]
+                threshold += scores[position]
+                doc = docs[position]
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                result = (full_score(doc), doc)
+                if len(best) < count:
+                    heapq.heappush(best, result)
+                elif result > best[0]:
+                    heapq.heapreplace(best, result)
+
+            if threshold == 0.0 or \
+                    (len(best) == count and best[0][0] >= threshold):
+                break
+            depth += 1
+
+        return [(doc, score) for score, doc in sorted(best, reverse=True)]
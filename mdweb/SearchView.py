@@ -0,0 +1,39 @@
+"""MDWeb Search View Object."""
+from flask import (
+    current_app as app,
+    jsonify,
+    render_template,
+    request,
+)
+from flask.views import View
+from jinja2 import TemplateNotFound
+
+
+class SearchView(View):
+    """Search View Object.
+
+    Results are rendered with the theme's search.html template. Themes
+    without one get the results as JSON, for use by client side search
+    boxes.
+    """
+
+    methods = ['GET']
+
+    def dispatch_request(self):  # pylint: disable=W0221
+        """Flask dispatch method."""
+        query = request.args.get('q', '').strip()
+        results = app.search(query, app.config['SEARCH_RESULTS']) \
+            if query else []
+
+        try:
+            template = app.jinja_env.get_template('search.html')
+        except TemplateNotFound:
+            return jsonify(query=query, results=[{
+                'url': '/' + page.url_path,
+                'title': page.meta_inf.title,
+                'description': page.meta_inf.description,
+                'score': score,
+            } for page, score in results])
+
+        return render_template(template, query=query,
+                               results=[page for page, _ in results])
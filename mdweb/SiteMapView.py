@@ -1,15 +1,21 @@
 """MDWeb SiteMap View Object."""
 import datetime
+import gzip
+import hashlib
+import io
 import logging
 import numbers
 import os
 import pytz
+import threading
 import time
+import zlib
 
 from flask import (
+    abort,
     current_app as app,
     make_response,
-    render_template_string,
+    request,
     url_for,
 )
 from flask.views import View
@@ -36,50 +42,302 @@ SITEMAP_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
 </urlset>
 """
 
+#: Template string for the sitemap index used once a site is sharded
+SITEMAP_INDEX_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    {% for sitemap in sitemaps -%}
+    <sitemap>
+        <loc>{{sitemap.loc|safe}}</loc>
+        {%- if sitemap.lastmod %}
+        <lastmod>{{sitemap.lastmod|safe}}</lastmod>
+        {%- endif %}
+    </sitemap>
+    {%- endfor %}
+</sitemapindex>
+"""
 
-class SiteMapView(View):
-    """Sitemap View Object."""
 
-    sitemap_cache = None
+def render_stream(template_string, **context):
+    """Render a template as a stream into UTF-8 encoded bytes.
 
-    def dispatch_request(self):
-        """Flask dispatch method."""
-        if self.sitemap_cache is None:
-            self.sitemap_cache = self.generate_sitemap()
+    The template is consumed chunk by chunk so the context may hold
+    generators and the rendered document is never held as one str.
+    """
+    template = app.jinja_env.from_string(template_string)
+    buf = io.BytesIO()
+    for chunk in template.generate(**context):
+        buf.write(chunk.encode('utf-8'))
+    return buf.getvalue()
 
-        response = make_response(self.sitemap_cache)
-        response.headers["Content-Type"] = "application/xml"
-        return response
 
-    @classmethod
-    def generate_sitemap(cls):
-        """Generate sitemap.xml. Makes a list of urls and date modified."""
+def gzip_bytes(data):
+    """Compress data with gzip.
+
+    The gzip header timestamp is zeroed so identical sitemaps compress to
+    identical bytes.
+    """
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=9,
+                       mtime=0) as gz_file:
+        gz_file.write(data)
+    return buf.getvalue()
+
+
+class SiteMapCache(object):
+    """Rendered sitemap shared by every SiteMapView instance.
+
+    Flask creates a new view instance for every request so the cache has to
+    live on the site rather than the view. The cached sitemap is tied to the
+    content generation of the site and is rebuilt once after each reload.
+
+    Sites with more than SITEMAP_MAX_URLS published pages are split into
+    shards served as /sitemap-N.xml and /sitemap.xml becomes a sitemap index.
+    Pages are assigned to shards by a hash of their URL so adding or
+    removing a page doesn't move other pages between shards. Each shard is
+    cached separately together with a signature of its entries, a reload
+    only renders the shards whose entries changed.
+
+    Every document is kept both as plain and gzip compressed bytes so
+    compression happens once per content generation, not per request.
+    """
+
+    def __init__(self):
+        """Initialize an empty sitemap cache."""
+        self._lock = threading.Lock()
+
+        #: Tuple of (content generation, index url, (XML, gzipped XML) of the
+        # sitemap or sitemap index, list of shards). Each shard is a tuple of
+        # (signature, lastmod, (XML, gzipped XML)).
+        self._entry = (None, None, None, [])
+
+    @property
+    def index_url(self):
+        """Return the external index URL of the last generated sitemap."""
+        return self._entry[1]
+
+    @property
+    def shard_count(self):
+        """Return the number of shards, 1 if the sitemap isn't sharded."""
+        return len(self._entry[3])
+
+    def is_current(self, site, index_url):
+        """Check if the cached sitemap matches the site content generation."""
+        generation, cached_index_url, sitemap, _ = self._entry
+        return sitemap is not None and \
+            generation == site.content_generation and \
+            cached_index_url == index_url
+
+    def get(self, site, index_url, shard=None, compressed=False):
+        """Return the encoded sitemap, generating it if it is stale.
+
+        :param site: MDSite the sitemap is generated for
+        :param index_url: External URL of the site index
+        :param shard: 1-based shard number, None for /sitemap.xml
+        :param compressed: Return the gzip compressed sitemap
+        :return: Sitemap XML as UTF-8 encoded (and optionally gzipped) bytes,
+                 None if there is no such shard
+        """
+        if not self.is_current(site, index_url):
+            with self._lock:
+                if not self.is_current(site, index_url):
+                    self._build(site, index_url)
+
+        _, _, sitemap, shards = self._entry
+        if shard is not None:
+            # A site that fits in a single sitemap has no shards to serve
+            if len(shards) < 2 or not 1 <= shard <= len(shards):
+                return None
+            sitemap = shards[shard - 1][2]
+
+        return sitemap[1] if compressed else sitemap[0]
+
+    def _build(self, site, index_url):
+        """Generate the sitemap, reusing shards whose entries are unchanged.
+
+        Must be called with the lock held.
+        """
         logging.info("Generating sitemap...")
         start = time.time()
 
-        pages = []
+        # Read the generation before the navigation so a reload during
+        # generation leaves the entry stale, not wrong.
+        generation = site.content_generation
+        max_urls = site.config['SITEMAP_MAX_URLS']
+        previous = dict((signature, (lastmod, sitemap))
+                        for signature, lastmod, sitemap in self._entry[3])
+
+        urls = [url for url, page in site.pages.items()
+                if page.meta_inf.published]
+        buckets = self._shard_urls(urls, max_urls,
+                                   max(len(self._entry[3]), 2))
+
+        shards = []
+        rendered = 0
+        for bucket in buckets:
+            # Only one shard worth of entries is held at a time
+            chunk = list(SiteMapView.sitemap_entries(index_url, bucket))
+
+            signature = hashlib.md5()
+            for entry in chunk:
+                signature.update(repr(sorted(entry.items())).encode('utf-8'))
+            signature = signature.hexdigest()
+
+            if signature in previous:
+                lastmod, sitemap = previous[signature]
+            else:
+                lastmod = max([e['lastmod'] for e in chunk]) if chunk else None
+                xml = render_stream(SITEMAP_TEMPLATE, pages=iter(chunk))
+                sitemap = (xml, gzip_bytes(xml))
+                rendered += 1
+            shards.append((signature, lastmod, sitemap))
+
+        if len(shards) == 1:
+            sitemap = shards[0][2]
+        else:
+            xml = render_stream(SITEMAP_INDEX_TEMPLATE, sitemaps=(
+                {'loc': '%ssitemap-%d.xml' % (index_url, number),
+                 'lastmod': lastmod}
+                for number, (_, lastmod, _) in enumerate(shards, 1)))
+            sitemap = (xml, gzip_bytes(xml))
 
+        self._entry = (generation, index_url, sitemap, shards)
+
+        end = time.time()
+        logging.info("completed sitemap generation (%s of %s shards "
+                     "rendered) in %s seconds",
+                     rendered, len(shards), (end - start))
+
+    @staticmethod
+    def _shard_urls(urls, max_urls, shard_count):
+        """Split URLs into shards by a hash of the URL.
+
+        The shard count of the previous sitemap is kept while the shards
+        stay at most half full on average and none overflows, otherwise it
+        is doubled, so pages only move between shards when the site grows.
+
+        :param urls: List of URL paths in scan order
+        :param max_urls: Maximum number of URLs in one shard
+        :param shard_count: Shard count of the previous sitemap
+        :return: List of lists of URL paths, a single list if all URLs fit
+                 in one sitemap
+        """
+        if len(urls) <= max_urls:
+            return [urls]
+
+        while shard_count * max_urls < 2 * len(urls):
+            shard_count *= 2
+        hashes = [zlib.crc32(url.encode('utf-8')) for url in urls]
+        while True:
+            buckets = [[] for _ in range(shard_count)]
+            for url, url_hash in zip(urls, hashes):
+                buckets[url_hash % shard_count].append(url)
+            if max(len(bucket) for bucket in buckets) <= max_urls:
+                return buckets
+            shard_count *= 2
+
+    def rebuild_async(self, site):
+        """Regenerate the sitemap for the current content in the background.
+
+        The external index URL is only known once the sitemap has been
+        requested, until then the first request generates it.
+        """
+        index_url = self.index_url
+        if index_url is None:
+            return None
+
+        def rebuild():
+            """Thread target generating the sitemap."""
+            with site.app_context():
+                self.get(site, index_url)
+
+        thread = threading.Thread(target=rebuild, name='mdweb-sitemap')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
+class SiteMapView(View):
+    """Sitemap View Object.
+
+    Sitemaps are served gzip encoded to clients accepting it. Views created
+    with gzipped=True serve the .xml.gz variant as a gzip file.
+    """
+
+    def __init__(self, gzipped=False):
+        """Initialize the view.
+
+        :param gzipped: Serve the sitemap as a .gz file
+        """
+        self.gzipped = gzipped
+
+    def dispatch_request(self, shard=None):  # pylint: disable=W0221
+        """Flask dispatch method."""
         index_url = url_for('index', _external=True)
 
-        for url, page in app.navigation.get_page_dict().items():
+        if self.gzipped:
+            sitemap = app.sitemap_cache.get(app, index_url, shard,
+                                            compressed=True)
+            if sitemap is None:
+                abort(404)
+
+            response = make_response(sitemap)
+            response.headers["Content-Type"] = "application/x-gzip"
+            return response
+
+        accepts_gzip = request.accept_encodings['gzip'] > 0
+        sitemap = app.sitemap_cache.get(app, index_url, shard,
+                                        compressed=accepts_gzip)
+        if sitemap is None:
+            abort(404)
+
+        response = make_response(sitemap)
+        response.headers["Content-Type"] = "application/xml"
+        if accepts_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @classmethod
+    def sitemap_entries(cls, index_url, urls=None):
+        """Yield a sitemap entry for every published page.
+
+        :param index_url: External URL of the site index
+        :param urls: URL paths of the pages to list, all pages if None
+        """
+        if urls is None:
+            pages = app.pages.items()
+        else:
+            pages = ((url, app.pages[url]) for url in urls)
+        for url, page in pages:
             if page.meta_inf.published:
-                mtime = os.path.getmtime(page.page_path)
+                mtime = page.mtime
+                if mtime is None:
+                    mtime = os.path.getmtime(page.page_path)
                 if isinstance(mtime, numbers.Real):
                     mtime = datetime.datetime.fromtimestamp(mtime)
                 mtime.replace(tzinfo=pytz.UTC)
                 # lastmod = mtime.strftime('%Y-%m-%dT%H:%M:%S%z')
                 lastmod = mtime.strftime('%Y-%m-%d')
-                pages.append({
+                yield {
                     'loc': "%s%s" % (index_url, url),
                     'lastmod': lastmod,
                     'changefreq': page.meta_inf.sitemap_changefreq,
                     'priority': page.meta_inf.sitemap_priority,
-                })
+                }
 
-        sitemap_xml = render_template_string(SITEMAP_TEMPLATE, pages=pages)
+    @classmethod
+    def generate_sitemap(cls, index_url=None):
+        """Generate sitemap.xml. Makes a list of urls and date modified.
 
-        end = time.time()
-        logging.info("completed sitemap generation in %s seconds",
-                     (end - start))
+        This renders every published page into a single urlset regardless
+        of the shard size.
+
+        :param index_url: External URL of the site index, looked up with
+                          url_for if not given
+        """
+        if index_url is None:
+            index_url = url_for('index', _external=True)
 
-        return sitemap_xml
+        return render_stream(SITEMAP_TEMPLATE,
+                             pages=cls.sitemap_entries(index_url)) \
+            .decode('utf-8')
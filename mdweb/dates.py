@@ -0,0 +1,120 @@
+"""Metainf date field parsing.
+
+dateparser understands almost any date format but is slow to import and to
+run. Dates in metainf blocks are nearly always ISO-8601 or written as
+"February 1st, 2016" so those formats are parsed directly and dateparser is
+only used for anything else. Parsed dates are memoized as many pages share
+the same date strings.
+"""
+import datetime
+import re
+
+#: ISO-8601 style dates with optional time, 2016-02-01, 2016/02/01 10:20 or
+# 2016-02-01T10:20:30.123. Dates with a timezone are left to dateparser.
+ISO_DATE_REGEX = re.compile(
+    r'^(?P<year>\d{4})[-/](?P<month>\d{1,2})[-/](?P<day>\d{1,2})'
+    r'(?:[T ](?P<hour>\d{1,2}):(?P<minute>\d{2})'
+    r'(?::(?P<second>\d{2})(?:\.(?P<fraction>\d{1,6}))?)?)?$')
+
+#: Dates with an English month name, February 1st, 2016 or Feb 1 2016
+MONTH_DAY_YEAR_REGEX = re.compile(
+    r'^(?P<month>[a-zA-Z]+)\.? (?P<day>\d{1,2})(?:st|nd|rd|th)?,? '
+    r'(?P<year>\d{4})$')
+
+#: Dates with an English month name, 1st February 2016 or 1 Feb, 2016
+DAY_MONTH_YEAR_REGEX = re.compile(
+    r'^(?P<day>\d{1,2})(?:st|nd|rd|th)? (?P<month>[a-zA-Z]+)\.?,? '
+    r'(?P<year>\d{4})$')
+
+#: English month names and abbreviations
+MONTHS = {
+    'jan': 1, 'january': 1,
+    'feb': 2, 'february': 2,
+    'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4,
+    'may': 5,
+    'jun': 6, 'june': 6,
+    'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12,
+}
+
+#: Maximum number of memoized date strings
+DATE_CACHE_SIZE = 4096
+
+_date_cache = {}
+
+
+def parse_fast(value):
+    """Parse the common date formats without dateparser.
+
+    :param value: Date string
+    :return: Naive datetime or None if the format isn't recognised
+    """
+    match = ISO_DATE_REGEX.match(value)
+    if match:
+        fraction = match.group('fraction') or '0'
+        try:
+            return datetime.datetime(
+                int(match.group('year')),
+                int(match.group('month')),
+                int(match.group('day')),
+                int(match.group('hour') or 0),
+                int(match.group('minute') or 0),
+                int(match.group('second') or 0),
+                int(fraction.ljust(6, '0')))
+        except ValueError:
+            return None
+
+    match = MONTH_DAY_YEAR_REGEX.match(value) or \
+        DAY_MONTH_YEAR_REGEX.match(value)
+    if match:
+        month = MONTHS.get(match.group('month').lower())
+        if month is None:
+            return None
+        try:
+            return datetime.datetime(int(match.group('year')), month,
+                                     int(match.group('day')))
+        except ValueError:
+            return None
+
+    return None
+
+
+def parse_date(value):
+    """Parse a metainf date string.
+
+    :param value: Date string
+    :return: Parsed datetime or None if the string isn't a date
+    """
+    try:
+        return _date_cache[value]
+    except KeyError:
+        pass
+
+    date = parse_fast(value.strip())
+    if date is None:
+        # Imported here, dateparser is slow to import and rarely needed
+        import dateparser
+        date = dateparser.parse(value)
+
+    if len(_date_cache) >= DATE_CACHE_SIZE:
+        _date_cache.clear()
+    _date_cache[value] = date
+
+    return date
+
+
+def clear_date_cache():
+    """Forget all memoized dates."""
+    _date_cache.clear()
+
+
+def to_utc(date):
+    """Return a date as a naive UTC datetime, naive dates are taken as UTC."""
+    if date.tzinfo is not None:
+        date = (date - date.utcoffset()).replace(tzinfo=None)
+    return date
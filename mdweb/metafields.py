@@ -24,4 +24,5 @@ META_FIELDS = {
     'sitemap_priority': ('unicode', None),
     'sitemap_changefreq': ('unicode', None),
     'published': ('bool', True),
+    'tags': ('list', ()),
 }
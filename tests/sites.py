@@ -2,6 +2,7 @@
 from datetime import datetime
 from dateutil import parser
 from mdweb.MDSite import MDSite
+from mdweb.Page import Page
 
 index_md_file_string = u"""```metainf
 Title: MDWeb
@@ -313,3 +314,12 @@ def populate_fakefs(test):
     f = test.fs.create_file('/my/theme/templates/page_home.html',
                             contents=pagehome_file_string)
     f.st_mtime = datetime.timestamp(parser.parse('Thu, 28 Jun 2015 14:17:15 +0000'))
+
+
+def make_page(url_path, meta_inf=u"", body=u"", mtime=1):
+    """Create a rendered page with the given metainf block and body."""
+    meta_inf = meta_inf.rstrip(u"\n")
+    if meta_inf:
+        meta_inf += u"\n"
+    return Page('/my/content/%s.md' % url_path, url_path,
+                u"```metainf\n%s```\n%s" % (meta_inf, body), mtime=mtime)
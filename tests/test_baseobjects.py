@@ -53,3 +53,37 @@ class TestMetaInfParser(unittest.TestCase):
                           self.MockMetaInf,
                           '''Nav Name: Documentation
 Order: ''')
+
+    def test_comment_with_colon(self):
+        """Comments should be skipped even if they look like a field."""
+        meta_inf = self.MockMetaInf('''# Note: not a field
+Nav Name: Documentation
+# Order: 5
+''')
+
+        self.assertEqual(meta_inf.nav_name, 'Documentation')
+        self.assertEqual(meta_inf.order, 0)
+        self.assertNotIn('custom_note', meta_inf.custom_fields)
+
+    def test_bare_key_ignored(self):
+        """A key without any value should be ignored."""
+        meta_inf = self.MockMetaInf('''Nav Name:
+Order: 2
+''')
+
+        self.assertIsNone(meta_inf.nav_name)
+        self.assertEqual(meta_inf.order, 2)
+
+    def test_bare_key_ending_block(self):
+        """A bare key on the last line of a block should be an error."""
+        self.assertRaises(PageMetaInfFieldException, self.MockMetaInf,
+                          '\nTitle: A\nOrder:\n')
+        self.assertEqual(self.MockMetaInf('\nTitle: A\nOrder:').title, 'A')
+
+    def test_multiline_with_comments_and_crlf(self):
+        """Continuation lines should skip comments and handle CRLF."""
+        meta_inf = self.MockMetaInf(
+            'Nav Name: Docu\r\n# comment\r\n\r\n  mentation\r\nOrder: 3\r\n')
+
+        self.assertEqual(meta_inf.nav_name, 'Docu mentation')
+        self.assertEqual(meta_inf.order, 3)
@@ -0,0 +1,159 @@
+"""Tests for the MDWeb cached code highlighter."""
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    # Python >= 3.3
+    from unittest import mock
+except ImportError:
+    # Python < 3.3
+    import mock
+
+from mdweb import CodeHighlighter as highlighter_module
+from mdweb.CodeHighlighter import CodeHighlighter
+from mdweb.Page import Page
+
+CODE = u"def fish(count):\n    return '<%d fish>' % count\n"
+
+PAGE = u"""```metainf
+Title: Code
+```
+Some code:
+
+```python
+%s```
+
+```
+<plain & text>
+```
+""" % CODE
+
+
+@unittest.skipUnless(CodeHighlighter.available(), "Pygments not installed")
+class TestCodeHighlighter(unittest.TestCase):
+    """Code highlighter tests."""
+
+    def test_highlight(self):
+        """Code should be highlighted with CSS classes or a style."""
+        block_html = CodeHighlighter().highlight(CODE, 'python')
+
+        self.assertIn(u'class="codehilite"', block_html)
+        self.assertIn(u'<span class="k">def</span>', block_html)
+        self.assertIn(u' fish&gt;', block_html)
+
+        block_html = CodeHighlighter(style='monokai').highlight(CODE,
+                                                                'python')
+        self.assertIn(u'style="', block_html)
+        self.assertNotIn(u'class="k"', block_html)
+
+    def test_plain(self):
+        """Code without or with an unknown language should be escaped."""
+        highlighter = CodeHighlighter()
+
+        self.assertEqual(highlighter.highlight(u'<a & b>'),
+                         u'<pre><code>&lt;a &amp; b&gt;</code></pre>')
+        self.assertIn(u'&lt;a &amp; b&gt;',
+                      highlighter.highlight(u'<a & b>', 'no-such-language'))
+        self.assertEqual(highlighter.highlights, 1)
+
+    def test_memory_cache(self):
+        """Unchanged code should only be highlighted once per style."""
+        highlighter = CodeHighlighter()
+        with mock.patch.object(highlighter_module, 'pygments_highlight',
+                               wraps=highlighter_module.pygments_highlight) \
+                as highlight:
+            first = highlighter.highlight(CODE, 'python')
+            second = highlighter.highlight(CODE, 'python')
+            highlighter.highlight(CODE, 'ruby')
+            highlighter.style = 'monokai'
+            highlighter.highlight(CODE, 'python')
+
+        self.assertEqual(first, second)
+        self.assertEqual(highlight.call_count, 3)
+        self.assertEqual(highlighter.stats()['hits'], 1)
+        self.assertEqual(len(highlighter), 3)
+
+    def test_lru(self):
+        """The memory cache should drop the least recently used blocks."""
+        highlighter = CodeHighlighter(max_entries=2)
+        highlighter.highlight(u'a = 1', 'python')
+        highlighter.highlight(u'b = 2', 'python')
+        highlighter.highlight(u'a = 1', 'python')
+        highlighter.highlight(u'c = 3', 'python')
+
+        self.assertEqual(len(highlighter), 2)
+        highlighter.highlight(u'a = 1', 'python')
+        self.assertEqual(highlighter.hits, 2)
+        highlighter.highlight(u'b = 2', 'python')
+        self.assertEqual(highlighter.highlights, 4)
+
+    def test_disk_cache(self):
+        """Highlighted code should be shared through the disk cache."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache_path = os.path.join(directory, 'highlight')
+
+        first = CodeHighlighter(cache_path=cache_path)
+        block_html = first.highlight(CODE, 'python')
+        self.assertEqual(len(os.listdir(cache_path)), 1)
+
+        second = CodeHighlighter(cache_path=cache_path)
+        with mock.patch.object(highlighter_module,
+                               'pygments_highlight') as highlight:
+            self.assertEqual(second.highlight(CODE, 'python'), block_html)
+        highlight.assert_not_called()
+        self.assertEqual(second.disk_hits, 1)
+
+    def test_unwritable_disk_cache(self):
+        """Blocks should stay in memory if the disk cache can't be written."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache_path = os.path.join(directory, 'highlight')
+        with open(cache_path, 'w') as f:
+            f.write(u"Not a directory")
+
+        highlighter = CodeHighlighter(cache_path=cache_path)
+        block_html = highlighter.highlight(CODE, 'python')
+        self.assertEqual(highlighter.highlight(CODE, 'python'), block_html)
+        self.assertEqual(highlighter.hits, 1)
+
+        cache_path = os.path.join(directory, 'failing')
+        highlighter = CodeHighlighter(cache_path=cache_path)
+        with mock.patch.object(highlighter_module.os, 'replace',
+                               side_effect=OSError):
+            highlighter.highlight(CODE, 'python')
+        self.assertEqual(os.listdir(cache_path), [])
+        self.assertEqual(len(highlighter), 1)
+
+    def test_css(self):
+        """CSS should only be returned for blocks styled by classes."""
+        self.assertIn(u'.codehilite .k', CodeHighlighter().css())
+        self.assertEqual(CodeHighlighter(style='monokai').css(), u'')
+        with mock.patch.object(highlighter_module, 'pygments_highlight',
+                               None):
+            self.assertEqual(CodeHighlighter().css(), u'')
+
+    def test_page(self):
+        """Pages should render fenced code blocks through the highlighter."""
+        highlighter = CodeHighlighter()
+        page = Page('/my/content/code.md', 'code', PAGE,
+                    code_highlighter=highlighter)
+
+        self.assertIn(u'<span class="k">def</span>', page.page_html)
+        self.assertIn(u'<pre><code>&lt;plain &amp; text&gt;\n</code></pre>',
+                      page.page_html)
+        self.assertNotIn(u'```', page.page_html)
+
+        Page('/my/content/copy.md', 'copy', PAGE,
+             code_highlighter=highlighter)
+        self.assertEqual(highlighter.highlights, 1)
+        self.assertEqual(highlighter.hits, 1)
+
+    def test_parse_markdown(self):
+        """Code shouldn't be highlighted without a highlighter."""
+        page_html = Page.parse_markdown(u"```python\nx = 1\n```\n")
+
+        self.assertNotIn(u'codehilite', page_html)
+        self.assertIn(u'codehilite', Page.parse_markdown(
+            u"```python\nx = 1\n```\n", CodeHighlighter()))
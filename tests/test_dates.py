@@ -0,0 +1,72 @@
+"""Tests for metainf date parsing."""
+import datetime
+import unittest
+
+import dateparser
+
+from mdweb import dates
+from mdweb.dates import clear_date_cache, parse_date, parse_fast
+
+#: Date strings handled by the fast path
+FAST_PATH_DATES = [
+    '2016-02-01',
+    '2016-2-1',
+    '2016/05/12',
+    '2016-02-01 10:20',
+    '2016-02-01T10:20:30',
+    '2016-02-01T10:20:30.123',
+    'February 1st, 2016',
+    'February 1, 2016',
+    'Feb 1, 2016',
+    'Sept 1, 2016',
+    'february 3rd 2016',
+    'February 22nd, 2016',
+    '1 February 2016',
+    '2nd May, 2016',
+]
+
+
+class TestParseDate(unittest.TestCase):
+    """Date parsing tests."""
+
+    def setUp(self):
+        clear_date_cache()
+
+    def test_fast_path_matches_dateparser(self):
+        """Fast path dates should parse exactly as dateparser does."""
+        for date_string in FAST_PATH_DATES:
+            fast = parse_fast(date_string)
+            self.assertIsNotNone(fast, date_string)
+            self.assertEqual(fast, dateparser.parse(date_string), date_string)
+
+    def test_invalid_date(self):
+        """An impossible date should not parse."""
+        self.assertIsNone(parse_fast('2016-02-30'))
+        self.assertIsNone(parse_date('2016-02-30'))
+
+    def test_unknown_month(self):
+        """An unknown month name should be left to dateparser."""
+        self.assertIsNone(parse_fast('Smarch 1, 2016'))
+
+    def test_fallback(self):
+        """Free form and timezone aware dates should use dateparser."""
+        self.assertIsNone(parse_fast('2016-02-01T10:20:30Z'))
+        self.assertEqual(parse_date('May 2, 2016 10:30'),
+                         datetime.datetime(2016, 5, 2, 10, 30))
+        self.assertIsNotNone(parse_date('2016-02-01T10:20:30Z').tzinfo)
+
+    def test_memoized(self):
+        """Repeated date strings should be served from the cache."""
+        first = parse_date('2016-02-01')
+        self.assertIn('2016-02-01', dates._date_cache)
+        self.assertIs(parse_date('2016-02-01'), first)
+
+    def test_cache_bounded(self):
+        """The cache should never grow past its size."""
+        for day in range(1, 29):
+            for month in range(1, 13):
+                parse_date('2016-%02d-%02d' % (month, day))
+        for day in range(1, 29):
+            for month in range(1, 13):
+                parse_date('2015-%02d-%02d' % (month, day))
+        self.assertLessEqual(len(dates._date_cache), dates.DATE_CACHE_SIZE)
@@ -0,0 +1,182 @@
+"""Tests for the MDWeb RSS and Atom feeds."""
+from pyfakefs import fake_filesystem_unittest, fake_filesystem
+from flask_testing import TestCase
+try:
+    # Python >= 3.3
+    from unittest import mock
+except ImportError:
+    # Python < 3.3
+    import mock
+
+from werkzeug.http import parse_date
+
+from mdweb import FeedView as feed_module
+from mdweb.MDSite import MDSite
+
+
+class MDTestSite(MDSite):
+    """Site to use for testing."""
+
+    class MDConfig:  # pylint: disable=R0903
+        """Config for testing use."""
+
+        DEBUG = False
+        CONTENT_PATH = '/my/content/'
+        THEME = '/my/theme/'
+        TESTING = True
+        FEED_ITEMS = 3
+
+
+class TestFeedView(fake_filesystem_unittest.TestCase, TestCase):
+    """Feed view tests."""
+
+    def create_app(self):
+        """Create fake filesystem and flask app."""
+        self.setUpPyfakefs()
+        self.fake_os = fake_filesystem.FakeOsModule(self.fs)
+
+        self.fs.create_file('/my/content/index.md')
+        self.fs.create_file('/my/content/blog/index.md',
+                            contents=u"```metainf\nTitle: Fish & Blog\n"
+                                     u"Description: Posts about fish\n```\n")
+        for day in range(1, 6):
+            self.fs.create_file(
+                '/my/content/blog/post%d.md' % day,
+                contents=u"```metainf\nTitle: Post %d\nAuthor: Ann\n"
+                         u"Date: 2020-01-0%d\n```\nPost body" % (day, day))
+        self.fs.create_file('/my/content/blog/draft.md',
+                            contents=u"```metainf\nTitle: Draft\n"
+                                     u"Date: 2020-02-01\nPublished: False\n"
+                                     u"```\n")
+        self.fs.create_file('/my/content/news/index.md',
+                            contents=u"```metainf\nTitle: News\n"
+                                     u"Date: 2019-12-01\n```\n")
+        self.fs.create_file('/my/content/news/2020/index.md',
+                            contents=u"```metainf\nTitle: News 2020\n"
+                                     u"Date: 2020-01-10\n```\n")
+        self.fs.create_file('/my/content/about/index.md')
+        self.fs.create_file('/my/theme/assets/css/style.css')
+        self.fs.create_file('/my/theme/assets/js/site.js')
+        self.fs.create_file('/my/theme/templates/page.html',
+                            contents=u"{{ page|safe }}")
+
+        app = MDTestSite("MDWeb", app_options={})
+        self.fs.add_real_directory(app.config['PARTIALS_TEMPLATE_PATH'])
+        app.start()
+
+        return app
+
+    def test_rss(self):
+        """The RSS feed should list the newest published pages."""
+        with self.app.test_client() as client:
+            response = client.get('/blog/rss.xml')
+
+        self.assert200(response)
+        self.assertEqual(response.headers['Content-Type'],
+                         'application/rss+xml; charset=utf-8')
+        xml = response.data.decode('utf-8')
+        self.assertIn(u'<title>Fish &amp; Blog</title>', xml)
+        self.assertIn(u'<description>Posts about fish</description>', xml)
+        self.assertIn(u'<atom:link href="http://localhost/blog/rss.xml"',
+                      xml)
+        self.assertEqual(xml.count(u'<item>'), 3)
+        self.assertLess(xml.index(u'Post 5'), xml.index(u'Post 4'))
+        self.assertNotIn(u'Draft', xml)
+        self.assertIn(u'<link>http://localhost/blog/post5</link>', xml)
+        self.assertIn(u'<pubDate>Sun, 05 Jan 2020 00:00:00 GMT</pubDate>',
+                      xml)
+
+    def test_atom(self):
+        """The Atom feed should hold the same entries."""
+        with self.app.test_client() as client:
+            response = client.get('/blog/atom.xml')
+
+        self.assert200(response)
+        self.assertEqual(response.headers['Content-Type'],
+                         'application/atom+xml; charset=utf-8')
+        xml = response.data.decode('utf-8')
+        self.assertEqual(xml.count(u'<entry>'), 3)
+        self.assertIn(u'<updated>2020-01-05T00:00:00Z</updated>', xml)
+        self.assertIn(u'<author><name>Ann</name></author>', xml)
+
+    def test_levels(self):
+        """Feeds should cover a level and the levels below it."""
+        with self.app.test_client() as client:
+            root = client.get('/rss.xml').data.decode('utf-8')
+            news = client.get('/news/rss.xml').data.decode('utf-8')
+            about = client.get('/about/atom.xml').data.decode('utf-8')
+
+            self.assert404(client.get('/missing/rss.xml'))
+            self.assert404(client.get('/blog/post1/rss.xml'))
+
+        self.assertIn(u'News 2020', root)
+        self.assertEqual(root.count(u'<item>'), 3)
+        self.assertEqual(news.count(u'<item>'), 2)
+        self.assertNotIn(u'Post', news)
+        self.assertEqual(about.count(u'<entry>'), 0)
+
+    def test_conditional(self):
+        """Unchanged feeds should be answered with 304 Not Modified."""
+        with self.app.test_client() as client:
+            response = client.get('/blog/rss.xml')
+            etag = response.headers['ETag']
+            last_modified = response.headers['Last-Modified']
+
+            response = client.get('/blog/rss.xml',
+                                  headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+
+            response = client.get('/blog/rss.xml',
+                                  headers={'If-Modified-Since':
+                                           last_modified})
+            self.assertEqual(response.status_code, 304)
+
+            response = client.get('/blog/rss.xml',
+                                  headers={'If-None-Match': '"other"'})
+            self.assert200(response)
+
+    def test_last_modified(self):
+        """Last-Modified should only move forward as the feed changes."""
+        with self.app.test_client() as client:
+            last_modified = client.get('/blog/rss.xml').headers[
+                'Last-Modified']
+
+            self.app.start()
+            response = client.get('/blog/rss.xml',
+                                  headers={'If-Modified-Since':
+                                           last_modified})
+            self.assertEqual(response.status_code, 304)
+
+            # Removing the newest post changes the feed to older posts
+            self.fs.remove_object('/my/content/blog/post5.md')
+            self.app.start()
+            response = client.get('/blog/rss.xml',
+                                  headers={'If-Modified-Since':
+                                           last_modified})
+            self.assert200(response)
+            self.assertNotIn(b'Post 5', response.data)
+            self.assertGreater(
+                parse_date(response.headers['Last-Modified']),
+                parse_date(last_modified))
+
+    def test_cached(self):
+        """Feeds should be rendered once per content generation."""
+        with mock.patch.object(feed_module, 'render_stream',
+                               wraps=feed_module.render_stream) as render:
+            with self.app.test_client() as client:
+                first = client.get('/blog/rss.xml').data
+                client.get('/blog/rss.xml')
+                client.get('/blog/atom.xml')
+            self.assertEqual(render.call_count, 2)
+
+            self.fs.create_file('/my/content/blog/post6.md',
+                                contents=u"```metainf\nTitle: Post 6\n"
+                                         u"Date: 2020-01-06\n```\n")
+            self.app.start()
+            with self.app.test_client() as client:
+                second = client.get('/blog/rss.xml').data
+            self.assertEqual(render.call_count, 3)
+
+        self.assertNotIn(b'Post 6', first)
+        self.assertIn(b'Post 6', second)
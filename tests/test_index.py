@@ -4,6 +4,14 @@ Tests for the MDWeb Index
 """
 from pyfakefs import fake_filesystem_unittest, fake_filesystem
 from flask_testing import TestCase
+try:
+    # Python >= 3.3
+    from unittest import mock
+except ImportError:
+    # Python < 3.3
+    import mock
+
+from mdweb.Index import Index
 from mdweb.MDSite import MDSite
 
 
@@ -121,3 +129,79 @@ class TestIndex(fake_filesystem_unittest.TestCase, TestCase):
             self.assertEqual(
                 result.data,
                 b'The method is not allowed for the requested URL.')
+
+    def test_custom_error_pages_parsed_at_boot(self):
+        """Custom error pages should not be loaded at request time."""
+        self.assertEqual(sorted(self.app.error_pages.keys()), [404, 500])
+
+        with mock.patch('mdweb.MDSite.load_page') as mock_load_page:
+            with self.app.test_client() as client:
+                client.get('/nowhere')
+
+        self.assertFalse(mock_load_page.called)
+
+    def test_custom_error_render_cached(self):
+        """Custom error pages should only render once per generation."""
+        with mock.patch.object(Index, 'render',
+                               wraps=Index.render) as mock_render:
+            with self.app.test_client() as client:
+                first = client.get('/nowhere')
+                second = client.get('/somewhere/else')
+
+        self.assertEqual(mock_render.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.status_code, 404)
+
+    def test_custom_error_reloaded(self):
+        """Changed error pages should be used after a content reload."""
+        with self.app.test_client() as client:
+            client.get('/nowhere')
+
+        self.fs.remove_object('/my/content/404.md')
+        self.fs.create_file('/my/content/404.md', contents='Gone')
+        self.app.start()
+
+        with self.app.test_client() as client:
+            result = client.get('/nowhere')
+
+        self.assertEqual(result.data,
+                         b'<html><body>\n<p>Gone</p>\n</body></html>')
+
+    def test_not_found_fast_path(self):
+        """Repeated requests for an unknown path should skip the lookup."""
+        with self.app.test_client() as client:
+            first = client.get('/wp-login.php')
+            with mock.patch.object(self.app, 'get_page') as mock_get_page:
+                second = client.get('/wp-login.php')
+
+        self.assertFalse(mock_get_page.called)
+        self.assertEqual(second.status_code, 404)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(self.app.not_found_cache.hits, 1)
+        self.assertEqual(self.app.not_found_cache.misses, 1)
+
+    def test_not_found_counted(self):
+        """Every 404 should be counted and reported after a reload."""
+        with self.app.test_client() as client:
+            client.get('/wp-login.php')
+            client.get('/wp-login.php')
+            client.get('/contentassets/missing.png')
+
+        self.app.start()
+
+        self.assertEqual(self.app.boot_stats['not_found_hits'], 1)
+        self.assertEqual(self.app.boot_stats['not_found_misses'], 1)
+        self.assertEqual(self.app.boot_stats['not_found_other'], 1)
+
+    def test_not_found_cache_cleared_on_reload(self):
+        """A content reload should forget the cached unknown paths."""
+        with self.app.test_client() as client:
+            client.get('/news')
+
+        self.fs.create_file('/my/content/news/index.md')
+        self.app.start()
+
+        with self.app.test_client() as client:
+            result = client.get('/news')
+
+        self.assertEqual(result.status_code, 200)
@@ -1,5 +1,9 @@
 """Tests for the MDWeb Site."""
+import shutil
+import tempfile
+
 from pyfakefs import fake_filesystem_unittest, fake_filesystem
+from pyfakefs.fake_filesystem_unittest import Pause
 
 from flask_testing import TestCase
 try:
@@ -13,6 +17,8 @@ except ImportError:
     # Python < 3.3
     import mock
 
+from mdweb.CodeHighlighter import CodeHighlighter
+from mdweb.Exceptions import ConfigException
 from mdweb.Page import Page
 from mdweb.MDSite import MDSite
 from tests.sites import (MDTestSite, MDFakeFSTestSite,
@@ -67,6 +73,280 @@ class TestSite(fake_filesystem_unittest.TestCase, TestCase):
             response = client.get('/contentassets/missing_logo.png')
         self.assert404(response)
 
+    def test_source_retention(self):
+        """Dropped page sources should be reported in the boot stats."""
+        self.assertEqual(self.app.boot_stats['source_bytes_released'], 0)
+
+        with mock.patch.object(MDFakeFSTestSite.MDConfig,
+                               'PAGE_SOURCE_RETENTION', 'drop', create=True):
+            self.app.start()
+
+        self.assertGreater(self.app.boot_stats['source_bytes_released'], 0)
+        self.assertFalse(self.app.get_page('about')._markdown_str)
+
+    def test_page_html_budget(self):
+        """Page HTML should be held by the store when a budget is set."""
+        self.assertEqual(len(self.app.page_html_store), 0)
+
+        with mock.patch.object(MDFakeFSTestSite.MDConfig,
+                               'PAGE_HTML_BUDGET', 1000000, create=True):
+            self.app.start()
+
+        page = self.app.get_page('about')
+        self.assertIn(page, self.app.page_html_store)
+
+        with self.app.test_client() as client:
+            response = client.get('/about')
+
+        self.assert200(response)
+        self.assertGreater(self.app.page_html_store.hits, 0)
+
+    def test_page_html_store_reported(self):
+        """The page HTML store counters should be in the boot stats."""
+        self.assertEqual(self.app.boot_stats['html_store_resident_bytes'], 0)
+
+        with mock.patch.object(MDFakeFSTestSite.MDConfig,
+                               'PAGE_HTML_BUDGET', 1000000, create=True):
+            self.app.start()
+            self.assertGreater(
+                self.app.boot_stats['html_store_resident_bytes'], 0)
+            with self.app.test_client() as client:
+                client.get('/about')
+            self.app.start()
+
+        self.assertGreater(self.app.boot_stats['html_store_hits'], 0)
+        self.assertGreater(self.app.boot_stats['html_store_hit_rate'], 0)
+        self.assertIn('html_store_mean_render_seconds', self.app.boot_stats)
+
+    def test_invalid_source_retention(self):
+        """An unknown source retention mode should raise ConfigException."""
+        with mock.patch.object(MDFakeFSTestSite.MDConfig,
+                               'PAGE_SOURCE_RETENTION', 'forget',
+                               create=True):
+            self.assertRaises(ConfigException, self.app.start)
+
+    def test_meta_index(self):
+        """The meta index should be built and added to the context."""
+        self.assertEqual(self.app.meta_index.pages[0],
+                         self.app.get_page(''))
+
+        with self.app.test_client() as client:
+            client.get('/about')
+            self.assertContext('meta_index', self.app.meta_index)
+
+    def test_sorted_pages_memoized(self):
+        """Orderings should be memoized per page list and generation."""
+        sorted_pages = self.app.jinja_env.filters['sorted_pages']
+        page_list = list(self.app.pages.values())
+
+        with mock.patch.object(MDSite, '_sorted_pages_filter',
+                               wraps=MDSite._sorted_pages_filter) as sort:
+            first = sorted_pages(page_list, 'order', 2)
+            self.assertEqual(sort.call_count, 1)
+
+            # An equal list built again reuses the ordering
+            self.assertEqual(sorted_pages(list(page_list), 'order', 2),
+                             first)
+            self.assertEqual(sort.call_count, 1)
+
+            second = sorted_pages(page_list, 'order')
+            sorted_pages(page_list, 'order', 1)
+            self.assertEqual(sort.call_count, 2)
+
+            self.app.start()
+            sorted_pages = self.app.jinja_env.filters['sorted_pages']
+            sorted_pages(page_list, 'order', 2)
+            self.assertEqual(sort.call_count, 3)
+
+        self.assertEqual(first, second[0:2])
+        self.assertEqual(len(second), len(page_list))
+
+    def test_sorted_children_memoized(self):
+        """Navigation children should reuse the ordering across renders."""
+        for n in range(4):
+            self.fs.create_file('/my/content/blog/post%d.md' % n,
+                                contents=u"```metainf\nOrder: %d\n```" % -n)
+        self.app.start()
+        blog = [nav for nav in self.app.navigation.child_navs
+                if 'blog' == nav.name][0]
+        template = self.app.jinja_env.from_string(
+            u"{% for page in nav.children|sorted_pages('order', 2) %}"
+            u"{{ page.url_path }},{% endfor %}")
+
+        with mock.patch.object(MDSite, '_sorted_pages_filter',
+                               wraps=MDSite._sorted_pages_filter) as sort:
+            for _ in range(5):
+                listing = template.render(nav=blog)
+
+        self.assertEqual(sort.call_count, 1)
+        self.assertEqual(len(self.app.sorted_pages_cache), 1)
+        self.assertEqual(listing, u"blog/post3,blog/post2,")
+
+    def test_sorted_published_pages(self):
+        """The published filter should chain into sorted_pages."""
+        template = self.app.jinja_env.from_string(
+            u"{% for page in pages|published|sorted_pages('order', 1, True) "
+            u"%}{{ page.url_path }}{% endfor %}")
+        pages = list(self.app.pages.values())
+
+        self.assertEqual(
+            template.render(pages=pages),
+            MDSite._sorted_pages_filter(pages, 'order', 1, True)[0].url_path)
+        template.render(pages=pages)
+        self.assertEqual(len(self.app.sorted_pages_cache), 1)
+
+    def test_unpublished_page(self):
+        """Unpublished pages should only be served in preview mode."""
+        self.fs.create_file('/my/content/about/draft.md',
+                            contents=u"```metainf\nPublished: False\n```")
+        self.app.start()
+
+        self.assertIsNone(self.app.get_page('about/draft'))
+        with self.app.test_client() as client:
+            self.assert404(client.get('/about/draft'))
+
+        with mock.patch.object(MDFakeFSTestSite.MDConfig, 'PREVIEW', True,
+                               create=True):
+            self.app.start()
+
+        self.assertIsNotNone(self.app.get_page('about/draft'))
+        with self.app.test_client() as client:
+            self.assert200(client.get('/about/draft'))
+
+    def test_unpublished_page_not_rendered(self):
+        """Unpublished pages should only be rendered in preview mode."""
+        self.fs.create_file('/my/content/about/draft.md',
+                            contents=u"```metainf\nPublished: False\n```\n"
+                                     u"Draft *body*")
+        self.app.start()
+
+        draft = self.app.full_navigation.child_navs[0].child_pages[0]
+        self.assertEqual(draft.url_path, 'about/draft')
+        self.assertFalse(draft.body_loaded)
+        self.assertEqual(self.app.boot_stats['unpublished_skipped'], 1)
+        self.assertGreaterEqual(
+            self.app.boot_stats['unpublished_seconds_saved'], 0)
+
+        with mock.patch.object(MDFakeFSTestSite.MDConfig, 'PREVIEW', True,
+                               create=True):
+            self.app.start()
+
+        draft = self.app.get_page('about/draft')
+        self.assertTrue(draft.body_loaded)
+        self.assertEqual(self.app.boot_stats['unpublished_skipped'], 0)
+        self.assertEqual(self.app.boot_stats['unpublished_seconds_saved'], 0)
+
+    def test_search(self):
+        """Search should answer from the index and rebuild incrementally."""
+        self.fs.create_file('/my/content/about/snakes.md',
+                            contents=u"```metainf\nTitle: Snakes\n```\n"
+                                     u"A python is a snake.")
+        self.app.start()
+        self.assertIsNone(self.app.search_index)
+        with self.app.test_client() as client:
+            self.assert404(client.get('/search?q=python'))
+
+        with mock.patch.object(MDFakeFSTestSite.MDConfig, 'SEARCH_ENABLED',
+                               True, create=True):
+            self.app.start()
+            self.assertEqual(self.app.search_index.pages_tokenized,
+                             len(self.app.pages))
+
+            with self.app.test_client() as client:
+                response = client.get('/search?q=Python')
+            self.assert200(response)
+            self.assertEqual(response.json['query'], 'Python')
+            self.assertEqual([result['url'] for result
+                              in response.json['results']],
+                             ['/about/snakes'])
+            self.assertEqual(response.json['results'][0]['title'], 'Snakes')
+
+            self.fs.create_file('/my/theme/templates/search.html',
+                                contents=u"{% for page in results %}"
+                                         u"{{ page.meta_inf.title }}"
+                                         u"{% endfor %}")
+            self.app.start()
+            self.assertEqual(self.app.search_index.pages_tokenized, 0)
+
+            with self.app.test_client() as client:
+                response = client.get('/search?q=snake')
+            self.assert200(response)
+            self.assertEqual(response.data, b'Snakes')
+
+    def test_sqlite_store(self):
+        """The SQLite store should answer search instead of the index."""
+        with Pause(self.fs):
+            directory = tempfile.mkdtemp()
+
+        def remove_directory():
+            """Remove the real store directory."""
+            with Pause(self.fs):
+                shutil.rmtree(directory)
+        self.addCleanup(remove_directory)
+
+        self.fs.create_file('/my/content/about/snakes.md',
+                            contents=u"```metainf\nTitle: Snakes\n"
+                                     u"Date: 2020-01-01\n```\n"
+                                     u"A python is a snake.")
+        with mock.patch.multiple(MDFakeFSTestSite.MDConfig, create=True,
+                                 SEARCH_ENABLED=True, DEFER_PAGE_BODIES=True,
+                                 SQLITE_STORE_PATH=directory + '/store.db'):
+            self.app.start()
+            self.assertIsNone(self.app.search_index)
+            # Writing the store doesn't load the deferred bodies
+            self.assertFalse(any(page.body_loaded
+                                 for page in self.app.pages.values()))
+            self.assertEqual(self.app.boot_stats['store_pages_written'],
+                             len(self.app.pages))
+
+            with self.app.test_client() as client:
+                response = client.get('/search?q=python')
+            self.assertEqual([result['url'] for result
+                              in response.json['results']],
+                             ['/about/snakes'])
+
+            self.app.start()
+            self.assertEqual(self.app.boot_stats['store_pages_written'], 0)
+            self.assertEqual(
+                self.app.jinja_env.filters['pages'](
+                    self.app.sqlite_store.latest(1)),
+                [self.app.get_page('about/snakes')])
+            self.app.sqlite_store.close()
+
+    @unittest.skipUnless(CodeHighlighter.available(), "Pygments not installed")
+    def test_code_highlight(self):
+        """Code blocks should be highlighted once across reloads."""
+        self.fs.create_file('/my/content/about/code.md',
+                            contents=u"```metainf\nTitle: Code\n```\n"
+                                     u"```python\nx = 1\n```\n")
+        self.app.start()
+        self.assertNotIn(u'codehilite',
+                         self.app.get_page('about/code').page_html)
+        with self.app.test_client() as client:
+            client.get('/about')
+            self.assertContext('code_highlight_css', '')
+
+        with mock.patch.object(MDFakeFSTestSite.MDConfig, 'CODE_HIGHLIGHT',
+                               True, create=True):
+            self.app.start()
+            self.assertIn(u'codehilite',
+                          self.app.get_page('about/code').page_html)
+            with self.app.test_client() as client:
+                client.get('/about')
+                self.assertIn(u'.codehilite', self.get_context_variable(
+                    'code_highlight_css'))
+            self.assertEqual(self.app.boot_stats['code_blocks_highlighted'],
+                             1)
+
+            self.app.start()
+            self.assertEqual(self.app.boot_stats['code_blocks_highlighted'],
+                             0)
+            self.assertEqual(self.app.code_highlighter.hits, 1)
+
+            with mock.patch('mdweb.CodeHighlighter.pygments_highlight',
+                            None):
+                self.assertRaises(ConfigException, self.app.start)
+
     def test_page_lookup(self):
         """Page lookup should return the correct page based on URL path."""
         page = self.app.get_page('')
@@ -280,6 +560,26 @@ Order: 1
         self.assertEqual(len(sorted_list), 2)
 
 
+    def test_top_k_matches_sort(self):
+        """Heap selection should match slicing a full sort, including ties."""
+        page_list = self.page_list * 10
+
+        for attribute in ['title', 'date', 'order']:
+            for reverse in [False, True]:
+                full = MDSite._sorted_pages_filter(page_list, attribute,
+                                                   reverse=reverse)
+                top = MDSite._sorted_pages_filter(page_list, attribute, 3,
+                                                  reverse)
+                self.assertEqual(top, full[0:3])
+
+    def test_default_arguments(self):
+        """Page count and direction should be optional."""
+        sorted_list = MDSite._sorted_pages_filter(self.page_list, 'date')
+
+        self.assertEqual(len(sorted_list), 4)
+        self.assertEqual(sorted_list[0].meta_inf.title, 'Blog Story 1')
+
+
 class TestPublishedFilter(unittest.TestCase):
     """Test Jinja sort filter"""
     pass
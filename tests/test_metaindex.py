@@ -0,0 +1,64 @@
+"""Tests for the MDWeb meta index."""
+import datetime
+import unittest
+
+from mdweb.MetaIndex import MetaIndex
+from tests.sites import make_page
+
+
+class TestMetaIndex(unittest.TestCase):
+    """MetaIndex object tests."""
+
+    def setUp(self):
+        self.old = make_page('old', u"Author: Ann\nDate: 2015-01-01\n"
+                                    u"Tags: python, cms\nSeries: intro")
+        self.new = make_page('new', u"Author: Bob\nDate: 2016-01-01\n"
+                                    u"Tags: python")
+        self.newest = make_page('newest', u"Author: Ann\nDate: 2017-01-01\n"
+                                          u"Series: intro")
+        self.undated = make_page('undated', u"Author: Ann")
+        self.draft = make_page('draft', u"Author: Ann\nDate: 2018-01-01\n"
+                                        u"Published: False\nTags: python")
+        self.index = MetaIndex([self.old, self.undated, self.draft,
+                                self.newest, self.new], ['series'])
+
+    def test_latest(self):
+        """Dated pages should be listed newest first."""
+        self.assertEqual(self.index.latest(),
+                         (self.newest, self.new, self.old))
+        self.assertEqual(self.index.latest(2), (self.newest, self.new))
+        self.assertEqual(self.index.pages,
+                         (self.newest, self.new, self.old, self.undated))
+
+    def test_by_author(self):
+        """Pages should be grouped by author newest first."""
+        self.assertEqual(self.index.by_author(u'Ann'),
+                         (self.newest, self.old, self.undated))
+        self.assertEqual(self.index.by_author(u'Nobody'), ())
+        self.assertEqual(self.index.authors, [u'Ann', u'Bob'])
+
+    def test_by_tag(self):
+        """Pages should be grouped by each of their tags."""
+        self.assertEqual(self.index.by_tag(u'python'), (self.new, self.old))
+        self.assertEqual(self.index.by_tag(u'cms'), (self.old,))
+        self.assertEqual(self.index.tags, [u'cms', u'python'])
+
+    def test_by_field(self):
+        """Pages should be grouped by the configured custom fields."""
+        self.assertEqual(self.index.by_field('series', u'intro'),
+                         (self.newest, self.old))
+        self.assertEqual(self.index.field_values('series'), [u'intro'])
+        self.assertRaises(KeyError, self.index.by_field, 'author', u'Ann')
+
+    def test_unpublished_skipped(self):
+        """Unpublished pages should not be indexed."""
+        self.assertNotIn(self.draft, self.index.pages)
+
+    def test_timezone_aware_dates(self):
+        """Naive and timezone aware dates should sort together."""
+        aware = make_page('aware', u"Date: 2016-06-01T10:00:00+02:00")
+        index = MetaIndex([self.new, aware, self.newest])
+
+        self.assertEqual(aware.meta_inf.date.utcoffset(),
+                         datetime.timedelta(hours=2))
+        self.assertEqual(index.latest(), (self.newest, aware, self.new))
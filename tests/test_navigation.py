@@ -703,3 +703,199 @@ Order: -34
     def test_unpublished_nav(self):
         """Unpublished navigation items should have the correct attr value."""
         self.assertEqual(1, 2)
+
+    def test_deferred_body_scan(self):
+        """A deferred scan should only read the meta information."""
+        body = u"Some *markdown*\n" * 1000
+        self.fs.create_file('/my/content/index.md', contents=u"""```metainf
+Title: Home
+```
+""" + body)
+        self.fs.create_file('/my/content/about/index.md', contents=body)
+
+        nav = Navigation('/my/content', scan_options={'defer_body': True})
+
+        self.assertEqual(nav.page.meta_inf.title, 'Home')
+        self.assertFalse(nav.page.body_loaded)
+        self.assertEqual(nav.scan_stats['pages'], 2)
+        self.assertEqual(nav.scan_stats['bytes_total'],
+                         2 * len(body) + len(u"```metainf\nTitle: Home\n```\n"))
+        self.assertEqual(nav.scan_stats['bytes_read'],
+                         len(u"```metainf\nTitle: Home\n```\n") +
+                         len(u"```metainf"))
+
+        self.assertEqual(nav.page.markdown_str, u"\n" + body)
+        self.assertTrue(nav.page.body_loaded)
+        self.assertTrue(nav.child_navs[0].page.page_html.startswith(
+            u"<p>Some <em>markdown</em>"))
+
+    def test_published_view(self):
+        """The published view should drop unpublished pages and levels."""
+        self.fs.create_file('/my/content/index.md')
+        self.fs.create_file('/my/content/about/index.md')
+        self.fs.create_file('/my/content/about/draft.md',
+                            contents=u"```metainf\nPublished: False\n```")
+        self.fs.create_file('/my/content/about/me.md')
+        self.fs.create_file('/my/content/drafts/index.md')
+        self.fs.create_file('/my/content/drafts/_navlevel.txt',
+                            contents=u"Published: False\n")
+        self.fs.create_file('/my/content/hidden/index.md',
+                            contents=u"```metainf\nPublished: False\n```")
+
+        nav = Navigation('/my/content')
+        view = nav.published_view()
+
+        self.assertEqual(len(nav.child_navs), 3)
+        self.assertEqual(len(nav.child_navs[0].child_pages), 2)
+        self.assertEqual([child.name for child in view.child_navs],
+                         ['about', 'hidden'])
+        self.assertEqual([page.url_path for page
+                          in view.child_navs[0].child_pages], ['about/me'])
+        self.assertIsNone(view.child_navs[1].page)
+        self.assertFalse(view.child_navs[1].has_page)
+        self.assertIs(view.page, nav.page)
+        self.assertEqual(sorted(view.get_page_dict()),
+                         ['', 'about', 'about/me'])
+
+    def test_links(self):
+        """Levels and pages should link to their parent and siblings."""
+        self.fs.create_file('/my/content/index.md')
+        self.fs.create_file('/my/content/blog/index.md')
+        self.fs.create_file('/my/content/blog/first.md',
+                            contents=u"```metainf\nOrder: 1\n```")
+        self.fs.create_file('/my/content/blog/second.md',
+                            contents=u"```metainf\nOrder: 2\n```")
+        self.fs.create_file('/my/content/blog/2020/index.md')
+        self.fs.create_file('/my/content/blog/2020/post.md')
+        self.fs.create_file('/my/content/news/_navlevel.txt',
+                            contents=u"Order: 1\n")
+        self.fs.create_file('/my/content/news/index.md')
+
+        nav = Navigation('/my/content')
+        blog, news = nav.child_navs
+        first, second = blog.child_pages
+        year = blog.child_navs[0]
+        post = year.child_pages[0]
+
+        self.assertIsNone(nav.parent)
+        self.assertIsNone(nav.page.parent)
+        self.assertIs(blog.parent, nav)
+        self.assertIs(blog.next, news)
+        self.assertIs(news.previous, blog)
+        self.assertIsNone(blog.previous)
+        self.assertIsNone(news.next)
+
+        self.assertIs(first.parent, blog)
+        self.assertIs(first.next, second)
+        self.assertIs(second.previous, first)
+        self.assertIsNone(second.next)
+
+        # Index pages take the place of their level
+        self.assertIs(blog.page.parent, nav)
+        self.assertIsNone(blog.page.next)
+        self.assertIs(year.page.parent, blog)
+
+        self.assertEqual(post.ancestors, [nav, blog, year])
+        self.assertEqual(year.page.ancestors, [nav, blog])
+        self.assertEqual(year.ancestors, [nav, blog])
+        self.assertEqual(nav.page.ancestors, [])
+
+    def test_published_view_links(self):
+        """Links of the published view should skip unpublished items."""
+        self.fs.create_file('/my/content/index.md')
+        self.fs.create_file('/my/content/blog/index.md')
+        self.fs.create_file('/my/content/blog/a.md')
+        self.fs.create_file('/my/content/blog/b.md',
+                            contents=u"```metainf\nPublished: False\n```")
+        self.fs.create_file('/my/content/blog/c.md')
+
+        nav = Navigation('/my/content')
+        page_a, page_b, page_c = nav.child_navs[0].child_pages
+        self.assertIs(page_a.next, page_b)
+
+        view = nav.published_view()
+
+        self.assertIs(page_a.next, page_c)
+        self.assertIs(page_c.previous, page_a)
+        self.assertIs(page_a.parent, view.child_navs[0])
+        self.assertIs(view.child_navs[0].parent, view)
+        self.assertEqual(page_c.ancestors, [view, view.child_navs[0]])
+
+    def test_full_scan_stats(self):
+        """A normal scan should read every byte of the content."""
+        self.fs.create_file('/my/content/index.md', contents=u"Home")
+        self.fs.create_file('/my/content/about/index.md', contents=u"About")
+
+        nav = Navigation('/my/content')
+
+        self.assertTrue(nav.page.body_loaded)
+        self.assertGreater(nav.scan_stats.pop('render_seconds'), 0)
+        self.assertEqual(nav.scan_stats,
+                         {'pages': 2, 'bytes_read': 9, 'bytes_total': 9,
+                          'source_bytes_released': 0, 'pages_rendered': 2,
+                          'unpublished_skipped': 0})
+
+    def test_skip_unpublished(self):
+        """Unpublished pages and levels should not be read or rendered."""
+        body = u"Some *markdown*\n" * 1000
+        unpublished = u"```metainf\nPublished: False\n```\n"
+        self.fs.create_file('/my/content/index.md', contents=unpublished)
+        self.fs.create_file('/my/content/about/index.md', contents=body)
+        self.fs.create_file('/my/content/about/draft.md',
+                            contents=unpublished + body)
+        self.fs.create_file('/my/content/drafts/_navlevel.txt',
+                            contents=u"Published: False\n")
+        self.fs.create_file('/my/content/drafts/index.md', contents=body)
+        self.fs.create_file('/my/content/drafts/old/index.md', contents=body)
+
+        nav = Navigation('/my/content',
+                         scan_options={'skip_unpublished': True})
+
+        about, drafts = nav.child_navs
+        self.assertTrue(nav.page.body_loaded)
+        self.assertTrue(about.page.body_loaded)
+        self.assertFalse(about.child_pages[0].body_loaded)
+        self.assertFalse(drafts.page.body_loaded)
+        self.assertFalse(drafts.child_navs[0].page.body_loaded)
+        self.assertEqual(nav.scan_stats['pages'], 5)
+        self.assertEqual(nav.scan_stats['pages_rendered'], 2)
+        self.assertEqual(nav.scan_stats['unpublished_skipped'], 3)
+        self.assertLess(nav.scan_stats['bytes_read'],
+                        nav.scan_stats['bytes_total'] - 2 * len(body))
+
+        # Skipped pages are still rendered if requested from the full tree
+        self.assertTrue(about.child_pages[0].page_html.startswith(
+            u"<p>Some <em>markdown</em>"))
+
+    def test_skip_unpublished_read_once(self):
+        """Served pages should be read once when skipping unpublished."""
+        body = u"Some *markdown*\n" * 1000
+        self.fs.create_file('/my/content/index.md', contents=body)
+        self.fs.create_file('/my/content/about/index.md',
+                            contents=u"```metainf\nTitle: About\n```\n" +
+                            body)
+        self.fs.create_file('/my/content/about/team.md',
+                            contents=u"---\ntitle: Team\n---\n" + body)
+
+        nav = Navigation('/my/content',
+                         scan_options={'skip_unpublished': True})
+
+        self.assertEqual(nav.scan_stats['pages_rendered'], 3)
+        self.assertEqual(nav.scan_stats['bytes_read'],
+                         nav.scan_stats['bytes_total'])
+
+    def test_source_retention(self):
+        """Released page sources should be counted and still readable."""
+        body = u"Some *markdown*\n" * 1000
+        self.fs.create_file('/my/content/index.md', contents=body)
+        self.fs.create_file('/my/content/about/index.md', contents=body)
+
+        for retention in ['compress', 'drop']:
+            nav = Navigation('/my/content',
+                             scan_options={'source_retention': retention})
+
+            self.assertGreater(nav.scan_stats['source_bytes_released'],
+                               len(body))
+            self.assertTrue(nav.page.page_html.startswith(
+                u"<p>Some <em>markdown</em>"))
+            self.assertEqual(nav.page.markdown_str, body)
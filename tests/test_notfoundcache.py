@@ -0,0 +1,71 @@
+"""Tests for the MDWeb not found cache."""
+import unittest
+
+from mdweb.NotFoundCache import NotFoundCache
+
+
+class TestNotFoundCache(unittest.TestCase):
+    """NotFoundCache object tests."""
+
+    def test_miss_then_hit(self):
+        """A path should only hit after it has been added."""
+        cache = NotFoundCache()
+
+        self.assertFalse(cache.hit('wp-login.php'))
+        cache.add('wp-login.php')
+        self.assertTrue(cache.hit('wp-login.php'))
+
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.not_found, 2)
+        self.assertEqual(cache.hit_rate, 0.5)
+
+    def test_bounded(self):
+        """The least recently used path should be evicted when full."""
+        cache = NotFoundCache(max_size=2)
+        cache.add('a')
+        cache.add('b')
+        cache.hit('a')
+        cache.add('c')
+
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.hit('a'))
+        self.assertFalse(cache.hit('b'))
+        self.assertTrue(cache.hit('c'))
+
+    def test_disabled(self):
+        """A zero sized cache should count but never store paths."""
+        cache = NotFoundCache(max_size=0)
+        cache.add('a')
+
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(cache.hit('a'))
+        self.assertEqual(cache.not_found, 1)
+
+    def test_other(self):
+        """404s of other routes should be counted apart from page lookups."""
+        cache = NotFoundCache()
+        cache.add('a')
+        cache.count_other()
+
+        self.assertEqual(cache.other, 1)
+        self.assertEqual(cache.not_found, 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_clear_keeps_counters(self):
+        """Clearing should forget paths but keep the counters."""
+        cache = NotFoundCache()
+        cache.add('a')
+        cache.hit('a')
+        cache.clear()
+
+        self.assertFalse(cache.hit('a'))
+        self.assertEqual(cache.stats(), {
+            'size': 0,
+            'max_size': 10000,
+            'not_found': 2,
+            'hits': 1,
+            'misses': 1,
+            'hit_rate': 0.5,
+            'other': 0,
+        })
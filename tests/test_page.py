@@ -12,16 +12,29 @@ Maybe test?
 
 """
 import datetime
+import random
+import re
+import time
 from pyfakefs import fake_filesystem_unittest
-from unittest import skip
+from unittest import skip, TestCase
 try:
     # Python >= 3.3
     from unittest import mock
 except ImportError:
     # Python < 3.3
     import mock
-
-from mdweb.Page import PageMetaInf, Page, load_page
+from mdweb.BaseObjects import MetaInfParser
+
+from mdweb.PageHTMLStore import PageHTMLStore
+from mdweb.Page import (
+    ABSTRACT_LENGTH,
+    PageMetaInf,
+    Page,
+    load_page,
+    read_page_header,
+    split_front_matter,
+    split_meta_inf,
+)
 from mdweb.Exceptions import (
     PageMetaInfFieldException,
     PageParseException,
@@ -198,6 +211,27 @@ Summary Image: blah.jpg
 
         self.assertEqual(meta_inf.custom_summary_image, u'blah.jpg')
 
+    def test_custom_field_per_instance(self):
+        """Custom fields should not leak to other meta-inf instances."""
+        meta_inf = PageMetaInf(u"Title: MDWeb\nHero Colour: blue\n")
+        other_meta_inf = PageMetaInf(u"Title: Other\n")
+
+        self.assertEqual(meta_inf.custom_hero_colour, u'blue')
+        self.assertIsNone(other_meta_inf.custom_hero_colour)
+        self.assertNotIn('custom_hero_colour', vars(MetaInfParser))
+        self.assertRaises(AttributeError, getattr, meta_inf, 'hero_colour')
+
+    def test_defaults_held_by_class(self):
+        """Unset fields should read as defaults without being stored."""
+        meta_inf = PageMetaInf(u"Title: MDWeb\n")
+
+        self.assertFalse(hasattr(meta_inf, '__dict__'))
+        self.assertEqual(meta_inf.title, u'MDWeb')
+        self.assertEqual(meta_inf.order, 0)
+        self.assertTrue(meta_inf.published)
+        self.assertIsNone(meta_inf.author)
+        self.assertEqual(meta_inf.custom_fields, {})
+
     @skip
     def test_unpublished_page(self):
         """Unpublished pages should have the correct attr value."""
@@ -668,18 +702,18 @@ you've got to put paragraph tags in your blockquotes:
         # pylint: disable=E501
         self.assertEqual(page.page_html,
                          '''<p>Examples taken from https://daringfireball.net/projects/markdown/basics</p>
-<h1>A First Level Header</h1>
-<h2>A Second Level Header</h2>
+<h1 id="a-first-level-header">A First Level Header</h1>
+<h2 id="a-second-level-header">A Second Level Header</h2>
 <p>Now is the time for all good men to come to
 the aid of their country. This is just a
 regular paragraph.</p>
 <p>The quick brown fox jumped over the lazy
 dog's back.</p>
-<h3>Header 3</h3>
+<h3 id="header-3">Header 3</h3>
 <blockquote>
 <p>This is a blockquote.</p>
 <p>This is the second paragraph in the blockquote.</p>
-<h2>This is an H2 in a blockquote</h2>
+<h2 id="this-is-an-h2-in-a-blockquote">This is an H2 in a blockquote</h2>
 </blockquote>
 <hr />
 <p>Some of these words <em>are emphasized</em>.
@@ -730,3 +764,339 @@ you've got to put paragraph tags in your blockquotes:</p>
 &lt;/blockquote&gt;
 </code></pre>
 <hr />''')
+
+    def test_table_of_contents(self):
+        """Headings should be collected into a nested table of contents."""
+        page = Page('/my/content/about/index.md', 'about', u"""# Intro
+
+Some text.
+
+## Setup
+
+### Install
+
+## Setup
+
+# Usage & More
+""")
+
+        self.assertEqual(
+            [(h['level'], h['id'], h['name']) for h in page.toc],
+            [(1, 'intro', 'Intro'), (1, 'usage-more', 'Usage &amp; More')])
+        self.assertEqual([h['id'] for h in page.toc[0]['children']],
+                         ['setup', 'setup_1'])
+        self.assertEqual(page.toc[0]['children'][0]['children'][0]['id'],
+                         'install')
+        self.assertIn(u'<h3 id="install">Install</h3>', page.page_html)
+
+        # Anchors are stable across renders
+        self.assertEqual(Page.parse_markdown(page.markdown_str),
+                         page.page_html)
+
+    def test_text_stats(self):
+        """Word count and reading time should come from the rendered text."""
+        page = Page('/my/content/about/index.md', 'about',
+                    u"# Title\n\n" + u"word *word* " * 250)
+
+        self.assertEqual(page.word_count, 501)
+        self.assertEqual(page.reading_time, 3)
+
+        empty = Page('/my/content/about/index.md', 'about', u"")
+        self.assertEqual(empty.word_count, 0)
+        self.assertEqual(empty.reading_time, 0)
+        self.assertEqual(empty.abstract, u"")
+        self.assertEqual(empty.toc, [])
+
+    def test_abstract(self):
+        """The abstract should be a plain text excerpt of the page."""
+        page = Page('/my/content/about/index.md', 'about',
+                    u"# Fish &amp; Chips\n\nA *short* page.")
+        self.assertEqual(page.abstract, u"Fish & Chips A short page.")
+
+        page = Page('/my/content/about/index.md', 'about',
+                    u"Lorem ipsum, " * 40)
+        self.assertLessEqual(len(page.abstract), ABSTRACT_LENGTH + 1)
+        self.assertTrue(page.abstract.endswith(u"ipsum, Lorem\u2026"))
+        self.assertNotIn(u"<", page.abstract)
+
+    def test_deferred_text_stats(self):
+        """Text statistics of a deferred page should render it once."""
+        self.fs.create_file('/my/content/about/index.md',
+                            contents=u"## Heading\n\nBody text")
+        store = PageHTMLStore(max_bytes=10000)
+        page = Page(*load_page('/my/content', '/my/content/about/index.md',
+                               header_only=True),
+                    defer_body=True, html_store=store)
+
+        self.assertEqual(page.word_count, 3)
+        self.assertEqual(page.toc[0]['id'], 'heading')
+        self.assertEqual(store.renders, 1)
+
+        # Statistics survive the HTML being evicted
+        store.clear()
+        self.assertEqual(page.abstract, u"Heading Body text")
+        self.assertEqual(store.renders, 1)
+
+
+class TestSplitMetaInf(TestCase):
+    """Meta information fence scanner tests."""
+
+    #: The regex the fence scanner replaced, used as the reference
+    REFERENCE_REGEX = re.compile(
+        r'(^```metainf(?P<metainf>.*?)```)?(?P<content>.*)', flags=re.DOTALL)
+
+    #: Upper bound in seconds for parsing any of the large inputs
+    MAX_PARSE_SECONDS = 1.0
+
+    def reference_split(self, file_string):
+        """Split the file string the way the old regex did."""
+        match = self.REFERENCE_REGEX.search(file_string)
+        return (match.group('metainf') or '', match.group('content'))
+
+    def test_split(self):
+        """The meta information should be split from the content."""
+        self.assertEqual(split_meta_inf(u"```metainf\nTitle: A\n```\nBody"),
+                         (u"\nTitle: A\n", u"\nBody"))
+
+    def test_no_meta_inf(self):
+        """A file without a block should be all content."""
+        self.assertEqual(split_meta_inf(u"Body\n```metainf\n```"),
+                         (u"", u"Body\n```metainf\n```"))
+
+    def test_unterminated_meta_inf(self):
+        """A block without a closing fence should be treated as content."""
+        self.assertEqual(split_meta_inf(u"```metainf\nTitle: A\n"),
+                         (u"", u"```metainf\nTitle: A\n"))
+
+    def test_fuzz_matches_reference(self):
+        """Random inputs should split exactly like the reference regex."""
+        pieces = [u'```metainf', u'```', u'``', u'`', u'\n', u'\r\n',
+                  u'Title: A', u'metainf', u' ', u'\u00e9', u'#']
+        rnd = random.Random(32)
+        for _ in range(5000):
+            file_string = u''.join(rnd.choice(pieces)
+                                   for _ in range(rnd.randint(0, 12)))
+            self.assertEqual(split_meta_inf(file_string),
+                             self.reference_split(file_string),
+                             repr(file_string))
+
+    def assert_bounded(self, func, *args):
+        """Assert that calling func returns within MAX_PARSE_SECONDS."""
+        start = time.time()
+        func(*args)
+        self.assertLess(time.time() - start, self.MAX_PARSE_SECONDS)
+
+    def test_bounded_split(self):
+        """Large and malformed files should split in bounded time."""
+        size = 2 * 1024 * 1024
+        self.assert_bounded(split_meta_inf, u'```metainf' + u'`' * size)
+        self.assert_bounded(split_meta_inf, u'```metainf' + u'a\n' * size)
+        self.assert_bounded(split_meta_inf, u'``' * size)
+        self.assert_bounded(split_meta_inf,
+                            u'```metainf\n```' + u'```metainf' * size)
+
+    def test_bounded_front_matter_split(self):
+        """Finding the closing front matter fence should be linear."""
+        size = 200000
+        self.assert_bounded(split_front_matter, u'---\n' + u'---x\n' * size)
+        self.assert_bounded(split_front_matter, u'---\n' + u'...x\n' * size)
+        self.assert_bounded(split_front_matter, u'---\n' + u'\n' * size)
+
+    def test_bounded_meta_inf(self):
+        """Large and malformed meta information should parse in bounded
+        time."""
+        size = 20000
+        self.assert_bounded(PageMetaInf, u'Title' + u' a' * size)
+        self.assert_bounded(PageMetaInf, u'Title: A' + u'\n' * size + u' x')
+        self.assert_bounded(PageMetaInf, u'Teaser: A\n' + u'  b\n' * size)
+        self.assert_bounded(PageMetaInf, u'# c: d\n' * size)
+        self.assert_bounded(PageMetaInf, u':' * size)
+        self.assert_bounded(PageMetaInf, u'Title: ' + u'\u00e9' * size)
+
+
+class TestSplitFrontMatter(TestCase):
+    """YAML front matter detection tests."""
+
+    def test_yaml(self):
+        """YAML front matter should be split from the content."""
+        self.assertEqual(
+            split_front_matter(u"---\nTitle: MDWeb\n---\n# Body"),
+            ('yaml', {u'Title': u'MDWeb'}, u"\n# Body"))
+
+    def test_yaml_dots_and_crlf(self):
+        """Front matter may be closed with ... and use CRLF newlines."""
+        self.assertEqual(
+            split_front_matter(u"---\r\nTitle: MDWeb\r\n...\r\nBody"),
+            ('yaml', {u'Title': u'MDWeb'}, u"\r\nBody"))
+
+    def test_empty_yaml(self):
+        """Empty front matter should be split from the content."""
+        self.assertEqual(split_front_matter(u"---\n---\nBody"),
+                         ('yaml', {}, u"\nBody"))
+
+    def test_closing_fence_whole_line(self):
+        """Only a whole --- line should close the front matter."""
+        self.assertEqual(
+            split_front_matter(u"---\nTitle: MDWeb\n--- \nBody"),
+            ('yaml', {u'Title': u'MDWeb'}, u" \nBody"))
+        self.assertEqual(
+            split_front_matter(u"---\nTitle: MDWeb\n----\nBody"),
+            ('metainf', u"", u"---\nTitle: MDWeb\n----\nBody"))
+
+    def test_unclosed_rule(self):
+        """A --- line that is never closed should be content."""
+        self.assertEqual(split_front_matter(u"---\nBody\n"),
+                         ('metainf', u"", u"---\nBody\n"))
+        self.assertEqual(split_front_matter(u"----\nBody\n---\n"),
+                         ('metainf', u"", u"----\nBody\n---\n"))
+
+    def test_horizontal_rules(self):
+        """Text between two horizontal rules should stay in the content."""
+        file_string = u"---\nIntro paragraph.\n\n---\n\nMore text"
+        self.assertEqual(split_front_matter(file_string),
+                         ('metainf', u"", file_string))
+        self.assertEqual(split_front_matter(u"---\n- a\n- b\n---\n"),
+                         ('metainf', u"", u"---\n- a\n- b\n---\n"))
+        self.assertEqual(split_front_matter(u"---\nA: [b\n---\n"),
+                         ('metainf', u"", u"---\nA: [b\n---\n"))
+
+        page = Page('/my/content/index.md', '', file_string)
+        self.assertEqual(page.page_html, u"<hr />\n<p>Intro paragraph.</p>\n"
+                                         u"<hr />\n<p>More text</p>")
+
+    def test_metainf(self):
+        """Metainf blocks should be split as before."""
+        self.assertEqual(
+            split_front_matter(u"```metainf\nTitle: MDWeb\n```\nBody"),
+            ('metainf', u"\nTitle: MDWeb\n", u"\nBody"))
+
+    def test_yaml_page(self):
+        """YAML front matter should be mapped onto the meta fields."""
+        page = Page('/my/content/index.md', '', u"""---
+Title: MDWeb
+Nav Name: Home
+Date: 2016-02-01
+Order: 3
+Published: no
+Tags: [markdown, cms]
+Related: [/about, /contact]
+---
+# Body""")
+
+        self.assertEqual(page.meta_inf.title, u'MDWeb')
+        self.assertEqual(page.meta_inf.nav_name, u'Home')
+        self.assertEqual(page.meta_inf.date, datetime.datetime(2016, 2, 1))
+        self.assertEqual(page.meta_inf.order, 3)
+        self.assertFalse(page.meta_inf.published)
+        self.assertEqual(page.meta_inf.tags, [u'markdown', u'cms'])
+        self.assertEqual(page.meta_inf.custom_related,
+                         [u'/about', u'/contact'])
+        self.assertEqual(page.page_html, u'<h1 id="body">Body</h1>')
+
+    def test_invalid_yaml(self):
+        """Invalid or non-mapping front matter should raise exception."""
+        self.assertRaises(PageMetaInfFieldException, PageMetaInf,
+                          u"Title: [unclosed", 'yaml')
+        self.assertRaises(PageMetaInfFieldException, PageMetaInf,
+                          u"- a list", 'yaml')
+
+
+class TestReadPageHeader(fake_filesystem_unittest.TestCase):
+    """Header only page reading tests."""
+
+    def setUp(self):
+        """Create fake filesystem."""
+        self.setUpPyfakefs()
+
+    def test_header_only(self):
+        """Only the meta information block should be read."""
+        self.fs.create_file('/my/content/index.md', contents=u"""```metainf
+Title: Ελύτη
+```
+Body that is never read""")
+
+        header, bytes_read = read_page_header('/my/content/index.md')
+
+        self.assertEqual(header, u"```metainf\nTitle: Ελύτη\n```\n")
+        self.assertEqual(bytes_read, len(header.encode('utf-8')))
+
+    def test_no_meta_inf(self):
+        """A page without meta information should stop after the fence
+        check."""
+        self.fs.create_file('/my/content/index.md',
+                            contents=u"Body that is never read")
+
+        self.assertEqual(read_page_header('/my/content/index.md'), (u'', 10))
+
+    def test_yaml_header_only(self):
+        """Only the YAML front matter should be read."""
+        header = u"---\nTitle: MDWeb\n---\n"
+        self.fs.create_file('/my/content/index.md',
+                            contents=header + u"Body\n" * 1000)
+
+        self.assertEqual(read_page_header('/my/content/index.md'),
+                         (header, len(header)))
+
+    def test_short_yaml_header(self):
+        """Front matter shorter than the metainf fence should be read."""
+        self.fs.create_file('/my/content/index.md',
+                            contents=u"---\n---\nBody\n" * 10)
+
+        self.assertEqual(read_page_header('/my/content/index.md')[0],
+                         u"---\n---\nBody\n")
+
+    def test_deferred_page(self):
+        """A deferred page should load its body when first rendered."""
+        self.fs.create_file('/my/content/index.md', contents=u"""```metainf
+Title: MDWeb
+```
+Body""")
+
+        page = Page(*load_page('/my/content', '/my/content/index.md',
+                               header_only=True), defer_body=True)
+
+        self.assertEqual(page.meta_inf.title, u'MDWeb')
+        self.assertFalse(page.body_loaded)
+        self.assertEqual(page.page_html, u'<p>Body</p>')
+        self.assertEqual(page.markdown_str, u'\nBody')
+
+    def test_dropped_source(self):
+        """A dropped source should be read from disk without being kept."""
+        self.fs.create_file('/my/content/index.md', contents=u"Body")
+
+        page = Page(*load_page('/my/content', '/my/content/index.md'),
+                    source_retention='drop')
+
+        self.assertGreater(page.release_source(), 0)
+        self.assertEqual(page.page_html, u'<p>Body</p>')
+        self.assertEqual(page.markdown_str, u'Body')
+        self.assertEqual(page.release_source(), 0)
+
+    def test_html_store(self):
+        """A page evicted from the HTML store should render again."""
+        self.fs.create_file('/my/content/index.md', contents=u"Body")
+        store = PageHTMLStore(max_bytes=10000)
+
+        page = Page(*load_page('/my/content', '/my/content/index.md'),
+                    html_store=store)
+
+        self.assertIsNone(page._page_html)
+        self.assertTrue(page.body_loaded)
+        self.assertEqual(page.page_html, u'<p>Body</p>')
+        self.assertEqual(store.hits, 1)
+
+        store.clear()
+        self.assertEqual(page.page_html, u'<p>Body</p>')
+        self.assertEqual(store.renders, 2)
+
+    def test_deferred_dropped_source(self):
+        """A deferred page should drop its source once rendered."""
+        self.fs.create_file('/my/content/index.md', contents=u"Body")
+
+        page = Page(*load_page('/my/content', '/my/content/index.md',
+                               header_only=True),
+                    defer_body=True, source_retention='compress')
+
+        self.assertEqual(page.page_html, u'<p>Body</p>')
+        self.assertEqual(page.release_source(), 0)
+        self.assertEqual(page.markdown_str, u'Body')
@@ -0,0 +1,70 @@
+"""Tests for the MDWeb page HTML store."""
+import sys
+import unittest
+
+from mdweb.PageHTMLStore import PageHTMLStore
+
+
+class TestPageHTMLStore(unittest.TestCase):
+    """PageHTMLStore object tests."""
+
+    def test_miss_then_hit(self):
+        """HTML should only be returned after it has been stored."""
+        store = PageHTMLStore(max_bytes=10000)
+
+        self.assertIsNone(store.get('a'))
+        store.put('a', u'<p>A</p>', 0.5)
+        self.assertEqual(store.get('a'), u'<p>A</p>')
+
+        self.assertIn('a', store)
+        self.assertEqual(store.misses, 1)
+        self.assertEqual(store.hits, 1)
+        self.assertEqual(store.hit_rate, 0.5)
+        self.assertEqual(store.renders, 1)
+        self.assertEqual(store.mean_render_seconds, 0.5)
+        self.assertEqual(store.resident_bytes, sys.getsizeof(u'<p>A</p>'))
+
+    def test_budget(self):
+        """The least recently used HTML should be evicted over budget."""
+        page_html = u'x' * 1000
+        store = PageHTMLStore(max_bytes=2 * sys.getsizeof(page_html))
+        store.put('a', page_html)
+        store.put('b', page_html)
+        store.get('a')
+        store.put('c', page_html)
+
+        self.assertEqual(len(store), 2)
+        self.assertIn('a', store)
+        self.assertNotIn('b', store)
+        self.assertIn('c', store)
+        self.assertEqual(store.evictions, 1)
+        self.assertLessEqual(store.resident_bytes, store.max_bytes)
+
+    def test_larger_than_budget(self):
+        """HTML larger than the budget should not be stored."""
+        store = PageHTMLStore(max_bytes=100)
+        store.put('a', u'x' * 1000)
+
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.resident_bytes, 0)
+
+    def test_replace(self):
+        """Storing a page's HTML again should replace it."""
+        store = PageHTMLStore(max_bytes=10000)
+        store.put('a', u'<p>A</p>')
+        store.put('a', u'<p>AA</p>')
+
+        self.assertEqual(store.get('a'), u'<p>AA</p>')
+        self.assertEqual(store.resident_bytes, sys.getsizeof(u'<p>AA</p>'))
+
+    def test_clear_keeps_counters(self):
+        """Clearing should forget the HTML but keep the counters."""
+        store = PageHTMLStore(max_bytes=10000)
+        store.put('a', u'<p>A</p>')
+        store.get('a')
+        store.clear()
+
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.resident_bytes, 0)
+        self.assertEqual(store.stats()['hits'], 1)
+        self.assertEqual(store.stats()['renders'], 1)
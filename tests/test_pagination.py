@@ -0,0 +1,182 @@
+"""Tests for MDWeb listing pagination."""
+import unittest
+
+from pyfakefs import fake_filesystem_unittest, fake_filesystem
+from flask_testing import TestCase
+try:
+    # Python >= 3.3
+    from unittest import mock
+except ImportError:
+    # Python < 3.3
+    import mock
+
+from mdweb.Index import Index
+from mdweb.MDSite import MDSite
+from mdweb.Pagination import Pagination
+
+
+class MDTestSite(MDSite):
+    """Site to use for testing."""
+
+    class MDConfig:  # pylint: disable=R0903
+        """Config for testing use."""
+
+        DEBUG = False
+        CONTENT_PATH = '/my/content/'
+        THEME = '/my/theme/'
+        TESTING = True
+        PAGINATION_PER_PAGE = 2
+
+
+class TestPagination(unittest.TestCase):
+    """Pagination object tests."""
+
+    def test_first_page(self):
+        """The first page should only link to the next page."""
+        pagination = Pagination(list(range(5)), 1, 2, '/blog')
+
+        self.assertEqual(pagination.items, [0, 1])
+        self.assertEqual(pagination.pages, 3)
+        self.assertFalse(pagination.has_prev)
+        self.assertIsNone(pagination.prev_url)
+        self.assertEqual(pagination.next_url, '/blog?page=2')
+        self.assertEqual(pagination.link_header(),
+                         '</blog?page=2>; rel="next"')
+
+    def test_middle_page(self):
+        """A middle page should link to both neighbours."""
+        pagination = Pagination(list(range(5)), 2, 2, '/blog')
+
+        self.assertEqual(pagination.items, [2, 3])
+        self.assertEqual(pagination.prev_url, '/blog')
+        self.assertEqual(pagination.link_header(),
+                         '</blog>; rel="prev", </blog?page=3>; rel="next"')
+
+    def test_last_page(self):
+        """The last page may be short and has no next page."""
+        pagination = Pagination(list(range(5)), 3, 2, '/blog')
+
+        self.assertEqual(pagination.items, [4])
+        self.assertFalse(pagination.has_next)
+        self.assertIsNone(pagination.next_num)
+
+    def test_empty_listing(self):
+        """An empty listing should have a single empty page."""
+        pagination = Pagination([], 1, 2, '/blog')
+
+        self.assertEqual(pagination.pages, 1)
+        self.assertEqual(pagination.items, [])
+        self.assertIsNone(pagination.link_header())
+
+
+class TestPaginatedListing(fake_filesystem_unittest.TestCase, TestCase):
+    """Paginated listing page tests."""
+
+    def create_app(self):
+        """Create fake filesystem and flask app."""
+        self.setUpPyfakefs()
+        self.fake_os = fake_filesystem.FakeOsModule(self.fs)
+
+        self.fs.create_file('/my/content/index.md')
+        self.fs.create_file('/my/content/blog/index.md',
+                            contents=u"""```metainf
+Title: Blog
+Template: page_listing.html
+```
+""")
+        for n in range(5):
+            self.fs.create_file('/my/content/blog/post%d.md' % n,
+                                contents=u"""```metainf
+Title: Post %d
+Date: 2016-01-%02d
+```
+""" % (n, n + 1))
+
+        self.fs.create_file('/my/theme/templates/page.html',
+                            contents=u"{{ page | safe }}")
+        self.fs.create_file(
+            '/my/theme/templates/page_listing.html',
+            contents=u"""{% set listing = meta_index.pages|paginate %}
+{% for post in listing.items %}[{{ post.meta_inf.title }}]{% endfor %}
+{% set posts = navigation.child_navs[0].child_pages %}
+{% for post in (posts|paginate(3, 'date', True)).items %}\
+({{ post.meta_inf.title }}){% endfor %}
+{% for post in (posts|published|paginate(2)).items %}\
+{{ '{' }}{{ post.meta_inf.title }}}{% endfor %}
+{% for post in (posts|published|paginate(3, 'date', True)).items %}\
+<{{ post.meta_inf.title }}>{% endfor %}""")
+
+        app = MDTestSite(
+            "MDWeb",
+            app_options={},
+            site_options={
+                'logging_level': 'CRITICAL',
+                'testing': True,
+            }
+        )
+
+        # Add the partials directory so we have access in the FakeFS
+        self.fs.add_real_directory(app.config['PARTIALS_TEMPLATE_PATH'])
+
+        app.start()
+
+        return app
+
+    def test_pages(self):
+        """The requested page of the listing should be rendered."""
+        with self.app.test_client() as client:
+            first = client.get('/blog')
+            second = client.get('/blog?page=2')
+
+        self.assertIn(b'[Post 4][Post 3]', first.data)
+        self.assertIn(b'(Post 4)(Post 3)(Post 2)', first.data)
+        self.assertIn(b'[Post 2][Post 1]', second.data)
+        self.assertIn(b'(Post 1)(Post 0)', second.data)
+
+    def test_published_listing(self):
+        """The published filter should chain into paginate."""
+        with self.app.test_client() as client:
+            first = client.get('/blog')
+
+        self.assertEqual(first.data.count(b'{Post'), 2)
+        self.assertIn(b'<Post 4><Post 3><Post 2>', first.data)
+
+    def test_link_header(self):
+        """Listing pages should link to their neighbours."""
+        with self.app.test_client() as client:
+            response = client.get('/blog?page=2')
+
+        self.assertEqual(response.headers['Link'],
+                         '</blog>; rel="prev", </blog?page=3>; rel="next"')
+
+    def test_past_last_page(self):
+        """Pages past the end of the listing should not be found."""
+        with self.app.test_client() as client:
+            self.assert404(client.get('/blog?page=4'))
+            self.assert404(client.get('/blog?page=0'))
+            self.assert404(client.get('/blog?page=two'))
+
+    def test_rendered_pages_cached(self):
+        """Rendered listing pages should be cached until reload."""
+        with mock.patch.object(Index, 'render',
+                               wraps=Index.render) as mock_render:
+            with self.app.test_client() as client:
+                first = client.get('/blog?page=2')
+                second = client.get('/blog?page=2')
+                client.get('/blog?page=3')
+            self.assertEqual(mock_render.call_count, 2)
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.headers['Link'], second.headers['Link'])
+
+        self.app.start()
+        self.assertEqual(self.app.listing_cache, {})
+
+    def test_other_pages_not_cached(self):
+        """Pages without a paginated listing should not be cached."""
+        with self.app.test_client() as client:
+            response = client.get('/blog/post1')
+
+        self.assert200(response)
+        self.assertNotIn('Link', response.headers)
+        self.assertEqual(self.app.listing_cache, {})
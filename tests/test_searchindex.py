@@ -0,0 +1,185 @@
+"""Tests for the MDWeb search index."""
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    # Python >= 3.3
+    from unittest import mock
+except ImportError:
+    # Python < 3.3
+    import mock
+
+from mdweb.Page import Page
+from mdweb import SearchIndex as search_index_module
+from mdweb.SearchIndex import (
+    SearchIndex,
+    html_to_text,
+    markdown_to_text,
+    tokenize,
+)
+from tests.sites import make_page
+
+
+class TestTokenize(unittest.TestCase):
+    """Tokenizer tests."""
+
+    def test_tokenize(self):
+        """Words should be lower cased and split on punctuation."""
+        self.assertEqual(tokenize(u"Hello, World! It's MDWeb_2"),
+                         [u'hello', u'world', u'it', u's', u'mdweb_2'])
+
+    def test_html_to_text(self):
+        """Tags should be stripped and entities decoded."""
+        self.assertEqual(
+            tokenize(html_to_text(u"<p>Fish&amp;<em>Chips</em></p>")),
+            [u'fish', u'chips'])
+
+    def test_markdown_to_text(self):
+        """Link targets and tags should be stripped and entities decoded."""
+        self.assertEqual(
+            tokenize(markdown_to_text(
+                u"*Fish*&amp;[chips](http://example.com/x) <b>peas</b>\n"
+                u"[ref]: http://example.com/y\n")),
+            [u'fish', u'chips', u'peas'])
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Search index tests."""
+
+    def setUp(self):
+        self.pages = [
+            make_page('python', u"Title: Python",
+                      u"A snake. Also a *language*."),
+            make_page('snakes',
+                      u"Title: Snakes\nDescription: All about snakes",
+                      u"Snakes and more snakes, a python is a snake."),
+            make_page('cooking', u"Title: Cooking",
+                      u"Recipes for fish and chips."),
+        ]
+        self.index = SearchIndex(self.pages)
+
+    def test_build(self):
+        """Every page should be tokenized once."""
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.pages_tokenized, 3)
+        self.assertGreater(self.index.term_count, 10)
+
+    def test_ranking(self):
+        """Title matches should outrank body matches."""
+        results = self.index.search(u'python')
+
+        self.assertEqual([page.url_path for page, _ in results],
+                         ['python', 'snakes'])
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_any_word(self):
+        """Pages matching any word of the query should be found."""
+        results = self.index.search(u'Chips language')
+
+        self.assertEqual(sorted(page.url_path for page, _ in results),
+                         ['cooking', 'python'])
+
+    def test_no_match(self):
+        """Unknown words and empty queries should find nothing."""
+        self.assertEqual(self.index.search(u'unknown'), [])
+        self.assertEqual(self.index.search(u''), [])
+        self.assertEqual(self.index.search(u'python', 0), [])
+
+    def test_count(self):
+        """Results should be limited to the given count."""
+        self.assertEqual(len(self.index.search(u'snake python', 1)), 1)
+
+    def test_incremental_rebuild(self):
+        """Only pages with a changed file should be tokenized again."""
+        self.pages[2] = make_page('cooking', u"Title: Cooking",
+                                  u"Recipes for python.", mtime=2)
+        self.pages.append(make_page('new', body=u"Brand new"))
+
+        with mock.patch.object(SearchIndex, '_tokenize_page',
+                               wraps=SearchIndex._tokenize_page) as tokenize_page:
+            index = SearchIndex(self.pages, previous=self.index)
+
+        self.assertEqual(index.pages_tokenized, 2)
+        self.assertEqual([call[0][0].url_path for call
+                          in tokenize_page.call_args_list],
+                         ['cooking', 'new'])
+        self.assertEqual(sorted(page.url_path for page, _
+                                in index.search(u'python')),
+                         ['cooking', 'python', 'snakes'])
+        self.assertEqual(index.search(u'fish'), [])
+
+    def test_incremental_postings(self):
+        """A rebuild should only change the postings of changed pages."""
+        pages = [self.pages[1], self.pages[2],
+                 make_page('new', body=u"Snakes in a new python page")]
+
+        index = SearchIndex(pages, previous=self.index)
+
+        self.assertIs(index._postings[u'chips'],
+                      self.index._postings[u'chips'])
+        self.assertIsNot(index._postings[u'python'],
+                         self.index._postings[u'python'])
+        self.assertNotIn(u'language', index._postings)
+        self.assertEqual(len(index), 3)
+        expected = SearchIndex(pages)
+        for query in [u'python', u'snakes new', u'fish']:
+            self.assertEqual(
+                [(page.url_path, round(score, 4))
+                 for page, score in index.search(query)],
+                [(page.url_path, round(score, 4))
+                 for page, score in expected.search(query)])
+
+        # The previous index is unchanged
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual([page.url_path for page, _
+                          in self.index.search(u'language')], ['python'])
+
+    def test_compact(self):
+        """Postings should be built again once most pages were removed."""
+        index = SearchIndex(self.pages[2:], previous=self.index)
+        self.assertEqual(len(index.pages), 3)
+
+        index = SearchIndex(self.pages[2:], previous=index)
+        self.assertEqual(index.pages, [self.pages[2]])
+        self.assertEqual([page.url_path for page, _
+                          in index.search(u'fish')], ['cooking'])
+
+    def test_deferred_pages(self):
+        """Indexing should neither render nor load deferred pages."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        page_path = os.path.join(directory, 'deferred.md')
+        with open(page_path, 'w') as f:
+            f.write(u"```metainf\nTitle: Deferred\n```\n"
+                    u"A [python](http://example.com/snake) page\n")
+        page = Page(page_path, 'deferred',
+                    u"```metainf\nTitle: Deferred\n```\n", defer_body=True)
+
+        with mock.patch.object(Page, '_render') as render:
+            index = SearchIndex([page])
+
+        render.assert_not_called()
+        self.assertFalse(page.body_loaded)
+        self.assertEqual([page.url_path for page, _
+                          in index.search(u'python')], ['deferred'])
+        self.assertEqual(index.search(u'example'), [])
+
+    def test_threshold_search(self):
+        """Long postings lists should give the same results as a full scan."""
+        pages = [make_page('page%d' % n,
+                           body=u" ".join([u"common"] * (n % 7 + 1) +
+                                          [u"filler"] * (n % 5) +
+                                          [u"odd"] * (n % 2)))
+                 for n in range(60)]
+
+        with mock.patch.object(search_index_module, 'SHORT_POSTINGS', 10):
+            index = SearchIndex(pages)
+            results = index.search(u'common odd', 5)
+        with mock.patch.object(search_index_module, 'SHORT_POSTINGS', 1000):
+            expected = index.search(u'common odd', 5)
+
+        self.assertEqual([round(score, 4) for _, score in results],
+                         [round(score, 4) for _, score in expected])
+        self.assertEqual(len(results), 5)
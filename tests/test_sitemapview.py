@@ -1,13 +1,18 @@
-"""Tests for the MDWeb Sitemap View.
-
-TODO: Test that the sitemap cache is regenerated when a file changes
-"""
+"""Tests for the MDWeb Sitemap View."""
 from datetime import datetime
+import gzip
 from dateutil import parser
 from pyfakefs import fake_filesystem_unittest, fake_filesystem
 from flask_testing import TestCase
+try:
+    # Python >= 3.3
+    from unittest import mock
+except ImportError:
+    # Python < 3.3
+    import mock
 
 from mdweb.MDSite import MDSite
+from mdweb import SiteMapView as sitemap_module
 from mdweb.SiteMapView import SiteMapView
 
 
@@ -145,3 +150,148 @@ Sitemap ChangeFreq: daily
         <lastmod>2015-06-26</lastmod>
     </url>
 </urlset>''')
+
+    def test_sitemap_cached_between_requests(self):
+        """The sitemap should only be generated once per content generation."""
+        with mock.patch.object(SiteMapView, 'sitemap_entries',
+                               wraps=SiteMapView.sitemap_entries) as gen:
+            with self.app.test_client() as client:
+                first = client.get('/sitemap.xml')
+                second = client.get('/sitemap.xml')
+
+        self.assert200(first)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(gen.call_count, 1)
+
+    def test_sitemap_regenerated_after_reload(self):
+        """A content reload should invalidate the cached sitemap."""
+        with self.app.test_client() as client:
+            client.get('/sitemap.xml')
+
+        self.fs.create_file('/my/content/order/prints.md')
+        self.app.start()
+
+        with self.app.test_client() as client:
+            response = client.get('/sitemap.xml')
+
+        self.assertIn(b'<loc>http://localhost/order/prints</loc>',
+                      response.data)
+
+    def test_sitemap_background_rebuild(self):
+        """A reload should rebuild a previously served sitemap in the
+        background."""
+        with self.app.test_client() as client:
+            client.get('/sitemap.xml')
+
+        self.app.start()
+        self.assertFalse(self.app.sitemap_cache.is_current(
+            self.app, 'http://localhost/'))
+
+        thread = self.app.sitemap_cache.rebuild_async(self.app)
+        thread.join()
+
+        self.assertTrue(self.app.sitemap_cache.is_current(
+            self.app, 'http://localhost/'))
+
+    def test_page_mtime_captured(self):
+        """Page modification times should be captured during the scan."""
+        page = self.app.get_page('about')
+
+        self.assertEqual(page.mtime, datetime.timestamp(
+            parser.parse('Thu, 26 Jun 2015 12:21:15 +0000')))
+
+    def test_sitemap_index_when_sharded(self):
+        """Sites above the URL limit should be served as a sitemap index."""
+        self.app.config['SITEMAP_MAX_URLS'] = 5
+
+        with self.app.test_client() as client:
+            response = client.get('/sitemap.xml')
+            shard_count = response.data.count(b'<sitemap>')
+            shards = [client.get('/sitemap-%d.xml' % number)
+                      for number in range(1, shard_count + 1)]
+            missing = client.get('/sitemap-%d.xml' % (shard_count + 1))
+
+        self.assert200(response)
+        self.assertIn(b'<sitemapindex', response.data)
+        self.assertEqual(shard_count, self.app.sitemap_cache.shard_count)
+        # Shards are kept at most half full on average
+        self.assertGreaterEqual(shard_count * 5, 2 * 11)
+
+        locs = []
+        for shard in shards:
+            self.assert200(shard)
+            self.assertLessEqual(shard.data.count(b'<url>'), 5)
+            locs.extend(shard.data.split(b'<loc>')[1:])
+        self.assertEqual(len(locs), 11)
+        self.assertIn(b'http://localhost/work/portfolio</loc>',
+                      b''.join(locs))
+        self.assert404(missing)
+
+    def test_unsharded_has_no_shards(self):
+        """Shard URLs should 404 while the sitemap fits in one file."""
+        with self.app.test_client() as client:
+            response = client.get('/sitemap-1.xml')
+
+        self.assert404(response)
+
+    def test_reload_renders_changed_shards_only(self):
+        """A reload should only render the shards whose pages changed."""
+        self.app.config['SITEMAP_MAX_URLS'] = 5
+        with self.app.test_client() as client:
+            index = client.get('/sitemap.xml').data
+
+        # A page early in the scan order must not move the pages after it
+        self.fs.create_file('/my/content/about/team.md')
+        self.app.start()
+        self.app.config['SITEMAP_MAX_URLS'] = 5
+
+        with mock.patch.object(sitemap_module, 'render_stream',
+                               wraps=sitemap_module.render_stream) as render:
+            with self.app.test_client() as client:
+                self.assertEqual(client.get('/sitemap.xml').data.count(
+                    b'<sitemap>'), index.count(b'<sitemap>'))
+                shards = b''.join(
+                    client.get('/sitemap-%d.xml' % number).data
+                    for number in range(1, index.count(b'<sitemap>') + 1))
+
+        templates = [c[0][0] for c in render.call_args_list]
+        self.assertEqual(templates.count(sitemap_module.SITEMAP_TEMPLATE), 1)
+        self.assertIn(b'<loc>http://localhost/about/team</loc>', shards)
+
+    def test_sitemap_gz(self):
+        """The .xml.gz sitemap should be the gzipped sitemap."""
+        with self.app.test_client() as client:
+            plain = client.get('/sitemap.xml')
+            compressed = client.get('/sitemap.xml.gz')
+
+        self.assert200(compressed)
+        self.assertEqual(compressed.headers['Content-Type'],
+                         'application/x-gzip')
+        self.assertNotIn('Content-Encoding', compressed.headers)
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+
+    def test_sitemap_gzip_encoding(self):
+        """Clients accepting gzip should get the precompressed sitemap."""
+        with self.app.test_client() as client:
+            plain = client.get('/sitemap.xml')
+            encoded = client.get('/sitemap.xml',
+                                 headers={'Accept-Encoding': 'gzip, deflate'})
+
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(encoded.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', encoded.headers['Vary'])
+        self.assertEqual(encoded.headers['Content-Type'], 'application/xml')
+        self.assertEqual(gzip.decompress(encoded.data), plain.data)
+
+    def test_sitemap_shard_gz(self):
+        """Shards should be available gzipped as well."""
+        self.app.config['SITEMAP_MAX_URLS'] = 5
+
+        with self.app.test_client() as client:
+            plain = client.get('/sitemap-2.xml')
+            compressed = client.get('/sitemap-2.xml.gz')
+            missing = client.get('/sitemap-%d.xml.gz' % (
+                self.app.sitemap_cache.shard_count + 1))
+
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+        self.assert404(missing)
@@ -0,0 +1,117 @@
+"""Tests for the MDWeb SQLite store."""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+try:
+    # Python >= 3.3
+    from unittest import mock
+except ImportError:
+    # Python < 3.3
+    import mock
+
+from mdweb.Page import Page
+from mdweb.SQLiteStore import SQLiteStore
+from tests.sites import make_page
+
+
+class TestSQLiteStore(unittest.TestCase):
+    """SQLite store tests."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'store.db')
+
+        self.pages = [
+            make_page('blog/python',
+                      u"Title: Python\nAuthor: Ann\nDate: 2020-03-01\n"
+                      u"Tags: code, snakes\n",
+                      u"A snake. Also a *language*."),
+            make_page('blog/snakes',
+                      u"Title: Snakes\nAuthor: Bob\nDate: 2020-02-01\n"
+                      u"Tags: snakes\nDescription: All about snakes\n"
+                      u"Series: reptiles\n",
+                      u"Snakes and more snakes, a python is a snake."),
+            make_page('blog/draft',
+                      u"Title: Draft python\nPublished: False\n"
+                      u"Date: 2020-04-01\n"),
+            make_page('about', u"Title: About\n", u"Just a page."),
+        ]
+        self.store = SQLiteStore(self.path)
+        self.addCleanup(self.store.close)
+        self.stats = self.store.update(self.pages)
+
+    def test_update(self):
+        """Only changed pages should be written on later updates."""
+        self.assertEqual(self.stats,
+                         {'written': 4, 'removed': 0, 'unchanged': 0})
+        self.assertEqual(len(self.store), 4)
+
+        self.pages[3] = make_page('about', u"Title: About\n",
+                                  u"Now about python.", mtime=2)
+        del self.pages[2]
+        stats = self.store.update(self.pages)
+
+        self.assertEqual(stats, {'written': 1, 'removed': 1, 'unchanged': 2})
+        self.assertEqual(len(self.store), 3)
+        self.assertIn('about', [url_path for url_path, _
+                                in self.store.search(u'python')])
+
+    def test_shared(self):
+        """A second store on the same file should see the pages."""
+        store = SQLiteStore(self.path)
+        self.addCleanup(store.close)
+
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.update(self.pages)['unchanged'], 4)
+
+    def test_search(self):
+        """Search should rank title matches first and skip drafts."""
+        results = self.store.search(u'Python')
+
+        self.assertEqual([url_path for url_path, _ in results],
+                         ['blog/python', 'blog/snakes'])
+        self.assertGreater(results[0][1], results[1][1])
+        self.assertEqual(
+            len(self.store.search(u'python', published_only=False)), 3)
+        self.assertEqual(self.store.search(u'"unknown OR'), [])
+        self.assertEqual(self.store.search(u''), [])
+
+    def test_listings(self):
+        """Metadata queries should return published pages newest first."""
+        self.assertEqual(self.store.latest(),
+                         ['blog/python', 'blog/snakes'])
+        self.assertEqual(self.store.latest(1, 1), ['blog/snakes'])
+        self.assertEqual(self.store.by_author(u'Bob'), ['blog/snakes'])
+        self.assertEqual(self.store.by_tag(u'snakes'),
+                         ['blog/python', 'blog/snakes'])
+        self.assertEqual(self.store.by_field('series', u'reptiles'),
+                         ['blog/snakes'])
+
+    def test_read_only(self):
+        """Queries should not be able to write to the store."""
+        # pylint: disable=W0212
+        with self.assertRaises(sqlite3.OperationalError):
+            self.store._reader.execute('DELETE FROM pages')
+
+    def test_deferred_pages(self):
+        """Writing a deferred page should neither render nor load it."""
+        page_path = os.path.join(self.directory, 'deferred.md')
+        with open(page_path, 'w') as f:
+            f.write(u"```metainf\nTitle: Deferred\n```\n"
+                    u"A [python](http://example.com/snake) page\n")
+        page = Page(page_path, 'deferred',
+                    u"```metainf\nTitle: Deferred\n```\n", mtime=1,
+                    defer_body=True)
+
+        with mock.patch.object(Page, '_render') as render:
+            self.store.update(self.pages + [page])
+
+        render.assert_not_called()
+        self.assertFalse(page.body_loaded)
+        self.assertIn('deferred', [url_path for url_path, _
+                                   in self.store.search(u'python')])
+        self.assertEqual(self.store.search(u'example'), [])